@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Almacén de la sesión SACH (storage state de Playwright)
+Reemplaza los json.dump sueltos sobre sach_session.json: escrituras atómicas, caché del
+estado parseado y versionado para que gane el estado autenticado más reciente aunque
+varios workers (hilos o procesos) guarden a la vez. Backend en archivo o en SQLite.
+"""
+
+import logging
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo exclusión dentro del proceso
+    fcntl = None
+
+log = logging.getLogger("almacen_sesion")
+
+
+def _registro(version, storage_state, autenticado_en, guardado_en):
+    return {
+        "version": version,
+        "autenticado_en": autenticado_en,
+        "guardado_en": guardado_en,
+        "storage_state": storage_state,
+    }
+
+
+def _gana(actual, autenticado_en):
+    """
+    El estado nuevo reemplaza al guardado salvo que este último tenga una autenticación
+    más reciente (o el nuevo no sepa si está autenticado y el guardado sí).
+    """
+    if actual is None or actual["autenticado_en"] is None:
+        return True
+    if autenticado_en is None:
+        return False
+    return autenticado_en >= actual["autenticado_en"]
+
+
+class AlmacenSesionArchivo:
+    """
+    Sesión en un archivo JSON. Se escribe en un temporal y se publica con os.replace,
+    bajo un flock para que el chequeo de versión y la escritura sean atómicos entre procesos.
+    """
+
+    def __init__(self, ruta=None):
+        self.ruta = ruta or os.getenv('SACH_SESION_FILE', 'sach_session.json')
+        self._lock = threading.Lock()
+        self._cache = None
+        self._firma = None
+        self._stats = {"lecturas": 0, "lecturas_cache": 0, "escrituras": 0, "rechazadas": 0}
+
+    def _firma_archivo(self):
+        try:
+            st = os.stat(self.ruta)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    @contextmanager
+    def _exclusivo(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(f"{self.ruta}.lock", 'w') as candado:
+                fcntl.flock(candado, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(candado, fcntl.LOCK_UN)
+
+    def _leer(self):
+        """Registro actual; solo se parsea el JSON si el archivo cambió desde la última lectura"""
+        firma = self._firma_archivo()
+        if firma is None:
+            self._cache, self._firma = None, None
+            return None
+        if firma == self._firma:
+            self._stats["lecturas_cache"] += 1
+            return self._cache
+        self._stats["lecturas"] += 1
+        try:
+            with open(self.ruta, 'r') as f:
+                datos = json.load(f)
+        except Exception as e:
+            log.warning(f"⚠️ Error cargando sesión: {e}")
+            return None
+        if "storage_state" not in datos:
+            # Formato anterior: el storage state pelado, sin versión
+            datos = _registro(0, datos, None, None)
+        self._cache, self._firma = datos, firma
+        return datos
+
+    def cargar_registro(self):
+        """{version, autenticado_en, guardado_en, storage_state} o None"""
+        with self._lock:
+            return self._leer()
+
+    def cargar(self):
+        """El storage state para new_context(), o None si no hay sesión guardada"""
+        registro = self.cargar_registro()
+        return registro["storage_state"] if registro else None
+
+    def guardar(self, storage_state, autenticado_en=None):
+        """Guarda si el estado es al menos tan reciente como el guardado; devuelve True si quedó"""
+        with self._exclusivo():
+            actual = self._leer()
+            if not _gana(actual, autenticado_en):
+                self._stats["rechazadas"] += 1
+                return False
+            version = (actual["version"] if actual else 0) + 1
+            registro = _registro(version, storage_state, autenticado_en, time.time())
+            temporal = f"{self.ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporal, 'w') as f:
+                json.dump(registro, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporal, self.ruta)
+            self._cache, self._firma = registro, self._firma_archivo()
+            self._stats["escrituras"] += 1
+            return True
+
+    def estadisticas(self):
+        with self._lock:
+            stats = dict(self._stats)
+            version = self._cache["version"] if self._cache else None
+        stats.update({"backend": "archivo", "ruta": self.ruta, "version": version})
+        return stats
+
+
+class AlmacenSesionSQLite:
+    """
+    Sesión en una fila de SQLite (WAL), compartible por varios procesos.
+    La lectura consulta solo la versión y reutiliza el JSON parseado si no cambió.
+    """
+
+    def __init__(self, ruta_db=None, clave="sach"):
+        self.ruta_db = ruta_db or os.getenv('SACH_SESION_DB', 'sach_sesion.db')
+        self.clave = clave
+        self._lock = threading.Lock()
+        self._cache = None
+        self._stats = {"lecturas": 0, "lecturas_cache": 0, "escrituras": 0, "rechazadas": 0}
+
+        self._conn = sqlite3.connect(self.ruta_db, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sesiones ("
+            "clave TEXT PRIMARY KEY, version INTEGER NOT NULL, autenticado_en REAL, "
+            "guardado_en REAL NOT NULL, estado TEXT NOT NULL)"
+        )
+
+    def _leer(self):
+        fila = self._conn.execute("SELECT version FROM sesiones WHERE clave = ?", (self.clave,)).fetchone()
+        if fila is None:
+            self._cache = None
+            return None
+        if self._cache and self._cache["version"] == fila[0]:
+            self._stats["lecturas_cache"] += 1
+            return self._cache
+        self._stats["lecturas"] += 1
+        fila = self._conn.execute(
+            "SELECT version, autenticado_en, guardado_en, estado FROM sesiones WHERE clave = ?",
+            (self.clave,)
+        ).fetchone()
+        if fila is None:
+            return None
+        version, autenticado_en, guardado_en, estado = fila
+        self._cache = _registro(version, json.loads(estado), autenticado_en, guardado_en)
+        return self._cache
+
+    def cargar_registro(self):
+        with self._lock:
+            return self._leer()
+
+    def cargar(self):
+        registro = self.cargar_registro()
+        return registro["storage_state"] if registro else None
+
+    def guardar(self, storage_state, autenticado_en=None):
+        with self._lock:
+            # BEGIN IMMEDIATE toma el lock de escritura antes de leer la versión actual
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                actual = self._leer()
+                if not _gana(actual, autenticado_en):
+                    self._conn.execute("ROLLBACK")
+                    self._stats["rechazadas"] += 1
+                    return False
+                version = (actual["version"] if actual else 0) + 1
+                registro = _registro(version, storage_state, autenticado_en, time.time())
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sesiones (clave, version, autenticado_en, guardado_en, estado) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (self.clave, version, autenticado_en, registro["guardado_en"], json.dumps(storage_state))
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._cache = registro
+            self._stats["escrituras"] += 1
+            return True
+
+    def estadisticas(self):
+        with self._lock:
+            stats = dict(self._stats)
+            version = self._cache["version"] if self._cache else None
+        stats.update({"backend": "sqlite", "ruta": self.ruta_db, "version": version})
+        return stats
+
+
+_almacen_global = None
+_almacen_global_lock = threading.Lock()
+
+
+def obtener_almacen_sesion():
+    """Almacén compartido por el proceso; SACH_SESION_BACKEND=archivo|sqlite"""
+    global _almacen_global
+    with _almacen_global_lock:
+        if _almacen_global is None:
+            if os.getenv('SACH_SESION_BACKEND', 'archivo') == 'sqlite':
+                _almacen_global = AlmacenSesionSQLite()
+            else:
+                _almacen_global = AlmacenSesionArchivo()
+        return _almacen_global
@@ -1,54 +1,27 @@
-from flask import Flask, request, Response
+from flask import Flask, request, Response, jsonify
 import os
-import sys
+import io
 import json
-import requests
 from procesar_audio import ProcesadorAudio
-from cargar_reserva import RobotSACH
-import tempfile
+from cargar_reserva import RobotSACH, refrescar_sesiones
+from pool_navegadores import obtener_pool
+from cola_trabajos import ColaTrabajos, ErrorDefinitivo
+from deduplicador import DeduplicadorMensajes
+from aprovisionamiento import SondaPreparacion
+from cliente_graph import ClienteGraph, ErrorGraph
+from esperas import registro_esperas
+from selectores import obtener_resolutor
+from sesion import RefrescoSesion, obtener_gestor_sesion
+from recursos import obtener_politica_recursos
+from indice_clientes import obtener_indice_clientes
+from metricas import metricas
+from bitacora import configurar_logging, con_correlacion, con_id_de_mensaje
+import logging
 import urllib.parse
 
-# Instalar Playwright Chromium si no está disponible
-print("🔧 Verificando instalación de Playwright...")
-sys.stdout.flush()
-try:
-    os.system('playwright install chromium')
-    print("✅ Playwright Chromium instalado o ya existente")
-    sys.stdout.flush()
-    
-    # INICIO BLINDADO DEL NAVEGADOR
-    try:
-        print("Intentando iniciar Chromium con modo sandbox desactivado...")
-        sys.stdout.flush()
-        from playwright.async_api import async_playwright
-        import asyncio
-        
-        async def launch_browser():
-            playwright = await async_playwright().start()
-            
-            # Diagnóstico de ruta del navegador
-            print(f'Ruta del navegador: {playwright.chromium.executable_path}')
-            sys.stdout.flush()
-            
-            browser = await playwright.chromium.launch(
-                headless=True,
-                args=["--no-sandbox", "--disable-gpu", "--disable-dev-shm-usage"]
-            )
-            print("¡Navegador iniciado con éxito!")
-            sys.stdout.flush()
-            await browser.close()
-            await playwright.stop()
-        
-        asyncio.run(launch_browser())
-        
-    except Exception as e:
-        print(f"CRITICAL ERROR iniciando navegador: {e}")
-        sys.stdout.flush()
-        raise e
-    
-except Exception as e:
-    print(f"⚠️ Error instalando Playwright: {e}")
-    sys.stdout.flush()
+# Logs JSON por una cola (los workers no esperan a stdout); LOG_LEVEL=DEBUG para diagnósticos
+configurar_logging()
+log = logging.getLogger("app")
 
 app = Flask(__name__)
 
@@ -59,18 +32,45 @@ WHATSAPP_TOKEN = os.getenv('WHATSAPP_TOKEN')
 
 # Verificación CRÍTICA del token
 if not WHATSAPP_TOKEN:
-    print('❌ ERROR CRÍTICO: WHATSAPP_TOKEN no está configurado')
-    print('� Debes agregar la variable de entorno WHATSAPP_TOKEN en Railway')
-    print('📝 Ve a Railway Dashboard → Variables → Agregar WHATSAPP_TOKEN')
+    log.error('❌ ERROR CRÍTICO: WHATSAPP_TOKEN no está configurado')
+    log.error('� Debes agregar la variable de entorno WHATSAPP_TOKEN en Railway')
+    log.error('📝 Ve a Railway Dashboard → Variables → Agregar WHATSAPP_TOKEN')
 else:
-    print(f'🔑 Token configurado correctamente: {WHATSAPP_TOKEN[:10]}...')
+    log.info('🔑 Token de WhatsApp configurado')
     
-print(f'📱 Phone ID: {WHATSAPP_PHONE_NUMBER_ID}')
-print(f'🔐 Verify Token: {WHATSAPP_VERIFY_TOKEN}')
+log.info(f'📱 Phone ID: {WHATSAPP_PHONE_NUMBER_ID}')
+
+# Cliente HTTP compartido (keep-alive, timeouts y reintentos) para la Graph API
+cliente_graph = ClienteGraph(WHATSAPP_TOKEN, WHATSAPP_PHONE_NUMBER_ID)
 
 # Inicializar procesador de audio
 procesador_audio = ProcesadorAudio()
 
+# Pool de navegadores calientes compartido por todos los mensajes
+pool_navegadores = obtener_pool()
+
+# Chromium se instala en el build (python aprovisionamiento.py); acá solo se calienta en segundo plano.
+# SACH_APROVISIONAR_AL_INICIAR=1 para entornos sin paso de build (la instalación queda cacheada).
+sonda_preparacion = SondaPreparacion(
+    pool_navegadores,
+    aprovisionar=os.getenv('SACH_APROVISIONAR_AL_INICIAR', '0') == '1'
+)
+
+def refrescar_sesion_sach():
+    """Login o navegación de mantenimiento en cada navegador, cuando el pool ya está caliente"""
+    if not sonda_preparacion.listo:
+        return None
+    return refrescar_sesiones(pool_navegadores)
+
+# La sesión SACH se renueva en segundo plano antes de vencer: ninguna reserva paga el login
+refresco_sesion = RefrescoSesion(obtener_gestor_sesion(), refrescar_sesion_sach)
+
+# Cola persistente entre el webhook y el pipeline audio→SACH
+cola_trabajos = ColaTrabajos()
+
+# Ids de mensajes ya recibidos (Meta reenvía los webhooks lentos)
+deduplicador = DeduplicadorMensajes()
+
 @app.route('/webhook', methods=['GET', 'POST'])
 def webhook():
     if request.method == 'GET':
@@ -85,8 +85,7 @@ def webhook():
         # Procesar mensajes entrantes
         data = request.get_json()
         
-        print("🎙️ Audio recibido - Webhook POST detectado")
-        sys.stdout.flush()
+        log.debug("🎙️ Webhook POST recibido")
         
         try:
             # Verificar si es un mensaje de WhatsApp
@@ -96,142 +95,120 @@ def webhook():
                         if 'messages' in change.get('value', {}):
                             messages = change['value']['messages']
                             for message in messages:
-                                if message.get('type') == 'audio':
-                                    handle_audio_message(message)
-                                elif message.get('type') == 'text':
-                                    handle_text_message(message)
+                                # Reentrega de un mensaje ya recibido: no repetir transcripción ni carga en SACH
+                                with con_correlacion(message.get('id')):
+                                    if deduplicador.es_duplicado(message.get('id')):
+                                        log.info("🔁 Mensaje duplicado ignorado")
+                                        continue
+                                    
+                                    # Encolar y responder enseguida: WhatsApp reintenta si no recibe un 200 rápido
+                                    if message.get('type') in ('audio', 'text'):
+                                        try:
+                                            job_id = cola_trabajos.encolar(message['type'], message)
+                                        except Exception:
+                                            # Sin encolar no cuenta como visto: el 500 hace que Meta lo reenvíe
+                                            deduplicador.olvidar(message.get('id'))
+                                            raise
+                                        log.info("📥 Mensaje encolado", extra={"trabajo": job_id, "tipo": message['type']})
             
             return 'OK', 200
             
         except Exception as e:
-            print(f"Error processing webhook: {e}")
+            log.exception(f"Error processing webhook: {e}")
             return 'Error', 500
 
+@con_id_de_mensaje
 def handle_audio_message(message):
-    """Procesar mensaje de audio de WhatsApp"""
-    try:
-        print("🎵 INICIANDO PROCESAMIENTO DE AUDIO")
-        sys.stdout.flush()
-        
-        # Obtener información del audio
-        audio_id = message['audio']['id']
-        from_number = message['from']
-        
-        print(f"📋 Audio ID: {audio_id}")
-        print(f"� De: {from_number}")
-        sys.stdout.flush()
-        
-        # Descargar audio desde WhatsApp
-        print("📥 DESCARGANDO AUDIO DESDE WHATSAPP...")
-        sys.stdout.flush()
+    """
+    Procesar mensaje de audio de WhatsApp.
+    Una falla lanza una excepción para que la cola reintente con backoff; el aviso al
+    usuario sale una sola vez, cuando no quedan reintentos (avisar_falla_audio)
+    """
+    log.info("🎵 INICIANDO PROCESAMIENTO DE AUDIO")
+    
+    # Obtener información del audio
+    audio_id = message['audio']['id']
+    from_number = message['from']
+    
+    log.debug(f"📋 Audio ID: {audio_id}")
+    log.debug(f"� De: {from_number}")
+    
+    # Descargar audio desde WhatsApp
+    log.info("📥 DESCARGANDO AUDIO DESDE WHATSAPP...")
+    with cola_trabajos.etapa('descarga'):
         audio_url = get_media_url(audio_id)
         audio_data = download_audio(audio_url)
-        print("✅ Audio descargado")
-        sys.stdout.flush()
-        
-        # Guardar audio temporalmente
-        print("💾 GUARDANDO AUDIO TEMPORALMENTE...")
-        sys.stdout.flush()
-        with tempfile.NamedTemporaryFile(suffix='.m4a', delete=False) as temp_file:
-            temp_file.write(audio_data)
-            temp_audio_path = temp_file.name
-        print(f"✅ Audio guardado en: {temp_audio_path}")
-        sys.stdout.flush()
-        
-        try:
-            # PROCESAMIENTO DE AUDIO CON CAPTURA DE ERRORES
-            print("🎙️ INTENTANDO TRANSCRIBIR CON GROQ...")
-            sys.stdout.flush()
-
-            try:
-                texto_transcrito = procesador_audio.transcribir_audio(temp_audio_path)
-                print(f"📝 TEXTO RECIBIDO DE GROQ: {texto_transcrito}")
-                sys.stdout.flush()
-
-                if not texto_transcrito or texto_transcrito.strip() == "":
-                    print("❌ ERROR: La transcripción está vacía")
-                    sys.stdout.flush()
-                    return
-
-            except Exception as transcribe_error:
-                print(f"❌ ERROR EN TRANSCRIPCIÓN: {transcribe_error}")
-                print(f"❌ TIPO DE ERROR: {type(transcribe_error).__name__}")
-                import traceback
-                print(f"❌ TRACEBACK: {traceback.format_exc()}")
-                sys.stdout.flush()
-                return
-
-            # Extraer datos de la reserva
-            print("🔍 EXTRAYENDO DATOS DE LA RESERVA...")
-            sys.stdout.flush()
-
-            datos_reserva = procesador_audio.extraer_datos_reserva(texto_transcrito)
-            print(f"📊 DATOS EXTRAÍDOS: {datos_reserva}")
-            sys.stdout.flush()
-
-            if not datos_reserva:
-                print("❌ ERROR: No se pudieron extraer datos de la reserva")
-                sys.stdout.flush()
-                return
-
-            # Cargar en SACH
-            print("🤖 INICIANDO PROCESO SACH...")
-            sys.stdout.flush()
-            robot = RobotSACH()
-            resultado = robot.procesar_cliente(datos_reserva)
-            sys.stdout.flush()
-            
-            if resultado:
-                response_text = f"✅ ¡Reserva procesada!\n\n📋 Datos:\n• Cliente: {datos_reserva.get('nombre', 'N/A')}\n• Cabaña: {datos_reserva.get('cabana', 'N/A')}\n• Entrada: {datos_reserva.get('fecha_entrada', 'N/A')}\n• Noches: {datos_reserva.get('noches', 'N/A')}\n• Precio: ${datos_reserva.get('precio', 'N/A')}\n\n🎉 Cliente guardado en SACH"
-                print("✅ PROCESO SACH COMPLETADO EXITOSAMENTE")
-                print("✅ CLIENTE GUARDADO EN SACH")
-                sys.stdout.flush()
-            else:
-                response_text = "❌ Error al procesar la reserva. Por favor, intenta nuevamente."
-                print("❌ PROCESO SACH FALLÓ - RESULTADO FALSE")
-            sys.stdout.flush()
-            
-            # Enviar respuesta a WhatsApp
-            print("📱 ENVIANDO RESPUESTA A WHATSAPP...")
-            sys.stdout.flush()
+    log.info("✅ Audio descargado")
+    
+    log.info("🎙️ INTENTANDO TRANSCRIBIR CON GROQ...")
+    with cola_trabajos.etapa('transcripcion'):
+        texto_transcrito = procesador_audio.transcribir_audio(audio_data)
+    if texto_transcrito is None:
+        # Error de Groq (ya logueado): en el reintento el audio se vuelve a transcribir
+        raise RuntimeError("La transcripción falló")
+    log.info(f"📝 TEXTO RECIBIDO DE GROQ: {texto_transcrito}")
+    
+    if texto_transcrito.strip() == "":
+        log.error("❌ ERROR: La transcripción está vacía")
+        return
+
+    # Extraer datos de la reserva
+    log.info("🔍 EXTRAYENDO DATOS DE LA RESERVA...")
+
+    with cola_trabajos.etapa('extraccion'):
+        datos_reserva = procesador_audio.extraer_datos_reserva(texto_transcrito)
+    log.info(f"📊 DATOS EXTRAÍDOS: {datos_reserva}")
+
+    if not datos_reserva:
+        raise RuntimeError("No se pudieron extraer datos de la reserva")
+
+    # Cargar en SACH
+    log.info("🤖 INICIANDO PROCESO SACH...")
+    with cola_trabajos.etapa('sach'):
+        robot = RobotSACH(pool=pool_navegadores)
+        resultado = robot.procesar_cliente(datos_reserva)
+    
+    if not resultado:
+        log.error("❌ PROCESO SACH FALLÓ")
+        if not getattr(resultado, "reintentable", True):
+            # El formulario salió y SACH no confirmó: otro intento podría duplicar el cliente
+            raise ErrorDefinitivo(f"Guardado sin confirmar en SACH ({resultado.error}): revisar si el cliente quedó creado")
+        raise RuntimeError(getattr(resultado, "error", None) or "No se pudo cargar el cliente en SACH")
+    
+    numero_cliente = f" (N° {resultado.id_cliente})" if getattr(resultado, "id_cliente", None) else ""
+    estado_cliente = "👤 Cliente ya registrado en SACH" if getattr(resultado, "existente", False) else "🎉 Cliente guardado en SACH"
+    if getattr(resultado, "posible_duplicado", None):
+        estado_cliente += f"\n⚠️ Ya había un cliente con el mismo nombre (N° {resultado.posible_duplicado}): revisar en SACH"
+    response_text = f"✅ ¡Reserva procesada!\n\n📋 Datos:\n• Cliente: {datos_reserva.get('nombre', 'N/A')}\n• Cabaña: {datos_reserva.get('cabana', 'N/A')}\n• Entrada: {datos_reserva.get('fecha_entrada', 'N/A')}\n• Noches: {datos_reserva.get('noches', 'N/A')}\n• Precio: ${datos_reserva.get('precio', 'N/A')}\n\n{estado_cliente}{numero_cliente}"
+    log.info("✅ PROCESO SACH COMPLETADO EXITOSAMENTE")
+    
+    # Enviar respuesta a WhatsApp. La reserva ya está en SACH: si falla el envío no se reintenta el trabajo
+    log.info("📱 ENVIANDO RESPUESTA A WHATSAPP...")
+    try:
+        with cola_trabajos.etapa('respuesta'):
             send_whatsapp_message(from_number, response_text)
-            print("✅ RESPUESTA ENVIADA")
-            sys.stdout.flush()
-            
-        finally:
-            # Limpiar archivo temporal
-            print("🗑️ LIMPIANDO ARCHIVO TEMPORAL...")
-            sys.stdout.flush()
-            os.unlink(temp_audio_path)
-            print("✅ ARCHIVO TEMPORAL ELIMINADO")
-            sys.stdout.flush()
-            
+        log.info("✅ RESPUESTA ENVIADA")
     except Exception as e:
-        print(f"❌ ERROR EN PROCESAMIENTO DE AUDIO: {e}")
-        print(f"❌ TIPO DE ERROR: {type(e).__name__}")
-        import traceback
-        print(f"❌ TRACEBACK COMPLETO: {traceback.format_exc()}")
-        sys.stdout.flush()
-        
-        # Enviar mensaje de error a WhatsApp
-        try:
-            from_number = message['from']
-            error_text = f"❌ Error procesando audio: {str(e)[:100]}"
-            send_whatsapp_message(from_number, error_text)
-        except:
-            pass
+        log.exception(f"❌ ERROR ENVIANDO LA RESPUESTA ({type(e).__name__}): {e}")
 
+@con_id_de_mensaje
+def avisar_falla_audio(message, error):
+    """La cola agotó los reintentos del audio (o la falla es definitiva): un único aviso al usuario"""
+    motivo = (error or "").strip().splitlines()[-1:] or ["error desconocido"]
+    send_whatsapp_message(message['from'], f"❌ Error procesando audio: {motivo[0][:100]}")
+
+@con_id_de_mensaje
 def handle_text_message(message):
-    """Procesar mensaje de texto de WhatsApp"""
-    try:
-        text = message['text']['body']
-        from_number = message['from']
-        
-        print(f"💬 Texto recibido de {from_number}: {text}")
-        
-        # Mensaje de bienvenida y ayuda
-        if 'hola' in text.lower() or 'help' in text.lower():
-            response_text = """🤖 ¡Hola! Soy el asistente de voz para SACH.
+    """Procesar mensaje de texto de WhatsApp (si el envío falla, la cola reintenta)"""
+    text = message['text']['body']
+    from_number = message['from']
+    
+    log.info("💬 Texto recibido")
+    log.debug(f"💬 Texto de {from_number}: {text}")
+    
+    # Mensaje de bienvenida y ayuda
+    if 'hola' in text.lower() or 'help' in text.lower():
+        response_text = """🤖 ¡Hola! Soy el asistente de voz para SACH.
 
 🎙️ Para procesar una reserva:
 1. Envíame un mensaje de voz con los datos de la reserva
@@ -246,8 +223,8 @@ def handle_text_message(message):
 • Precio total
 
 🚀 ¡Estoy listo para ayudarte!"""
-        else:
-            response_text = """🎙️ Por favor, envíame un mensaje de voz con los datos de la reserva.
+    else:
+        response_text = """🎙️ Por favor, envíame un mensaje de voz con los datos de la reserva.
 
 📋 Menciona:
 • Nombre del cliente
@@ -256,54 +233,32 @@ def handle_text_message(message):
 • Noches y precio
 
 🤖 Procesaré todo automáticamente."""
-        
-        send_whatsapp_message(from_number, response_text)
-        
-    except Exception as e:
-        print(f"Error processing text message: {e}")
+    
+    send_whatsapp_message(from_number, response_text)
 
+@metricas.medido("get_media_url")
 def get_media_url(media_id):
     """Obtener URL de descarga de media de WhatsApp"""
-    url = f"https://graph.facebook.com/v18.0/{media_id}"
-    headers = {
-        'Authorization': f'Bearer {WHATSAPP_TOKEN}'
-    }
-    
-    print(f"🔍 DIAGNÓSTICO: Obteniendo URL para media_id: {media_id}")
-    print(f"🔍 Token usado (primeros 20 chars): {WHATSAPP_TOKEN[:20] if WHATSAPP_TOKEN else 'VACÍO'}...")
-    sys.stdout.flush()
-    
-    response = requests.get(url, headers=headers)
+    log.debug(f"🔍 DIAGNÓSTICO: Obteniendo URL para media_id: {media_id}")
     
-    if response.status_code == 200:
-        return response.json()['url']
-    else:
-        print(f"❌ ERROR {response.status_code}: {response.text}")
-        print(f"❌ Headers enviados: {headers}")
-        sys.stdout.flush()
-        raise Exception(f"Error getting media URL: {response.status_code} - {response.text}")
+    try:
+        return cliente_graph.obtener_url_media(media_id)
+    except ErrorGraph as e:
+        log.error(f"❌ ERROR {e.status_code}: {e.cuerpo}")
+        raise
 
+@metricas.medido("download_audio")
 def download_audio(audio_url):
-    """Descargar archivo de audio"""
-    headers = {
-        'Authorization': f'Bearer {WHATSAPP_TOKEN}'
-    }
-    
-    response = requests.get(audio_url, headers=headers)
-    if response.status_code == 200:
-        return response.content
-    else:
-        raise Exception(f"Error downloading audio: {response.status_code}")
+    """Descargar archivo de audio en streaming a un único buffer en memoria"""
+    buffer = io.BytesIO()
+    for chunk in cliente_graph.descargar_media_stream(audio_url):
+        buffer.write(chunk)
+    buffer.seek(0)
+    return buffer
 
+@metricas.medido("send_whatsapp_message")
 def send_whatsapp_message(to_number, message_text):
     """Enviar mensaje de WhatsApp"""
-    url = f"https://graph.facebook.com/v18.0/{WHATSAPP_PHONE_NUMBER_ID}/messages"
-    
-    headers = {
-        'Authorization': f'Bearer {WHATSAPP_TOKEN}',
-        'Content-Type': 'application/json'
-    }
-    
     # Formatear número para WhatsApp - usar formato 54 + número sin 9
     formatted_number = to_number
     
@@ -324,31 +279,131 @@ def send_whatsapp_message(to_number, message_text):
     if formatted_number.startswith('+'):
         formatted_number = formatted_number[1:]
     
-    print(f"📱 Número original: {to_number}")
-    print(f"📱 Número formateado: {formatted_number}")
-    
-    data = {
-        "messaging_product": "whatsapp",
-        "to": formatted_number,
-        "type": "text",
-        "text": {
-            "body": message_text
-        }
-    }
+    log.debug(f"📱 Número original: {to_number} - formateado: {formatted_number}")
     
-    response = requests.post(url, headers=headers, json=data)
+    response = cliente_graph.enviar_texto(formatted_number, message_text)
     if response.status_code == 200:
-        print(f"✅ Mensaje enviado a {to_number}")
-    else:
-        print(f"❌ Error enviando mensaje: {response.status_code} - {response.text}")
+        log.info("✅ Mensaje enviado")
+        return True
+    log.error(f"❌ Error enviando mensaje: {response.status_code} - {response.text}")
+    return False
+
+# Workers de la cola: drenan los mensajes encolados por el webhook
+cola_trabajos.registrar('audio', handle_audio_message, al_fallar=avisar_falla_audio)
+cola_trabajos.registrar('text', handle_text_message)
+
+def iniciar_servicios():
+    """
+    Arranca los hilos de fondo del proceso: calentado del pool, refresco de sesión y workers
+    de la cola. Con gunicorn corre en cada worker ya forkeado (gunicorn.conf.py).
+    """
+    # Carga el índice de clientes antes de la primera reserva
+    obtener_indice_clientes()
+    sonda_preparacion.iniciar()
+    refresco_sesion.iniciar()
+    cola_trabajos.iniciar()
+
+def detener_servicios(timeout=None):
+    """
+    Apagado ordenado: no se toman trabajos nuevos, se esperan las reservas en curso
+    (hasta timeout segundos) y se cierran los navegadores guardando la sesión
+    """
+    log.info("🛑 Deteniendo: terminando reservas en curso")
+    refresco_sesion.detener()
+    if not cola_trabajos.detener(timeout=timeout):
+        log.warning("⚠️ Quedaron trabajos en curso; se reencolan en el próximo inicio")
+    pool_navegadores.cerrar()
+    log.info("✅ Navegadores cerrados")
+
+# Medidores que /metrics lee en cada scrape
+metricas.registrar_medidor("sach_cola_trabajos", "Trabajos pendientes y en proceso en la cola", lambda: {
+    'estado="pendiente"': cola_trabajos.profundidad(),
+    'estado="procesando"': cola_trabajos.estadisticas()["procesando"],
+})
+metricas.registrar_medidor("sach_pool_navegadores", "Navegadores del pool por estado", lambda: {
+    f'estado="{estado}"': pool_navegadores.estadisticas()[estado] for estado in ("ocupados", "libres", "esperando")
+})
+metricas.registrar_medidor("sach_listo", "1 si el pool de navegadores está caliente y conectado", lambda: int(sonda_preparacion.listo))
 
 @app.route('/')
 def home():
     return Response("🤖 Asistente SACH Voz - WhatsApp Webhook Activo", status=200)
 
 @app.route('/health')
+@app.route('/health/live')
 def health():
+    """Liveness: el proceso responde (no depende del navegador)"""
     return Response("✅ OK", status=200)
 
+@app.route('/health/ready')
+def health_ready():
+    """Readiness: el pool de navegadores está caliente y tiene navegadores conectados"""
+    estado = sonda_preparacion.estado()
+    return jsonify(estado), 200 if estado["listo"] else 503
+
+@app.route('/pool')
+def pool_stats():
+    """Ocupación del pool de navegadores"""
+    return jsonify(pool_navegadores.estadisticas())
+
+@app.route('/cola')
+def cola_stats():
+    """Profundidad de la cola y tiempos de espera/proceso por etapa"""
+    return jsonify(cola_trabajos.estadisticas())
+
+@app.route('/graph')
+def graph_stats():
+    """Latencia por endpoint de la Graph API"""
+    return jsonify(cliente_graph.estadisticas())
+
+@app.route('/cache')
+def cache_stats():
+    """Aciertos de las cachés de transcripción/extracción y tasa de extracciones sin LLM"""
+    return jsonify({
+        "transcripciones": procesador_audio.cache_transcripciones.estadisticas(),
+        "extracciones": procesador_audio.cache_extracciones.estadisticas(),
+        "extraccion": procesador_audio.estadisticas_extraccion(),
+    })
+
+@app.route('/esperas')
+def esperas_stats():
+    """Tiempo real por paso del robot vs los sleeps fijos anteriores"""
+    return jsonify(registro_esperas.reporte())
+
+@app.route('/selectores')
+def selectores_stats():
+    """Round trips de resolución de selectores con memoria vs sin ella"""
+    return jsonify(obtener_resolutor().estadisticas())
+
+@app.route('/sesion')
+def sesion_stats():
+    """Validez de la sesión SACH, logins y entradas directas al formulario"""
+    return jsonify(obtener_gestor_sesion().estadisticas())
+
+@app.route('/recursos')
+def recursos_stats():
+    """Requests bloqueados por tipo/terceros y aciertos de la caché de estáticos"""
+    return jsonify(obtener_politica_recursos().estadisticas())
+
+@app.route('/clientes')
+def clientes_stats():
+    """Clientes en el índice local y reservas que no crearon un cliente nuevo en SACH"""
+    return jsonify(obtener_indice_clientes().estadisticas())
+
+@app.route('/metrics')
+def metrics():
+    """Histogramas de las etapas y medidores en formato Prometheus"""
+    return Response(metricas.exportar_prometheus(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/dedup')
+def dedup_stats():
+    """Mensajes duplicados descartados y tasa de aciertos"""
+    return jsonify(deduplicador.estadisticas())
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 8080)))
+    # Servidor de desarrollo; en producción: gunicorn -c gunicorn.conf.py app:app
+    iniciar_servicios()
+    try:
+        app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 8080)))
+    finally:
+        detener_servicios()
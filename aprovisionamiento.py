@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Aprovisionamiento de Chromium y sonda de preparación
+La instalación del navegador es un paso explícito y cacheado (build de Docker o Procfile),
+y el arranque de los navegadores se hace en segundo plano sin bloquear a Flask
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import subprocess
+import threading
+from importlib.metadata import version
+from playwright.sync_api import sync_playwright
+
+log = logging.getLogger("aprovisionamiento")
+
+MARCA_APROVISIONADO = os.getenv('PLAYWRIGHT_MARCA', '.playwright_aprovisionado.json')
+
+
+def _ruta_chromium():
+    with sync_playwright() as p:
+        return p.chromium.executable_path
+
+
+def chromium_instalado():
+    """True si la marca coincide con la versión de Playwright y el ejecutable existe"""
+    try:
+        with open(MARCA_APROVISIONADO, 'r') as f:
+            marca = json.load(f)
+    except Exception:
+        return False
+    return marca.get("playwright") == version("playwright") and os.path.exists(marca.get("ejecutable", ""))
+
+
+def aprovisionar_chromium(con_dependencias=False, forzar=False):
+    """Instala Chromium una sola vez; las siguientes llamadas solo leen la marca"""
+    if not forzar and chromium_instalado():
+        log.info("✅ Chromium ya aprovisionado")
+        return True
+
+    # Puede estar instalado (imagen de Playwright) aunque no haya marca todavía
+    ejecutable = _ruta_chromium()
+    if forzar or not os.path.exists(ejecutable):
+        log.info("🔧 Instalando Chromium de Playwright...")
+        comando = [sys.executable, "-m", "playwright", "install", "chromium"]
+        if con_dependencias:
+            comando.append("--with-deps")
+        subprocess.run(comando, check=True)
+        ejecutable = _ruta_chromium()
+
+    with open(MARCA_APROVISIONADO, 'w') as f:
+        json.dump({"playwright": version("playwright"), "ejecutable": ejecutable, "fecha": time.time()}, f)
+    log.info(f"✅ Chromium aprovisionado: {ejecutable}")
+    return True
+
+
+class SondaPreparacion:
+    """
+    Calienta el pool de navegadores en segundo plano.
+    El proceso está vivo desde el primer momento; está listo mientras el pool tenga navegadores conectados.
+    Si se caen todos, deja de estar listo y vuelve a calentar el pool.
+    """
+
+    def __init__(self, pool, aprovisionar=False, espera_max=60):
+        self.pool = pool
+        self.aprovisionar = aprovisionar
+        self.espera_max = espera_max
+
+        self.error = None
+        self.intentos = 0
+        self.recalentamientos = 0
+        self.inicio = time.time()
+        self.listo_en = None
+        self._calentado = False
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._correr, name="sonda-preparacion", daemon=True)
+                self._hilo.start()
+
+    def _correr(self):
+        espera = 2
+        while not self._calentado:
+            self.intentos += 1
+            try:
+                if self.aprovisionar:
+                    aprovisionar_chromium()
+                self.pool.calentar()
+                self._calentado = True
+                self.error = None
+                if self.listo_en is None:
+                    self.listo_en = time.time()
+                    log.info(f"✅ Pool de navegadores caliente en {self.listo_en - self.inicio:.1f}s")
+                else:
+                    log.info("✅ Pool de navegadores caliente de nuevo")
+            except Exception as e:
+                self.error = str(e)
+                log.warning(f"⚠️ Navegadores todavía no disponibles (intento {self.intentos}): {e}")
+                time.sleep(espera)
+                espera = min(espera * 2, self.espera_max)
+
+    def verificar(self):
+        """True si el pool ya se calentó y sigue teniendo navegadores conectados; si no queda ninguno, lo recalienta"""
+        if not self._calentado:
+            return False
+        if self.pool.vivos():
+            return True
+        with self._lock:
+            if not self._calentado:
+                return False
+            self._calentado = False
+            self.recalentamientos += 1
+        log.error("❌ Ningún navegador del pool está conectado - recalentando")
+        self.iniciar()
+        return False
+
+    @property
+    def listo(self):
+        return self.verificar()
+
+    def estado(self):
+        return {
+            "listo": self.listo,
+            "error": self.error,
+            "intentos": self.intentos,
+            "recalentamientos": self.recalentamientos,
+            "segundos_hasta_listo": round(self.listo_en - self.inicio, 1) if self.listo_en else None,
+            "pool": self.pool.estadisticas(),
+        }
+
+
+def main():
+    # Corre en el build de Docker antes de copiar el resto del código: sin bitacora, logging simple a stdout
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+    con_dependencias = "--with-deps" in sys.argv
+    forzar = "--forzar" in sys.argv
+    try:
+        aprovisionar_chromium(con_dependencias=con_dependencias, forzar=forzar)
+    except Exception as e:
+        log.error(f"❌ Error aprovisionando Chromium: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,11 +9,18 @@ import json
 import sys
 from procesar_audio import ProcesadorAudio
 from cargar_reserva import RobotSACH
+from pool_navegadores import PoolNavegadores
+from bitacora import configurar_logging
 
 class AsistenteCompleto:
     def __init__(self):
         self.procesador_audio = ProcesadorAudio()
-        self.robot_sach = RobotSACH()
+        self.pool_navegadores = PoolNavegadores(tamano=1)
+        self.robot_sach = RobotSACH(pool=self.pool_navegadores)
+    
+    def cerrar(self):
+        """Cierra el navegador del pool guardando la sesión"""
+        self.pool_navegadores.cerrar()
     
     def procesar_y_cargar(self, archivo_audio):
         """Procesa el audio y carga el cliente en SACH"""
@@ -40,6 +47,7 @@ class AsistenteCompleto:
         return resultado
 
 def main():
+    configurar_logging(formato_por_defecto="texto")
     if len(sys.argv) != 2:
         print("Uso: python asistente_completo.py <archivo_audio>")
         print("Ejemplo: python asistente_completo.py audios_prueba/reserva.wav")
@@ -47,6 +55,7 @@ def main():
     
     archivo_audio = sys.argv[1]
     
+    asistente = None
     try:
         asistente = AsistenteCompleto()
         resultado = asistente.procesar_y_cargar(archivo_audio)
@@ -61,6 +70,9 @@ def main():
         print("\n⏹️  Proceso cancelado por el usuario")
     except Exception as e:
         print(f"\n❌ Error: {e}")
+    finally:
+        if asistente:
+            asistente.cerrar()
 
 if __name__ == "__main__":
     main()
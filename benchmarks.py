@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+Benchmarks del asistente SACH
+Uso: python benchmarks.py <nombre> [opciones]
+"""
+
+import os
+import sys
+import time
+import json
+import asyncio
+import argparse
+import contextlib
+import resource
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def bench_deduplicador(args):
+    """Tiempo por consulta del deduplicador a distintos tamaños (debe ser constante)"""
+    from deduplicador import DeduplicadorMensajes
+
+    print(f"{'entradas':>10} | {'alta (µs/op)':>13} | {'duplicado (µs/op)':>18}")
+    for tamano in args.tamanos:
+        dedup = DeduplicadorMensajes(ttl=3600, max_entradas=tamano + args.muestras, ruta_db="")
+        for i in range(tamano):
+            dedup.es_duplicado(f"wamid.{i}")
+
+        inicio = time.perf_counter()
+        for i in range(args.muestras):
+            dedup.es_duplicado(f"wamid.nuevo.{i}")
+        alta = (time.perf_counter() - inicio) / args.muestras * 1e6
+
+        inicio = time.perf_counter()
+        for i in range(args.muestras):
+            dedup.es_duplicado(f"wamid.{i % tamano}")
+        duplicado = (time.perf_counter() - inicio) / args.muestras * 1e6
+
+        print(f"{tamano:>10} | {alta:>13.2f} | {duplicado:>18.2f}")
+
+
+def _servidor_audio(tamano_bytes):
+    """Servidor local que sirve una nota de voz falsa y acepta el upload de transcripción"""
+    audio = os.urandom(tamano_bytes)
+
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(audio)))
+            self.end_headers()
+            self.wfile.write(audio)
+
+        def do_POST(self):
+            restante = int(self.headers.get("Content-Length", 0))
+            while restante > 0:
+                restante -= len(self.rfile.read(min(restante, 64 * 1024)))
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def _pico_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _caso_audio_memoria(modo, concurrencia, tamano_mb):
+    """Corre un caso en este proceso e imprime 'pico_mb delta_mb segundos'"""
+    from cliente_graph import ClienteGraph
+    import io
+
+    servidor = _servidor_audio(tamano_mb * 1024 * 1024)
+    base = f"http://127.0.0.1:{servidor.server_port}"
+    cliente = ClienteGraph("token", "0", base_url=base, tamano_pool=concurrencia)
+    rss_base = _pico_rss_mb()
+
+    def archivo_temporal(_):
+        # Camino anterior: response.content + NamedTemporaryFile + file.read()
+        datos = cliente.descargar_media(f"{base}/audio")
+        with tempfile.NamedTemporaryFile(suffix=".m4a", delete=False) as temp_file:
+            temp_file.write(datos)
+            ruta = temp_file.name
+        try:
+            with open(ruta, "rb") as f:
+                contenido = f.read()
+            cliente.session.post(f"{base}/transcribir", data=contenido)
+        finally:
+            os.unlink(ruta)
+
+    def streaming(_):
+        # Camino nuevo: chunks a un único buffer que se sube como archivo
+        buffer = io.BytesIO()
+        for chunk in cliente.descargar_media_stream(f"{base}/audio"):
+            buffer.write(chunk)
+        buffer.seek(0)
+        cliente.session.post(f"{base}/transcribir", data=buffer)
+
+    funcion = archivo_temporal if modo == "archivo_temporal" else streaming
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        list(executor.map(funcion, range(concurrencia)))
+    segundos = time.perf_counter() - inicio
+
+    pico = _pico_rss_mb()
+    print(f"{pico:.1f} {pico - rss_base:.1f} {segundos:.3f}")
+    servidor.shutdown()
+
+
+def bench_audio_memoria(args):
+    """Pico de RSS descargando y subiendo N notas de voz concurrentes, antes y después"""
+    if args.caso:
+        modo, concurrencia = args.caso
+        _caso_audio_memoria(modo, int(concurrencia), args.tamano_mb)
+        return
+
+    print(f"Notas de voz de {args.tamano_mb} MB")
+    print(f"{'concurrentes':>12} | {'modo':>16} | {'pico RSS (MB)':>13} | {'delta (MB)':>10} | {'tiempo (s)':>10}")
+    for concurrencia in args.concurrencia:
+        for modo in ("archivo_temporal", "streaming"):
+            # Un proceso por caso: el pico de RSS no baja dentro de un mismo proceso
+            salida = subprocess.run(
+                [sys.executable, __file__, "audio_memoria", "--tamano-mb", str(args.tamano_mb),
+                 "--caso", modo, str(concurrencia)],
+                capture_output=True, text=True, check=True
+            ).stdout.split()
+            pico, delta, segundos = salida[-3:]
+            print(f"{concurrencia:>12} | {modo:>16} | {pico:>13} | {delta:>10} | {segundos:>10}")
+
+
+def _servidor_groq_falso(latencia):
+    """Imita los endpoints de Groq (Whisper y chat) con una latencia fija"""
+    respuesta_chat = json.dumps({
+        "id": "chatcmpl-falso", "object": "chat.completion", "created": 0, "model": "llama-3.3-70b-versatile",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": json.dumps({
+            "nombre": "María García", "cabana": "Cabaña 5", "fecha_entrada": "2024-02-15", "noches": 3, "precio": 18000
+        })}}],
+    }).encode()
+
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(latencia)
+            if self.path.endswith("/audio/transcriptions"):
+                # Transcripción incompleta a propósito (sin año) para que también se llame al LLM
+                cuerpo, tipo = "Soy María García, cabaña cinco el 15 de febrero, 3 noches".encode(), "text/plain"
+            else:
+                cuerpo, tipo = respuesta_chat, "application/json"
+            self.send_response(200)
+            self.send_header("Content-Type", tipo)
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def bench_groq_async(args):
+    """Notas de voz concurrentes en un solo event loop contra un Groq falso local"""
+    servidor = _servidor_groq_falso(args.latencia)
+    os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{servidor.server_port}"
+    os.environ.setdefault("GROQ_API_KEY", "falsa")
+
+    from limitador import LimitadorGroq
+    from cache_transcripciones import CacheTranscripciones
+    from procesar_audio import ProcesadorAudioAsync
+
+    async def correr():
+        limitador = LimitadorGroq(
+            max_concurrentes=args.max_concurrentes,
+            rpm={"transcripcion": args.rpm, "extraccion": args.rpm}
+        )
+        procesador = ProcesadorAudioAsync(CacheTranscripciones(directorio=""), limitador=limitador)
+        # Audios distintos para que no pegue la caché
+        audios = [os.urandom(1024) + str(i).encode() for i in range(args.notas)]
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(*(procesador.procesar_audio(a) for a in audios))
+        segundos = time.perf_counter() - inicio
+        return resultados, segundos, limitador.estadisticas()
+
+    resultados, segundos, stats = asyncio.run(correr())
+    correctos = sum(1 for r in resultados if r and r.get("nombre"))
+    secuencial = args.notas * args.latencia * 2
+    print(f"Notas: {args.notas} ({correctos} ok) | latencia Groq falsa: {args.latencia}s | RPM: {args.rpm}")
+    print(f"Tiempo total: {segundos:.2f}s (secuencial ~{secuencial:.1f}s) | {args.notas / segundos:.1f} notas/s")
+    print(f"Limitador: {stats}")
+    servidor.shutdown()
+
+FORMULARIO_HTML = """
+<form>
+  <input name="signup_token" type="hidden">
+  <input id="ce_hue_nro_documento" name="ce_hue[nro_documento]" type="text">
+  <input name="ce_hue[nombres]" type="text">
+  <input name="ce_hue[apellido]" type="text">
+  <input name="ce_hue[email]" type="email">
+  <input name="ce_hue[movil]" type="text">
+  <input name="ce_hue[telefono]" type="text">
+  <input name="ce_hue[domicilio]" type="text">
+  <input name="ce_hue[localidad]" type="text">
+  <input name="ce_hue[observaciones]" type="text">
+</form>
+<script>
+  window.eventos = 0;
+  document.querySelectorAll('input').forEach(el => {
+    el.addEventListener('input', () => window.eventos++);
+    el.addEventListener('change', () => window.eventos++);
+  });
+</script>
+"""
+
+
+def _latencias(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return tiempos[len(tiempos) // 2], tiempos[int(len(tiempos) * 0.95) - 1]
+
+
+def bench_formulario(args):
+    """Latencia por formulario: diagnóstico + fill por campo vs llenado en un solo evaluate"""
+    from playwright.sync_api import sync_playwright
+    from formulario import llenar_campos
+
+    campos = {
+        "dni": (['#ce_hue_nro_documento', 'input[name*="documento"]'], '22455958'),
+        "nombres": (['input[name*="nombre"], input[name*="nombres"]'], "Juan Manuel"),
+        "apellido": (['input[name*="apellido"]'], "Pérez"),
+        "email": (['input[name*="email"], input[type="email"]'], "prueba_test@hotmail.com"),
+        "movil": (['input[name*="movil"], input[name*="celular"]'], "1122334455"),
+    }
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        page.set_content(FORMULARIO_HTML)
+
+        def por_campo():
+            # Lo que hacía llenar_formulario_cliente: 3 get_attribute por input y fill por campo
+            for inp in page.locator('input').all()[:10]:
+                inp.get_attribute('name')
+                inp.get_attribute('id')
+                inp.get_attribute('type')
+            dni = page.locator(campos["dni"][0][0]).first
+            dni.fill(campos["dni"][1])
+            dni.input_value()
+            for nombre in ("nombres", "apellido", "email", "movil"):
+                selectores, valor = campos[nombre]
+                page.fill(selectores[0], valor)
+
+        def en_lote():
+            resultados = llenar_campos(page, campos)
+            assert all(r["ok"] for r in resultados.values()), resultados
+
+        for nombre, funcion in (("fill por campo", por_campo), ("un solo evaluate", en_lote)):
+            funcion()
+            p50, p95 = _latencias(funcion, args.repeticiones)
+            print(f"{nombre:<18} p50 {p50:7.2f} ms | p95 {p95:7.2f} ms")
+        print(f"Eventos input/change disparados: {page.evaluate('window.eventos')}")
+        browser.close()
+
+def bench_recursos(args):
+    """Carga de /iniciar del SACH local con assets pesados: sin política vs bloqueo + caché de estáticos"""
+    from playwright.sync_api import sync_playwright
+    from recursos import PoliticaRecursos
+    from mock_sach import ServidorMockSACH
+
+    mock = ServidorMockSACH(latencia=args.latencia, assets_pesados=True)
+    url = f"{mock.iniciar()}/iniciar"
+    politicas = {
+        "sin política": None,
+        "con política": PoliticaRecursos(dominios_permitidos=["127.0.0.1"], cachear_estaticos=True),
+    }
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        for nombre, politica in politicas.items():
+            tiempos = []
+            antes = mock.estadisticas()
+            for _ in range(args.cargas):
+                # Contexto nuevo en cada carga, como un robot o un slot recién reciclado
+                context = browser.new_context()
+                if politica:
+                    politica.aplicar(context)
+                page = context.new_page()
+                inicio = time.perf_counter()
+                page.goto(url, wait_until="load")
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+                context.close()
+            despues = mock.estadisticas()
+            requests = (despues["requests"] - antes["requests"]) / args.cargas
+            mb = (despues["bytes"] - antes["bytes"]) / (1024 * 1024) / args.cargas
+            print(f"{nombre:<14} p50 {_percentil(tiempos, 50):7.1f} ms | "
+                  f"{requests:5.1f} requests y {mb:6.2f} MB por carga")
+            if politica:
+                print(f"  {politica.estadisticas()}")
+        browser.close()
+    mock.detener()
+
+
+def bench_clientes(args):
+    """Latencia del índice de clientes por DNI, nombre exacto, nombre con error de tipeo y cliente nuevo"""
+    import random
+    from indice_clientes import IndiceClientes
+
+    generador = random.Random(7)
+    nombres = ["juan", "maria", "jose", "ana", "carlos", "laura", "pedro", "sofia", "martin", "lucia",
+               "diego", "valentina", "pablo", "camila", "jorge", "florencia", "luis", "julieta"]
+    apellidos = ["perez", "gonzalez", "rodriguez", "fernandez", "lopez", "martinez", "garcia", "sanchez",
+                 "romero", "sosa", "torres", "alvarez", "ruiz", "ramirez", "flores", "benitez", "acosta"]
+
+    def nombre_al_azar():
+        # Apellidos compuestos inventados para que haya muchos distintos, como en un padrón real
+        return (f"{generador.choice(nombres)} {generador.choice(nombres)} "
+                f"{generador.choice(apellidos)} {generador.choice(apellidos)}{generador.randint(1, 500)}")
+
+    def con_error(nombre):
+        i = generador.randrange(len(nombre))
+        return nombre[:i] + ("x" if nombre[i] != "x" else "y") + nombre[i + 1:]
+
+    print(f"{'clientes':>10} | {'carga (s)':>9} | {'dni (µs)':>9} | {'nombre (µs)':>11} | "
+          f"{'error (µs)':>10} | {'p99 error':>9} | {'nuevo (µs)':>10} | {'hallados':>8}")
+    for tamano in args.tamanos:
+        indice = IndiceClientes(ruta_db="")
+        clientes = [({"nombre": nombre_al_azar(), "dni": str(20_000_000 + i)}, i) for i in range(tamano)]
+        inicio = time.perf_counter()
+        indice.registrar_varios(clientes)
+        carga = time.perf_counter() - inicio
+
+        muestra = [datos for datos, _ in generador.sample(clientes, min(args.muestras, tamano))]
+        casos = {
+            "dni": [{"dni": d["dni"]} for d in muestra],
+            "nombre": [{"nombre": d["nombre"]} for d in muestra],
+            "error": [{"nombre": con_error(d["nombre"])} for d in muestra],
+            "nuevo": [{"nombre": nombre_al_azar() + "zz"} for _ in muestra],
+        }
+        tiempos = {}
+        hallados = 0
+        for caso, consultas in casos.items():
+            tiempos[caso] = []
+            for consulta in consultas:
+                inicio = time.perf_counter()
+                encontrado = indice.buscar(consulta)
+                tiempos[caso].append((time.perf_counter() - inicio) * 1e6)
+                if caso == "error" and encontrado:
+                    hallados += 1
+
+        def promedio(caso):
+            return sum(tiempos[caso]) / len(tiempos[caso])
+
+        print(f"{tamano:>10} | {carga:>9.2f} | {promedio('dni'):>9.1f} | {promedio('nombre'):>11.1f} | "
+              f"{promedio('error'):>10.1f} | {_percentil(tiempos['error'], 99):>9.1f} | "
+              f"{promedio('nuevo'):>10.1f} | {hallados / len(muestra):>8.1%}")
+
+
+def _percentil(valores, p):
+    """Percentil por rango más cercano"""
+    ordenados = sorted(valores)
+    return ordenados[max(0, -(-len(ordenados) * p // 100) - 1)]
+
+
+def bench_sach(args):
+    """Latencia y throughput del robot contra el SACH local, por concurrencia y pestañas por navegador"""
+    from mock_sach import ServidorMockSACH
+
+    mock = ServidorMockSACH(latencia=args.latencia, jitter=args.jitter, assets_pesados=args.assets_pesados)
+    url = mock.iniciar()
+    directorio = tempfile.mkdtemp(prefix="bench_sach_")
+    # Antes de importar el robot: lee SACH_BASE_URL al cargarse el módulo
+    os.environ.update({
+        "SACH_BASE_URL": url,
+        "SACH_USER": mock.usuario,
+        "SACH_PASS": mock.password,
+        "SACH_SESION_BACKEND": "archivo",
+        "SACH_SESION_FILE": os.path.join(directorio, "sesion.json"),
+        "SACH_SELECTORES_FILE": os.path.join(directorio, "selectores.json"),
+        # Se mide el camino del navegador: la misma reserva repetida no debe saltearse por conocida
+        "SACH_CLIENTES": "0",
+    })
+    from cargar_reserva import RobotSACH
+    from pool_navegadores import PoolNavegadores
+
+    datos = {"nombre": "Juan Pérez", "cabana": "Cabaña 3", "fecha_entrada": "2024-02-15", "noches": 3, "precio": 15000}
+    print(f"SACH local: {url} | latencia {args.latencia}s + jitter {args.jitter}s | "
+          f"{args.reservas} reservas por nivel{' | sin pool' if args.sin_pool else ''}")
+    print(f"{'concurrencia':>12} | {'pestañas':>8} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'p99 (ms)':>9} | "
+          f"{'reservas/s':>10} | {'errores':>7} | {'logins':>6}")
+
+    peor_p95 = 0.0
+    for concurrencia in args.concurrencia:
+        for pestanas in args.pestanas:
+            pool = None if args.sin_pool else PoolNavegadores(tamano=concurrencia)
+            if pool:
+                pool.calentar()
+
+            def tanda(cantidad):
+                """Una reserva (procesar_cliente) o una tanda en pestañas (procesar_clientes)"""
+                inicio = time.perf_counter()
+                if pestanas == 1:
+                    oks = [RobotSACH(pool=pool).procesar_cliente(dict(datos))]
+                else:
+                    oks = RobotSACH(pool=pool, max_pestanas=pestanas).procesar_clientes([dict(datos)] * cantidad)
+                ms = (time.perf_counter() - inicio) * 1000
+                return [(ok, ms) for ok in oks]
+
+            tandas = [min(pestanas, args.reservas - i) for i in range(0, args.reservas, pestanas)]
+            logins_antes = mock.estadisticas()["logins"]
+            inicio = time.perf_counter()
+            # El robot es muy verboso: se silencia mientras se mide
+            with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+                with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+                    resultados = [r for rs in executor.map(tanda, tandas) for r in rs]
+            segundos = time.perf_counter() - inicio
+            if pool:
+                pool.cerrar()
+
+            # Con pestañas, la latencia de cada reserva es la de su tanda
+            tiempos = [ms for _, ms in resultados]
+            errores = sum(1 for ok, _ in resultados if not ok)
+            logins = mock.estadisticas()["logins"] - logins_antes
+            p95 = _percentil(tiempos, 95)
+            peor_p95 = max(peor_p95, p95)
+            print(f"{concurrencia:>12} | {pestanas:>8} | {_percentil(tiempos, 50):>9.1f} | {p95:>9.1f} | "
+                  f"{_percentil(tiempos, 99):>9.1f} | {len(resultados) / segundos:>10.2f} | {errores:>7} | {logins:>6}")
+
+    mock.detener()
+    if args.max_p95 and peor_p95 > args.max_p95:
+        print(f"❌ p95 {peor_p95:.1f} ms supera el máximo de {args.max_p95:.1f} ms")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del asistente SACH")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("deduplicador", help="Consulta del índice de mensajes vistos")
+    p.add_argument("--tamanos", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    p.add_argument("--muestras", type=int, default=100_000)
+    p.set_defaults(funcion=bench_deduplicador)
+
+    p = sub.add_parser("audio_memoria", help="Pico de RSS: archivo temporal vs streaming")
+    p.add_argument("--concurrencia", type=int, nargs="+", default=[1, 10, 50])
+    p.add_argument("--tamano-mb", type=int, default=5)
+    p.add_argument("--caso", nargs=2, metavar=("MODO", "CONCURRENCIA"), help=argparse.SUPPRESS)
+    p.set_defaults(funcion=bench_audio_memoria)
+
+    p = sub.add_parser("groq_async", help="Concurrencia de ProcesadorAudioAsync contra un Groq falso")
+    p.add_argument("--notas", type=int, default=50)
+    p.add_argument("--latencia", type=float, default=0.5)
+    p.add_argument("--max-concurrentes", type=int, default=25)
+    p.add_argument("--rpm", type=float, default=6000)
+    p.set_defaults(funcion=bench_groq_async)
+
+    p = sub.add_parser("formulario", help="Latencia de llenado del formulario de Nuevo Cliente")
+    p.add_argument("--repeticiones", type=int, default=200)
+    p.set_defaults(funcion=bench_formulario)
+
+    p = sub.add_parser("recursos", help="Carga de página con y sin política de recursos")
+    p.add_argument("--cargas", type=int, default=20)
+    p.add_argument("--latencia", type=float, default=0.02)
+    p.set_defaults(funcion=bench_recursos)
+
+    p = sub.add_parser("clientes", help="Búsqueda en el índice local de clientes (DNI, nombre, errores de tipeo)")
+    p.add_argument("--tamanos", type=int, nargs="+", default=[1_000, 100_000])
+    p.add_argument("--muestras", type=int, default=2_000)
+    p.set_defaults(funcion=bench_clientes)
+
+    p = sub.add_parser("sach", help="p50/p95/p99 de procesar_cliente contra el SACH local")
+    p.add_argument("--concurrencia", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--reservas", type=int, default=20, help="Reservas por nivel de concurrencia")
+    p.add_argument("--pestanas", type=int, nargs="+", default=[1],
+                   help="Reservas simultáneas por navegador (procesar_clientes), ej: 1 2 4 8")
+    p.add_argument("--latencia", type=float, default=0.05, help="Segundos por página del SACH local")
+    p.add_argument("--jitter", type=float, default=0.02)
+    p.add_argument("--assets-pesados", action="store_true")
+    p.add_argument("--sin-pool", action="store_true", help="Un Chromium por reserva (camino del CLI)")
+    p.add_argument("--max-p95", type=float, default=None, help="Falla (exit 1) si algún p95 lo supera, en ms")
+    p.set_defaults(funcion=bench_sach)
+
+    args = parser.parse_args()
+    return args.funcion(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
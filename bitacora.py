@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Logging estructurado del asistente
+Reemplaza los print + sys.stdout.flush() de los caminos calientes: los workers encolan el
+registro y un único hilo lo escribe, en JSON (o texto para los CLI), con un id de correlación
+por mensaje de WhatsApp y con tokens y contraseñas tapados.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import functools
+import contextvars
+import logging.handlers
+from contextlib import contextmanager
+
+# Id del mensaje de WhatsApp (o del trabajo) que se está procesando en este contexto
+id_correlacion = contextvars.ContextVar("id_correlacion", default=None)
+
+# Variables de entorno cuyos valores nunca deben aparecer en un log
+VARIABLES_SECRETAS = ("WHATSAPP_TOKEN", "WHATSAPP_VERIFY_TOKEN", "SACH_PASS", "GROQ_API_KEY")
+
+PATRONES_SECRETOS = [
+    (re.compile(r"(Bearer\s+)[A-Za-z0-9._\-]+", re.IGNORECASE), r"\1***"),
+    (re.compile(r"((?:access_token|token|password|contrase[ñn]a|api_key)['\"]?\s*[:=]\s*['\"]?)[^'\"\s,}&]+",
+                re.IGNORECASE), r"\1***"),
+]
+
+_listener = None
+
+
+def tapar_secretos(texto):
+    """Reemplaza tokens, contraseñas y los valores de las variables secretas por ***"""
+    for variable in VARIABLES_SECRETAS:
+        valor = os.getenv(variable)
+        if valor and len(valor) >= 4 and valor in texto:
+            texto = texto.replace(valor, "***")
+    for patron, reemplazo in PATRONES_SECRETOS:
+        texto = patron.sub(reemplazo, texto)
+    return texto
+
+
+class FiltroContexto(logging.Filter):
+    """Se ejecuta en el hilo que loguea: fija el mensaje ya tapado y el id de correlación"""
+
+    def filter(self, record):
+        mensaje = record.getMessage()
+        if record.exc_info:
+            mensaje = f"{mensaje}\n{logging.Formatter().formatException(record.exc_info)}"
+            record.exc_info = None
+            record.exc_text = None
+        record.msg = tapar_secretos(mensaje)
+        record.args = None
+        record.correlacion = id_correlacion.get()
+        return True
+
+
+class FormateadorJSON(logging.Formatter):
+    """Una línea JSON por registro; los 'extra' del llamador se agregan como campos"""
+
+    CAMPOS_ESTANDAR = set(vars(logging.makeLogRecord({}))) | {"message", "correlacion", "asctime"}
+
+    def format(self, record):
+        datos = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+        }
+        if getattr(record, "correlacion", None):
+            datos["correlacion"] = record.correlacion
+        for clave, valor in vars(record).items():
+            if clave not in self.CAMPOS_ESTANDAR and not clave.startswith("_"):
+                datos[clave] = valor
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class FormateadorTexto(logging.Formatter):
+    def format(self, record):
+        correlacion = getattr(record, "correlacion", None)
+        prefijo = f"[{correlacion}] " if correlacion else ""
+        return f"{self.formatTime(record, '%H:%M:%S')} {record.levelname:<7} {prefijo}{record.getMessage()}"
+
+
+def configurar_logging(nivel=None, formato=None, formato_por_defecto="json", salida=None):
+    """
+    Configura el logger raíz con un QueueHandler (los workers no esperan a stdout) y un
+    QueueListener que escribe en 'salida' (stdout por defecto). LOG_LEVEL=DEBUG habilita
+    los diagnósticos verbosos; LOG_FORMAT=json|texto. Es idempotente.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    nivel = (nivel or os.getenv("LOG_LEVEL", "INFO")).upper()
+    formato = formato or os.getenv("LOG_FORMAT", formato_por_defecto)
+
+    escritor = logging.StreamHandler(salida or sys.stdout)
+    escritor.setFormatter(FormateadorJSON() if formato == "json" else FormateadorTexto())
+
+    cola = queue.SimpleQueue()
+    entrada = logging.handlers.QueueHandler(cola)
+    entrada.addFilter(FiltroContexto())
+
+    raiz = logging.getLogger()
+    raiz.handlers[:] = [entrada]
+    raiz.setLevel(nivel)
+
+    _listener = logging.handlers.QueueListener(cola, escritor, respect_handler_level=True)
+    _listener.start()
+    # Vaciar la cola al salir para no perder las últimas líneas
+    atexit.register(_listener.stop)
+
+
+@contextmanager
+def con_correlacion(valor):
+    """Asocia un id de correlación a todo lo que se loguee dentro del bloque"""
+    token = id_correlacion.set(valor)
+    try:
+        yield
+    finally:
+        id_correlacion.reset(token)
+
+
+def con_id_de_mensaje(manejador):
+    """Decorador para manejadores de mensajes de WhatsApp: correlación = message['id']"""
+    @functools.wraps(manejador)
+    def envoltura(message, *args, **kwargs):
+        with con_correlacion(message.get('id')):
+            return manejador(message, *args, **kwargs)
+    return envoltura
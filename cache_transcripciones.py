@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Caché de transcripciones por contenido
+La misma nota de voz reenviada (mismo SHA-256) no vuelve a pasar por Whisper:
+LRU en memoria y, opcionalmente, un nivel en disco con límite de tamaño
+"""
+
+import os
+import io
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def hash_audio(archivo):
+    """
+    SHA-256 de un audio (bytes u objeto tipo archivo) sin copias extra.
+    Deja el archivo posicionado al inicio para que se pueda volver a leer.
+    """
+    if isinstance(archivo, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(archivo).hexdigest()
+    if isinstance(archivo, io.BytesIO):
+        return hashlib.sha256(archivo.getbuffer()).hexdigest()
+
+    posicion = archivo.tell()
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: archivo.read(64 * 1024), b""):
+        digest.update(chunk)
+    archivo.seek(posicion)
+    return digest.hexdigest()
+
+
+class CacheTranscripciones:
+    """LRU en memoria + nivel opcional en disco (un archivo por hash, se descartan los más viejos)"""
+
+    def __init__(self, max_entradas=None, directorio=None, max_mb_disco=None):
+        self.max_entradas = max_entradas or int(os.getenv('TRANSCRIPCIONES_CACHE_MAX', '1000'))
+        self.directorio = directorio if directorio is not None else os.getenv('TRANSCRIPCIONES_CACHE_DIR') or None
+        self.max_bytes_disco = int(float(max_mb_disco or os.getenv('TRANSCRIPCIONES_CACHE_MAX_MB', '50')) * 1024 * 1024)
+
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._aciertos_memoria = 0
+        self._aciertos_disco = 0
+        self._fallos = 0
+
+        if self.directorio:
+            os.makedirs(self.directorio, exist_ok=True)
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.txt")
+
+    def _guardar_memoria(self, clave, texto):
+        self._memoria[clave] = texto
+        self._memoria.move_to_end(clave)
+        while len(self._memoria) > self.max_entradas:
+            self._memoria.popitem(last=False)
+
+    def obtener(self, clave):
+        """Transcripción cacheada o None"""
+        with self._lock:
+            if clave in self._memoria:
+                self._memoria.move_to_end(clave)
+                self._aciertos_memoria += 1
+                return self._memoria[clave]
+
+        if self.directorio:
+            try:
+                with open(self._ruta(clave), 'r', encoding='utf-8') as f:
+                    texto = f.read()
+                os.utime(self._ruta(clave))  # LRU también en disco
+                with self._lock:
+                    self._aciertos_disco += 1
+                    self._guardar_memoria(clave, texto)
+                return texto
+            except FileNotFoundError:
+                pass
+
+        with self._lock:
+            self._fallos += 1
+        return None
+
+    def guardar(self, clave, texto):
+        if not texto:
+            return
+        with self._lock:
+            self._guardar_memoria(clave, texto)
+
+        if self.directorio:
+            # Escritura atómica: otro proceso nunca lee un archivo a medias
+            temporal = f"{self._ruta(clave)}.{os.getpid()}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                f.write(texto)
+            os.replace(temporal, self._ruta(clave))
+            self._recortar_disco()
+
+    def _recortar_disco(self):
+        """Borra los archivos menos usados hasta quedar bajo el límite"""
+        archivos = []
+        total = 0
+        for entrada in os.scandir(self.directorio):
+            if entrada.name.endswith('.txt'):
+                info = entrada.stat()
+                archivos.append((info.st_mtime, info.st_size, entrada.path))
+                total += info.st_size
+        archivos.sort()
+        for _, tamano, ruta in archivos:
+            if total <= self.max_bytes_disco:
+                break
+            try:
+                os.remove(ruta)
+                total -= tamano
+            except FileNotFoundError:
+                pass
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self._aciertos_memoria + self._aciertos_disco + self._fallos
+            aciertos = self._aciertos_memoria + self._aciertos_disco
+            return {
+                "entradas_memoria": len(self._memoria),
+                "aciertos_memoria": self._aciertos_memoria,
+                "aciertos_disco": self._aciertos_disco,
+                "fallos": self._fallos,
+                "tasa_aciertos": round(aciertos / consultas, 4) if consultas else 0.0,
+                "disco": self.directorio,
+            }
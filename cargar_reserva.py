@@ -7,51 +7,202 @@ Usa Playwright para automatizar la carga de reservas en el sistema SACH
 import os
 import sys
 import json
+import time
+import hashlib
+import logging
+import argparse
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
+from esperas import Esperas, EsperasAsync, registro_esperas
+from selectores import obtener_resolutor
+from formulario import llenar_campos, llenar_campos_async, diagnosticar_inputs, diagnosticar_inputs_async, modo_debug
+from sesion import obtener_gestor_sesion
+from almacen_sesion import obtener_almacen_sesion
+from recursos import obtener_politica_recursos
+from metricas import metricas
+from bitacora import configurar_logging
+from pool_navegadores import PoolNavegadores, USER_AGENT, ARGS_CHROMIUM
+from indice_clientes import obtener_indice_clientes, COINCIDENCIAS_SEGURAS
+from guardado import ResultadoGuardado, es_post_formulario, boton_guardar, boton_guardar_async, confirmar, confirmar_async, capturar, capturar_async
+
+log = logging.getLogger("cargar_reserva")
 
 # Cargar variables de entorno
 load_dotenv()
 
+# El formulario de Nuevo Cliente está listo cuando el campo DNI es visible
+SELECTOR_DNI_LISTO = '#ce_hue_nro_documento, input[name*="documento"], input[name*="dni"], input[id*="documento"], input[id*="dni"]'
+
+# SACH_BASE_URL permite apuntar el robot a un SACH local (mock_sach.py)
+SACH_BASE_URL = os.getenv('SACH_BASE_URL', 'https://sach.com.ar').rstrip('/')
+URL_NUEVO_CLIENTE = f'{SACH_BASE_URL}/cliente/nuevo'
+
+# Selectores de respaldo (compartidos por RobotSACH y RobotSACHAsync)
+
+# Elementos que SOLO aparecen logueado
+SELECTORES_SESION_ACTIVA = [
+    'a[href*="logout"]',  # Link de logout
+    'a[href*="salir"]',   # Link de salir
+    '.user-name',         # Nombre de usuario
+    '.navbar-user',       # Usuario en navbar
+    'a:has-text("Cerrar sesión")',
+    'a:has-text("Salir")',
+    '[class*="logout"]',
+    '[class*="user-menu"]'
+]
+
+# Campos de login
+SELECTORES_LOGIN_USUARIO = [
+    'input#usuario',  # ID específico que veo en la imagen
+    'input[name="usuario"]',
+    'input[name="username"]',
+    'input[name="user"]', 
+    'input[name="email"]',
+    'input[type="text"]',
+    'input[id*="user"]',
+    'input[id*="email"]',
+    'input[placeholder*="usuario"]',
+    'input[placeholder*="email"]',
+    'input[placeholder*="Usuario"]',
+    'input[placeholder*="Email"]'
+]
+
+SELECTORES_LOGIN_PASSWORD = [
+    'input#password',  # ID específico que veo en la imagen
+    'input[name="password"]',
+    'input[type="password"]',
+    'input[id*="pass"]',
+    'input[placeholder*="contraseña"]',
+    'input[placeholder*="password"]',
+    'input[placeholder*="Contraseña"]'
+]
+
+# Botón de login, primero el específico "Iniciar Sesión"
+SELECTORES_LOGIN_BOTON = [
+    'button:has-text("Iniciar Sesión")',  # El botón específico
+    'input[type="submit"]',
+    'button[type="submit"]',
+    'button:has-text("Ingresar")',
+    'button:has-text("Login")',
+    'button:has-text("Entrar")',
+    'button:has-text("Acceder")',
+    'button:has-text("INGRESAR")',
+    'input[value*="Ingresar"]',
+    'input[value*="Entrar"]'
+]
+
+# Elementos del panel principal que solo aparecen logueado
+SELECTORES_LOGIN_EXITOSO = [
+    'a:has-text("Inicio")',  # Link del panel principal
+    'nav a:has-text("Inicio")',
+    '.nav a:has-text("Inicio")',
+    'a[href*="inicio"]',
+    'a[href*="dashboard"]',
+    'a[href*="panel"]',
+    '.user-info',
+    '.user-menu',
+    '[class*="user"]',
+    '[class*="logout"]',
+    'a:has-text("Cerrar")',
+    'a:has-text("Salir")'
+]
+
+# Mensajes de error del login
+SELECTORES_LOGIN_ERROR = [
+    '.alert-danger',
+    '.error',
+    '.alert-error',
+    '[class*="error"]',
+    '[class*="danger"]',
+    'div:has-text("error")',
+    'div:has-text("Error")',
+    'div:has-text("incorrecto")',
+    'div:has-text("inválido")',
+    'div:has-text("inválida")',
+    'span:has-text("error")'
+]
+
+# Campo DNI del formulario de Nuevo Cliente
+SELECTORES_DNI = [
+    '#ce_hue_nro_documento',
+    'input[name*="documento"]',
+    'input[name*="dni"]',
+    'input[id*="documento"]',
+    'input[id*="dni"]',
+    'input[placeholder*="Documento"]',
+    'input[placeholder*="DNI"]',
+    '//input[contains(@name, "document")]',
+]
+
+# Navega sin esperar la respuesta (el evaluate vuelve antes de que arranque la navegación):
+# así las pestañas cargan el formulario a la vez
+NAVEGAR_JS = "url => { setTimeout(() => location.assign(url), 0); }"
+
 class RobotSACH:
-    def __init__(self):
+    def __init__(self, pool=None, max_pestanas=None):
         # Credenciales desde .env
-        self.sach_url = "https://sach.com.ar/iniciar"  # URL directa de login
+        self.sach_url = f"{SACH_BASE_URL}/iniciar"  # URL directa de login
         self.sach_user = os.getenv('SACH_USER')
         self.sach_pass = os.getenv('SACH_PASS')
         
-        # Archivo para guardar sesión persistente
-        self.session_file = "sach_session.json"
+        # Sesión persistente compartida entre robots, hilos y procesos
+        self.almacen_sesion = obtener_almacen_sesion()
+        # Cuándo se autenticó por última vez el contexto actual (None = no se sabe)
+        self.autenticado_en = None
+        # Si el último flujo tuvo que hacer login (la sesión nueva se publica en el almacén)
+        self.login_reciente = False
         
         # Inicializar contexto para evitar errores
         self.context = None
         
-        print(f"DEBUG: Usuario leído del .env: '{self.sach_user}'")
-        print(f"DEBUG: Contraseña leída del .env: '{self.sach_pass}'")
-        print(f"📁 Archivo de sesión: {self.session_file}")
+        log.debug(f"Usuario SACH: '{self.sach_user}'")
+        log.debug(f"📁 Almacén de sesión: {self.almacen_sesion.estadisticas()['ruta']}")
         
         if not self.sach_user or not self.sach_pass:
             raise ValueError("SACH_USER y SACH_PASS deben estar configurados en .env")
         
+        self.playwright = None
         self.browser = None
         self.page = None
+        
+        # Pool de navegadores calientes (opcional): si está, no se lanza un Chromium por reserva
+        self.pool = pool
+        
+        # Reservas simultáneas en pestañas del mismo contexto (procesar_clientes); tope amable con SACH
+        self.max_pestanas = max(1, max_pestanas or int(os.getenv('SACH_PESTANAS', '4')))
+        
+        # Esperas por condiciones (sin sleeps fijos) con presupuesto por paso
+        self.esperas = Esperas()
+        
+        # Selectores de respaldo con memoria del ganador (compartida y persistida)
+        self.selectores = obtener_resolutor()
+        
+        # Validez de la sesión: con sesión caliente se va directo al formulario
+        self.sesion = obtener_gestor_sesion()
+        
+        # Clientes ya cargados en SACH: se consultan antes de abrir el navegador (SACH_CLIENTES=0 apaga).
+        # Saltear el alta de un cliente conocido es opt-in (SACH_CLIENTES_OMITIR=1): el formulario
+        # todavía manda el cliente de prueba, y con él todas las reservas coincidirían por DNI
+        self.clientes = obtener_indice_clientes() if os.getenv('SACH_CLIENTES', '1') == '1' else None
+        self.omitir_conocidos = os.getenv('SACH_CLIENTES_OMITIR', '0') == '1'
     
+    @metricas.medido("iniciar_navegador")
     def iniciar_navegador(self):
         """Inicia el navegador Playwright - con sesión persistente"""
         try:
-            print("🌐 Iniciando Playwright...")
-            sys.stdout.flush()
+            log.debug("🌐 Iniciando Playwright...")
             self.playwright = sync_playwright().start()
-            print("✅ Playwright iniciado correctamente")
-            sys.stdout.flush()
+            log.debug("✅ Playwright iniciado correctamente")
             
-            print("🚀 Instalando Chromium (si es necesario)...")
-            sys.stdout.flush()
+            log.debug("🚀 Instalando Chromium (si es necesario)...")
             
             # Timeout de 60 segundos para el lanzamiento
-            print("🔧 Lanzando navegador con timeout de 60 segundos...")
-            sys.stdout.flush()
+            log.debug("🔧 Lanzando navegador con timeout de 60 segundos...")
             
             self.browser = self.playwright.chromium.launch(
                 headless=True,
@@ -61,395 +212,257 @@ class RobotSACH:
             
             # Verificar si existe sesión guardada
             storage_state = None
-            if os.path.exists(self.session_file):
-                print(f"📂 Sesión previa encontrada: {self.session_file}")
-                try:
-                    with open(self.session_file, 'r') as f:
-                        storage_state = json.load(f)
-                    print("✅ Sesión cargada correctamente")
-                except Exception as e:
-                    print(f"⚠️ Error cargando sesión: {e}")
-                    storage_state = None
+            registro = self.almacen_sesion.cargar_registro()
+            if registro:
+                log.info(f"📂 Sesión previa encontrada (versión {registro['version']})")
+                storage_state = registro["storage_state"]
+                self.autenticado_en = registro["autenticado_en"]
+                self.sesion.sembrar(registro)
             else:
-                print("🆕 No hay sesión previa, se creará una nueva")
+                log.info("🆕 No hay sesión previa, se creará una nueva")
             
             # Crear contexto con o sin sesión guardada
             if storage_state:
-                print("🔄 Creando contexto con sesión guardada...")
+                log.debug("🔄 Creando contexto con sesión guardada...")
                 self.context = self.browser.new_context(
                     storage_state=storage_state,
                     user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
                 )
-                print("✅ Contexto creado con sesión previa")
+                log.debug("✅ Contexto creado con sesión previa")
             else:
-                print("🆕 Creando contexto de navegador limpio...")
-                sys.stdout.flush()
+                log.debug("🆕 Creando contexto de navegador limpio...")
                 self.context = self.browser.new_context(
                     user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
                 )
-                print("✅ Contexto limpio creado")
+                log.debug("✅ Contexto limpio creado")
+            
+            # Sin imágenes, fuentes ni terceros; JS/CSS de SACH desde la caché compartida
+            obtener_politica_recursos().aplicar(self.context)
             
-            sys.stdout.flush()
-            print("✅ Navegador instalado correctamente")
-            sys.stdout.flush()
+            log.debug("✅ Navegador instalado correctamente")
             
             self.page = self.context.new_page()
             
             # Configurar tamaño de ventana
             self.page.set_viewport_size({"width": 1280, "height": 720})
             
-            print("✅ Navegador iniciado correctamente")
+            log.info("✅ Navegador iniciado correctamente")
             return True
             
         except Exception as e:
-            print(f"❌ Error iniciando navegador: {e}")
-            self.browser = None
-            self.page = None
+            log.error(f"❌ Error iniciando navegador: {e}")
+            # Lo que llegó a abrirse antes de la falla no puede quedar huérfano (Chromium y el driver de Node)
+            self._liberar_navegador()
             return False
     
+    def _liberar_navegador(self):
+        """Cierra contexto, navegador y Playwright en orden inverso; una falla no impide cerrar el resto"""
+        for nombre, objeto, metodo in (("contexto", self.context, "close"),
+                                       ("navegador", self.browser, "close"),
+                                       ("playwright", self.playwright, "stop")):
+            if objeto is None:
+                continue
+            try:
+                getattr(objeto, metodo)()
+            except Exception as e:
+                log.warning(f"⚠️ Error cerrando {nombre}: {e}")
+        self.context = None
+        self.browser = None
+        self.page = None
+        self.playwright = None
+    
     def guardar_sesion(self):
         """Guarda el estado de la sesión para reutilizarlo"""
         try:
             if self.context:
-                print("💾 Guardando sesión...")
-                storage_state = self.context.storage_state()
-                with open(self.session_file, 'w') as f:
-                    json.dump(storage_state, f)
-                print(f"✅ Sesión guardada en {self.session_file}")
-                sys.stdout.flush()
-                return True
+                log.info("💾 Guardando sesión...")
+                guardada = self.almacen_sesion.guardar(self.context.storage_state(), self.autenticado_en)
+                if guardada:
+                    log.info("✅ Sesión guardada")
+                else:
+                    log.info("ℹ️ Ya hay una sesión autenticada más reciente guardada; se conserva esa")
+                return guardada
         except Exception as e:
-            print(f"⚠️ Error guardando sesión: {e}")
-            sys.stdout.flush()
+            log.warning(f"⚠️ Error guardando sesión: {e}")
         return False
     
     def cerrar_navegador(self):
         """Cierra el navegador y guarda la sesión"""
         try:
-            print("🔒 Cerrando navegador...")
-            sys.stdout.flush()
+            log.info("🔒 Cerrando navegador...")
             
             # Guardar sesión antes de cerrar
             self.guardar_sesion()
-            
-            if self.context:
-                self.context.close()
-            if self.browser:
-                self.browser.close()
-            if self.playwright:
-                self.playwright.stop()
-                
-            print("✅ Navegador cerrado correctamente")
-            sys.stdout.flush()
         except Exception as e:
-            print(f"Error cerrando navegador: {e}")
-            sys.stdout.flush()
+            log.error(f"Error cerrando navegador: {e}")
+        self._liberar_navegador()
+        log.info("✅ Navegador cerrado correctamente")
     
+    @metricas.medido("hacer_login")
     def hacer_login(self):
         """Realiza el login en SACH con verificación y humanización"""
         try:
-            print("🔐 INICIANDO PROCESO DE LOGIN EN SACH")
-            sys.stdout.flush()
+            log.info("🔐 INICIANDO PROCESO DE LOGIN EN SACH")
             
-            print(f"🌐 NAVEGANDO A: {self.sach_url}")
-            sys.stdout.flush()
-            self.page.goto(self.sach_url)
+            log.info(f"🌐 NAVEGANDO A: {self.sach_url}")
+            self.esperas.ir(self.page, self.sach_url, "login_pagina")
             
-            # Esperar mínimo para que cargue
-            print("⏳ ESPERANDO A QUE CARGUE LA PÁGINA...")
-            sys.stdout.flush()
-            self.page.wait_for_timeout(2000)
+            # Esperar a que aparezca el formulario de login o algún indicio de sesión
+            log.debug("⏳ ESPERANDO A QUE CARGUE LA PÁGINA...")
+            self.esperas.elemento_visible(
+                self.page,
+                'input#usuario, input[type="password"], a[href*="logout"], a[href*="salir"]',
+                "login_pagina"
+            )
             
             # Imprimir información de la página actual
-            print(f"📍 URL ACTUAL: {self.page.url}")
-            print(f"📄 TÍTULO: {self.page.title()}")
-            sys.stdout.flush()
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(f"📍 URL ACTUAL: {self.page.url} - TÍTULO: {self.page.title()}")
             
             # VERIFICACIÓN: ¿Ya estamos logueados?
-            print("🔍 VERIFICANDO SI YA ESTAMOS LOGUEADOS...")
-            sys.stdout.flush()
-            
-            # Buscar elementos específicos que SOLO aparecen logueado
-            logged_in_selectors = [
-                'a[href*="logout"]',  # Link de logout
-                'a[href*="salir"]',   # Link de salir
-                '.user-name',         # Nombre de usuario
-                '.navbar-user',       # Usuario en navbar
-                'a:has-text("Cerrar sesión")',
-                'a:has-text("Salir")',
-                '[class*="logout"]',
-                '[class*="user-menu"]'
-            ]
+            log.debug("🔍 VERIFICANDO SI YA ESTAMOS LOGUEADOS...")
+            
             
             is_logged_in = False
-            for selector in logged_in_selectors:
-                try:
-                    elem = self.page.locator(selector)
-                    if elem.count() > 0:
-                        print(f"✅ Elemento de sesión encontrado: {selector}")
-                        is_logged_in = True
-                        break
-                except:
-                    continue
+            selector = self.selectores.resolver(self.page, "sesion_activa", SELECTORES_SESION_ACTIVA)
+            if selector:
+                log.debug(f"✅ Elemento de sesión encontrado: {selector}")
+                is_logged_in = True
             
             # También verificar que NO estemos en página de login
             if is_logged_in and "iniciar" in self.page.url.lower():
-                print("⚠️ Elementos de sesión encontrados pero URL es de login - probablemente falso positivo")
+                log.warning("⚠️ Elementos de sesión encontrados pero URL es de login - probablemente falso positivo")
                 is_logged_in = False
             
             if is_logged_in:
-                print("✅ LOGIN EXITOSO - YA ESTAMOS EN EL DASHBOARD")
-                sys.stdout.flush()
+                log.info("✅ LOGIN EXITOSO - YA ESTAMOS EN EL DASHBOARD")
                 return "FORM_READY"
             else:
-                print("🔐 NO ESTAMOS LOGUEADOS - PROCEDIENDO CON LOGIN...")
-                sys.stdout.flush()
-            
-            # Buscar campos de login con más selectores específicos
-            user_selectors = [
-                'input#usuario',  # ID específico que veo en la imagen
-                'input[name="usuario"]',
-                'input[name="username"]',
-                'input[name="user"]', 
-                'input[name="email"]',
-                'input[type="text"]',
-                'input[id*="user"]',
-                'input[id*="email"]',
-                'input[placeholder*="usuario"]',
-                'input[placeholder*="email"]',
-                'input[placeholder*="Usuario"]',
-                'input[placeholder*="Email"]'
-            ]
+                log.info("🔐 NO ESTAMOS LOGUEADOS - PROCEDIENDO CON LOGIN...")
+            
             
-            pass_selectors = [
-                'input#password',  # ID específico que veo en la imagen
-                'input[name="password"]',
-                'input[type="password"]',
-                'input[id*="pass"]',
-                'input[placeholder*="contraseña"]',
-                'input[placeholder*="password"]',
-                'input[placeholder*="Contraseña"]'
-            ]
             
             user_input = None
             pass_input = None
             
             # Buscar campo de usuario
-            for selector in user_selectors:
-                try:
-                    elem = self.page.locator(selector)
-                    if elem.count() > 0:
-                        user_input = elem.first
-                        print(f"Campo de usuario encontrado con selector: {selector}")
-                        break
-                except:
-                    continue
+            selector = self.selectores.resolver(self.page, "login_usuario", SELECTORES_LOGIN_USUARIO)
+            if selector:
+                user_input = self.page.locator(selector).first
+                log.debug(f"Campo de usuario encontrado con selector: {selector}")
             
             # Buscar campo de contraseña
-            for selector in pass_selectors:
-                try:
-                    elem = self.page.locator(selector)
-                    if elem.count() > 0:
-                        pass_input = elem.first
-                        print(f"Campo de contraseña encontrado con selector: {selector}")
-                        break
-                except:
-                    continue
+            selector = self.selectores.resolver(self.page, "login_password", SELECTORES_LOGIN_PASSWORD)
+            if selector:
+                pass_input = self.page.locator(selector).first
+                log.debug(f"Campo de contraseña encontrado con selector: {selector}")
             
             if user_input and pass_input:
-                print("Ingresando credenciales...")
-                sys.stdout.flush()
+                log.info("Ingresando credenciales...")
                 
-                # HUMANIZACIÓN: Pequeños retrasos entre acciones
+                # HUMANIZACIÓN: pausas solo si se configuró SACH_HUMANIZAR_MS
                 user_input.fill(self.sach_user)
-                self.page.wait_for_timeout(500)  # Pequeña pausa después de usuario
-                print("✅ Usuario ingresado")
-                sys.stdout.flush()
+                self.esperas.humanizar(self.page, "humanizar_usuario")
+                log.debug("✅ Usuario ingresado")
                 
                 pass_input.fill(self.sach_pass)
-                self.page.wait_for_timeout(800)  # Pausa más larga antes de enviar
-                print("✅ Contraseña ingresada")
-                sys.stdout.flush()
+                self.esperas.humanizar(self.page, "humanizar_password")
+                log.debug("✅ Contraseña ingresada")
                 
-                # HUMANIZACIÓN: Pausa antes de hacer clic
-                self.page.wait_for_timeout(1000)
-                print("🔘 Buscando botón de login...")
-                sys.stdout.flush()
+                self.esperas.humanizar(self.page, "humanizar_click")
+                log.debug("🔘 Buscando botón de login...")
                 
-                # Buscar botón de login específicamente "Iniciar Sesión"
-                login_selectors = [
-                    'button:has-text("Iniciar Sesión")',  # El botón específico
-                    'input[type="submit"]',
-                    'button[type="submit"]',
-                    'button:has-text("Ingresar")',
-                    'button:has-text("Login")',
-                    'button:has-text("Entrar")',
-                    'button:has-text("Acceder")',
-                    'button:has-text("INGRESAR")',
-                    'input[value*="Ingresar"]',
-                    'input[value*="Entrar"]'
-                ]
                 
-                for selector in login_selectors:
+                selector = self.selectores.resolver(self.page, "login_boton", SELECTORES_LOGIN_BOTON)
+                if selector:
                     try:
-                        btn = self.page.locator(selector)
-                        if btn.count() > 0:
-                            print(f"Botón de login encontrado con selector: {selector}")
-                            sys.stdout.flush()
-                            btn.first.click()
-                            print("✅ Botón de login presionado")
-                            sys.stdout.flush()
-                            break
-                    except:
-                        continue
+                        log.debug(f"Botón de login encontrado con selector: {selector}")
+                        self.page.locator(selector).first.click()
+                        log.info("✅ Botón de login presionado")
+                    except Exception as e:
+                        log.warning(f"⚠️ No se pudo presionar el botón de login: {e}")
                 
                 # Esperar a que redirija después del login
-                print("Esperando redirección después del login...")
-                sys.stdout.flush()
-                self.page.wait_for_timeout(2000)  # Reducido a 2 segundos
+                log.debug("Esperando redirección después del login...")
+                self.esperas.url_sin(self.page, "iniciar", "login_redireccion")
                 
                 # Verificar si el login fue exitoso buscando elementos del panel principal
-                print("Verificando si entramos al sistema...")
+                log.debug("Verificando si entramos al sistema...")
                 
-                # Buscar elementos que solo aparecen cuando estás logueado
-                login_success_selectors = [
-                    'a:has-text("Inicio")',  # Link del panel principal
-                    'nav a:has-text("Inicio")',
-                    '.nav a:has-text("Inicio")',
-                    'a[href*="inicio"]',
-                    'a[href*="dashboard"]',
-                    'a[href*="panel"]',
-                    '.user-info',
-                    '.user-menu',
-                    '[class*="user"]',
-                    '[class*="logout"]',
-                    'a:has-text("Cerrar")',
-                    'a:has-text("Salir")'
-                ]
                 
                 login_successful = False
-                for selector in login_success_selectors:
-                    try:
-                        elem = self.page.locator(selector)
-                        if elem.count() > 0:
-                            print(f"✅ Login exitoso - encontrado elemento: {selector}")
-                            login_successful = True
-                            break
-                    except:
-                        continue
+                selector = self.selectores.resolver(self.page, "login_exitoso", SELECTORES_LOGIN_EXITOSO)
+                if selector:
+                    log.debug(f"✅ Login exitoso - encontrado elemento: {selector}")
+                    login_successful = True
                 
                 if not login_successful:
                     # Si no encuentra elementos de login exitoso, verificar por URL
-                    if "iniciar" not in self.page.url or self.page.url != "https://sach.com.ar/iniciar":
-                        print("✅ Login exitoso - URL cambió o es diferente")
+                    if "iniciar" not in self.page.url or self.page.url != self.sach_url:
+                        log.info("✅ Login exitoso - URL cambió o es diferente")
                         login_successful = True
                     else:
-                        print("❌ Login falló - seguimos en página de inicio de sesión")
+                        log.error("❌ Login falló - seguimos en página de inicio de sesión")
                         
-                        # Buscar mensajes de error
-                        error_selectors = [
-                            '.alert-danger',
-                            '.error',
-                            '.alert-error',
-                            '[class*="error"]',
-                            '[class*="danger"]',
-                            'div:has-text("error")',
-                            'div:has-text("Error")',
-                            'div:has-text("incorrecto")',
-                            'div:has-text("inválido")',
-                            'div:has-text("inválida")',
-                            'span:has-text("error")'
-                        ]
                         
-                        for selector in error_selectors:
+                        selector = self.selectores.resolver(self.page, "login_error", SELECTORES_LOGIN_ERROR)
+                        if selector:
                             try:
-                                error_elem = self.page.locator(selector)
-                                if error_elem.count() > 0:
-                                    error_text = error_elem.first.text_content().strip()
-                                    if error_text:
-                                        print(f"Mensaje de error encontrado: {error_text}")
-                                        break
-                            except:
-                                continue
+                                error_text = self.page.locator(selector).first.text_content().strip()
+                                if error_text:
+                                    log.warning(f"Mensaje de error encontrado: {error_text}")
+                            except Exception:
+                                pass
                         
                         return False
             
                 if login_successful:
-                    print(f"✅ Login exitoso - URL actual: {self.page.url}")
+                    log.info(f"✅ Login exitoso - URL actual: {self.page.url}")
                     
                     # Navegar directamente a Nuevo Cliente
-                    print("Navegando directamente a Nuevo Cliente...")
-                    self.page.goto("https://sach.com.ar/cliente/nuevo")
-                    
-                    # ESPERAR a que cargue la página completamente
-                    print("⏳ Esperando a que cargue el formulario...")
-                    self.page.wait_for_timeout(3000)  # 3 segundos para cargar
+                    log.info("Navegando directamente a Nuevo Cliente...")
+                    self.esperas.ir(self.page, URL_NUEVO_CLIENTE, "formulario")
                     
-                    print(f"URL después de navegar a Nuevo Cliente: {self.page.url}")
-
-                    # VALIDACIÓN REAL: el formulario de Nuevo Cliente debe tener el campo DNI
-                    print("⏳ Esperando a que aparezca el campo DNI...")
-                    sys.stdout.flush()
-
-                    dni_ready_selectors = [
-                        '#ce_hue_nro_documento',
-                        'input[name*="documento"]',
-                        'input[name*="dni"]',
-                        'input[id*="documento"]',
-                        'input[id*="dni"]'
-                    ]
-
-                    dni_found = False
-                    for selector in dni_ready_selectors:
-                        try:
-                            self.page.wait_for_selector(selector, timeout=8000)
-                            print(f"✅ Campo DNI encontrado: {selector}")
-                            sys.stdout.flush()
-                            dni_found = True
-                            break
-                        except Exception:
-                            continue
+                    log.debug(f"URL después de navegar a Nuevo Cliente: {self.page.url}")
+
+                    # VALIDACIÓN REAL: el formulario de Nuevo Cliente debe tener el campo DNI visible
+                    log.debug("⏳ Esperando a que aparezca el campo DNI...")
+
+                    dni_found = self.esperas.elemento_visible(self.page, SELECTOR_DNI_LISTO, "formulario")
+                    if dni_found:
+                        log.info("✅ Campo DNI encontrado")
 
                     if not dni_found:
                         # Si aparece el formulario de login dentro de /cliente/nuevo, no estamos autorizados/logueados realmente
                         try:
                             if self.page.locator('#signin_username').count() > 0 or self.page.locator('input[name^="signin"]').count() > 0:
-                                print("❌ /cliente/nuevo está mostrando el formulario de login (signin_*). Sesión no válida.")
-                                sys.stdout.flush()
+                                log.error("❌ /cliente/nuevo está mostrando el formulario de login (signin_*). Sesión no válida.")
                         except Exception:
                             pass
 
-                        print("❌ No se detectó el campo DNI: el formulario de Nuevo Cliente no cargó")
-                        print("📸 Guardando screenshot para debug...")
-                        sys.stdout.flush()
-                        self.page.screenshot(path="error_no_dni_en_formulario.png")
+                        log.error("❌ No se detectó el campo DNI: el formulario de Nuevo Cliente no cargó")
+                        capturar(self.page, "error_no_dni_en_formulario.png")
                         return False
 
-                    print("🎉 ¡Llegamos al formulario de Nuevo Cliente!")
-                    sys.stdout.flush()
+                    log.info("🎉 ¡Llegamos al formulario de Nuevo Cliente!")
                     return "FORM_READY"
             else:
-                print("No se encontraron campos de login")
-                print("Capturando screenshot para debug...")
-                self.page.screenshot(path="debug_login.png")
+                log.warning("No se encontraron campos de login")
+                capturar(self.page, "debug_login.png")
                 return False
             
         except Exception as e:
-            print(f"Error en login: {e}")
+            log.error(f"Error en login: {e}")
             return False
     
     def ir_a_nuevo_cliente(self):
         """Navega a la sección de Nuevo Cliente"""
         try:
-            print("Buscando sección de Nuevo Cliente...")
-            print(f"URL actual después del login: {self.page.url}")
+            log.info("Buscando sección de Nuevo Cliente...")
+            log.debug(f"URL actual después del login: {self.page.url}")
             
-            # Screenshot para ver qué hay disponible
-            self.page.screenshot(path="debug_after_login.png")
-            print("Screenshot guardado como debug_after_login.png")
-            
-            # Esperar a que cargue completamente
-            self.page.wait_for_timeout(3000)
+            # Esperar a que termine de cargar el menú
+            self.esperas.red_inactiva(self.page, "menu_cliente")
             
             # Buscar botón de Clientes o Nuevo Cliente (varias opciones)
             cliente_selectors = [
@@ -473,12 +486,12 @@ class RobotSACH:
                 try:
                     btn = self.page.locator(selector)
                     if btn.count() > 0:
-                        print(f"Botón de Cliente encontrado con selector: {selector}")
+                        log.debug(f"Botón de Cliente encontrado con selector: {selector}")
                         btn.first.click()
-                        print("Hiciste clic en Cliente")
-                        self.page.wait_for_timeout(2000)
+                        log.info("Hiciste clic en Cliente")
+                        self.esperas.red_inactiva(self.page, "menu_clic_cliente")
                         break
-                except:
+                except Exception:
                     continue
             
             # Buscar botón de Nuevo Cliente
@@ -509,28 +522,32 @@ class RobotSACH:
                 try:
                     btn = self.page.locator(selector)
                     if btn.count() > 0:
-                        print(f"Botón de Nuevo Cliente encontrado con selector: {selector}")
+                        log.debug(f"Botón de Nuevo Cliente encontrado con selector: {selector}")
                         btn.first.click()
-                        print("Hiciste clic en Nuevo Cliente")
-                        self.page.wait_for_timeout(2000)
+                        log.info("Hiciste clic en Nuevo Cliente")
+                        self.esperas.elemento_visible(self.page, SELECTOR_DNI_LISTO, "menu_clic_nuevo")
                         return True
-                except:
+                except Exception:
                     continue
             
-            print("No se encontró el botón de Nuevo Cliente")
-            print("Links disponibles en la página:")
-            links = self.page.locator('a')
-            for i in range(links.count()):
-                link = links.nth(i)
-                text = link.text_content().strip()
-                href = link.get_attribute('href')
-                if text and href:
-                    print(f"  - '{text}' -> {href}")
+            log.warning("No se encontró el botón de Nuevo Cliente")
+            # Captura para ver qué menú quedó disponible después del login
+            capturar(self.page, "debug_after_login.png")
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Links disponibles en la página:")
+                links = self.page.locator('a')
+                for i in range(links.count()):
+                    link = links.nth(i)
+                    text = link.text_content().strip()
+                    href = link.get_attribute('href')
+                    if text and href:
+                        log.debug(f"  - '{text}' -> {href}")
             
             return False
             
         except Exception as e:
-            print(f"Error navegando a Nuevo Cliente: {e}")
+            log.error(f"Error navegando a Nuevo Cliente: {e}")
+            capturar(self.page, "debug_after_login.png")
             return False
     
     def calcular_fecha_egreso(self, fecha_entrada_str, noches):
@@ -539,7 +556,7 @@ class RobotSACH:
             fecha_entrada = datetime.strptime(fecha_entrada_str, '%Y-%m-%d')
             fecha_egreso = fecha_entrada + timedelta(days=noches)
             return fecha_egreso.strftime('%d/%m/%Y')  # Formato para SACH
-        except:
+        except Exception:
             return None
     
     def separar_nombre_completo(self, nombre_completo):
@@ -556,181 +573,95 @@ class RobotSACH:
             # Asumir que la última parte es el apellido
             return " ".join(partes[:-1]), partes[-1]
     
-    def llenar_formulario_cliente(self, datos_cliente):
-        """Llena el formulario de Nuevo Cliente - versión ultra rápida con DNI obligatorio"""
+    @metricas.medido("llenar_formulario_cliente")
+    def llenar_formulario_cliente(self, datos_cliente, pagina=None, etiqueta=""):
+        """
+        Llena el formulario de Nuevo Cliente - versión ultra rápida con DNI obligatorio.
+        'pagina' permite llenar otra pestaña que no sea self.page; 'etiqueta' va en los screenshots.
+        """
+        pagina = pagina or self.page
         try:
-            print("Llenando formulario de Nuevo Cliente...")
-            print(f"Datos recibidos: {datos_cliente}")
-            
-            # DIAGNÓSTICO: Ver qué campos hay en la página
-            print("🔍 DIAGNÓSTICO: Buscando campos de entrada en la página...")
-            inputs = self.page.locator('input').all()
-            print(f"   Total de inputs encontrados: {len(inputs)}")
-            for i, inp in enumerate(inputs[:10]):  # Mostrar primeros 10
-                try:
-                    name = inp.get_attribute('name') or 'sin-name'
-                    id_attr = inp.get_attribute('id') or 'sin-id'
-                    type_attr = inp.get_attribute('type') or 'sin-type'
-                    print(f"   Input {i}: name={name}, id={id_attr}, type={type_attr}")
-                except:
-                    pass
-            sys.stdout.flush()
+            log.info("Llenando formulario de Nuevo Cliente...")
+            log.debug(f"Datos recibidos: {datos_cliente}")
+            
+            # DIAGNÓSTICO: solo con SACH_DEBUG=1 (un evaluate en lugar de 3 get_attribute por input)
+            if modo_debug():
+                log.debug("🔍 DIAGNÓSTICO: Buscando campos de entrada en la página...")
+                diagnosticar_inputs(pagina)
 
             # CORTE RÁPIDO: si estamos viendo signin_*, seguimos en login, no en Nuevo Cliente
             try:
-                if self.page.locator('#signin_username').count() > 0 or self.page.locator('input[name^="signin"]').count() > 0:
-                    print("❌ Estamos en pantalla de login (signin_*). No es el formulario de Nuevo Cliente.")
-                    print("📸 Guardando screenshot para debug...")
-                    sys.stdout.flush()
-                    self.page.screenshot(path="error_estamos_en_login.png")
+                if pagina.locator('#signin_username, input[name^="signin"]').count() > 0:
+                    log.error("❌ Estamos en pantalla de login (signin_*). No es el formulario de Nuevo Cliente.")
+                    capturar(pagina, f"error_estamos_en_login{etiqueta}.png")
                     return False
             except Exception:
                 pass
             
-            # PRIORIDAD ABSOLUTA AL DNI - Primero y obligatorio
-            print("🔍 PRIORIDAD ABSOLUTA: Llenando DNI...")
-            dni_lleno = False
-            
-            # Lista de selectores a intentar para DNI
-            dni_selectores = [
-                '#ce_hue_nro_documento',
-                'input[name*="documento"]',
-                'input[name*="dni"]',
-                'input[id*="documento"]',
-                'input[id*="dni"]',
-                'input[placeholder*="Documento"]',
-                'input[placeholder*="DNI"]',
-                '//input[contains(@name, "document")]',
-            ]
-            
-            for selector in dni_selectores:
-                if dni_lleno:
-                    break
-                try:
-                    print(f"   Intentando selector: {selector}")
-                    dni_locator = self.page.locator(selector)
-                    if dni_locator.count() > 0:
-                        dni_locator.first.fill('22455958')
-                        self.page.wait_for_timeout(200)
-                        dni_value = dni_locator.first.input_value()
-                        if dni_value and dni_value.strip():
-                            print(f"✅ DNI escrito con selector {selector}: {dni_value}")
-                            dni_lleno = True
-                            break
-                except Exception as e:
-                    print(f"   Selector {selector} falló: {str(e)[:50]}")
-                    continue
+            # Todo el formulario en un solo round trip, con eventos input/change y validación
+            resultados = llenar_campos(pagina, self._campos_formulario(datos_cliente))
             
-            # SI EL DNI NO SE PUDO LLENAR, DETENER
-            if not dni_lleno:
-                print("❌ CRÍTICO: No se pudo llenar el campo DNI obligatorio")
-                print("📸 Guardando screenshot para debug...")
-                self.page.screenshot(path="error_dni.png")
+            # PRIORIDAD ABSOLUTA AL DNI: si no se pudo llenar, detener
+            falla = self._revisar_llenado(resultados)
+            if falla == "dni":
+                capturar(pagina, f"error_dni{etiqueta}.png")
+            if falla:
                 return False
             
-            # Datos de prueba - llenado ultra rápido sin timeouts
-            nombres_test = "Juan Manuel"
-            apellido_test = "Pérez"
-            movil_test = "1122334455"
-            email_test = "prueba_test@hotmail.com"
-            
-            # Llenado simultáneo y rápido
-            self.page.fill('input[name*="nombre"], input[name*="nombres"]', nombres_test)
-            print(f"✅ Nombres: {nombres_test}")
-            
-            self.page.fill('input[name*="apellido"]', apellido_test)
-            print(f"✅ Apellido: {apellido_test}")
-            
-            self.page.fill('input[name*="email"], input[type="email"]', email_test)
-            print(f"✅ Email: {email_test}")
-            
-            self.page.fill('input[name*="movil"], input[name*="celular"]', movil_test)
-            print(f"✅ Teléfono Móvil: {movil_test}")
-            
-            print("✅ Formulario completado ultra rápido")
+            log.info("✅ Formulario completado ultra rápido")
             return True
             
         except Exception as e:
-            print(f"Error: {e}")
+            log.error(f"Error: {e}")
             return False
     
-    def guardar_cliente(self):
-        """Guarda el cliente en SACH - versión ultra rápida"""
+    def _campos_formulario(self, datos_cliente):
+        """Mapa {campo: (selectores, valor)} del formulario de Nuevo Cliente"""
+        # Datos de prueba
+        return {
+            "dni": (SELECTORES_DNI, '22455958'),
+            "nombres": (['input[name*="nombre"], input[name*="nombres"]'], "Juan Manuel"),
+            "apellido": (['input[name*="apellido"]'], "Pérez"),
+            "email": (['input[name*="email"], input[type="email"]'], "prueba_test@hotmail.com"),
+            "movil": (['input[name*="movil"], input[name*="celular"]'], "1122334455"),
+        }
+    
+    def _revisar_llenado(self, resultados):
+        """'dni' si no quedó el DNI obligatorio, 'incompleto' si falló otro campo, None si está todo"""
+        dni = resultados["dni"]
+        if not dni["ok"]:
+            log.error(f"❌ CRÍTICO: No se pudo llenar el campo DNI obligatorio ({dni['error']})")
+            return "dni"
+        completo = True
+        for nombre, r in resultados.items():
+            if r["ok"]:
+                log.debug(f"✅ {nombre}: {r['valor']} ({r['selector']})")
+            else:
+                log.error(f"❌ {nombre}: {r['error']}")
+                completo = False
+        return None if completo else "incompleto"
+    
+    @metricas.medido("guardar_cliente")
+    def guardar_cliente(self, pagina=None, etiqueta=""):
+        """
+        Un solo clic en Guardar, confirmado por la respuesta de SACH al POST del formulario.
+        Devuelve un ResultadoGuardado (verdadero si quedó creado, con el id del cliente).
+        """
+        pagina = pagina or self.page
         try:
-            print("Guardando cliente...")
-            
-            # Clic instantáneo sin verificaciones extras
-            try:
-                print("🔍 BUSCANDO BOTÓN GUARDAR...")
-                sys.stdout.flush()
-                
-                # Intentar con ID específico primero
-                guardar_btn = self.page.locator('#ce_hue_btn_guardar')
-                if guardar_btn.count() > 0:
-                    print("✅ BOTÓN GUARDAR ENCONTRADO POR ID")
-                    sys.stdout.flush()
-                    guardar_btn.click()
-                    print("✅ BOTÓN GUARDAR CLICKEADO (ID)")
-                    print("✅ FORMULARIO ENVIADO CORRECTAMENTE")
-                    sys.stdout.flush()
-                else:
-                    # Backup con role - MEJORADO
-                    print("🔄 INTENTANDO CON SELECTOR ROLE...")
-                    sys.stdout.flush()
-                    self.page.get_by_role("button", name="Guardar").click()
-                    print("✅ BOTÓN GUARDAR CLICKEADO (ROLE)")
-                    print("✅ FORMULARIO ENVIADO CORRECTAMENTE")
-                    sys.stdout.flush()
-            
-                # Backup adicional: selector de submit
-                if guardar_btn.count() == 0:
-                    print("🔄 INTENTANDO CON SELECTOR SUBMIT...")
-                    sys.stdout.flush()
-                    submit_btn = self.page.locator('input[type="submit"]')
-                    if submit_btn.count() > 0:
-                        submit_btn.click()
-                        print("✅ BOTÓN SUBMIT CLICKEADO")
-                        print("✅ FORMULARIO ENVIADO CORRECTAMENTE")
-                        sys.stdout.flush()
-            
-                # Backup final: presionar Enter
-                print("🔄 INTENTANDO CON PRESIONAR ENTER...")
-                sys.stdout.flush()
-                self.page.keyboard.press('Enter')
-                print("✅ ENTER PRESIONADO")
-                print("✅ FORMULARIO ENVIADO CORRECTAMENTE")
-                sys.stdout.flush()
-            
-                # Espera mínima y verificación
-                self.page.wait_for_timeout(500)
-            
-                if "cliente/nuevo" not in self.page.url:
-                    print("✅ Cliente guardado - URL cambió")
-                    self.page.screenshot(path="comprobacion_final.png")
-                    print("📸 Screenshot guardado")
-                    return True
-            except:
-                pass
-        
-            # Backup: Enter instantáneo
-            self.page.keyboard.press('Enter')
-            self.page.wait_for_timeout(500)
-        
-            if "cliente/nuevo" not in self.page.url:
-                print("✅ Cliente guardado con Enter")
-                self.page.screenshot(path="comprobacion_final.png")
-                return True
-        
-            return True
-        
+            log.info("Guardando cliente...")
+            resultado = self._confirmar_guardado(pagina, self._enviar_formulario(pagina))
         except Exception as e:
-            print(f"Error guardando: {e}")
-            return False
+            log.error(f"Error guardando: {e}")
+            resultado = ResultadoGuardado(False, url=pagina.url, error=str(e))
+        if not resultado:
+            resultado.captura = capturar(pagina, f"error_guardar{etiqueta}.png")
+        return resultado
     
     def guardar_reserva(self):
         """Guarda la reserva"""
         try:
-            print("Guardando reserva...")
+            log.info("Guardando reserva...")
             
             # Buscar botón de guardar
             guardar_selectors = [
@@ -740,89 +671,832 @@ class RobotSACH:
                 'button[type="submit"]'
             ]
             
-            for selector in guardar_selectors:
+            selector = self.selectores.resolver(self.page, "guardar_reserva", guardar_selectors)
+            if selector:
                 try:
-                    btn = self.page.locator(selector)
-                    if btn.count() > 0:
-                        btn.first.click()
-                        print("Reserva guardada")
-                        self.page.wait_for_timeout(2000)
-                        return True
-                except:
-                    continue
+                    self.page.locator(selector).first.click()
+                    log.info("Reserva guardada")
+                    self.esperas.red_inactiva(self.page, "guardar_reserva")
+                    return True
+                except Exception as e:
+                    log.error(f"Error presionando guardar: {e}")
             
-            print("No se encontró botón de guardar")
+            log.warning("No se encontró botón de guardar")
             return False
             
         except Exception as e:
-            print(f"Error guardando reserva: {e}")
+            log.error(f"Error guardando reserva: {e}")
             return False
     
     def procesar_cliente(self, datos_cliente):
-        """Procesa un cliente completo - versión simplificada"""
+        """
+        Procesa un cliente completo - versión simplificada.
+        Devuelve el ResultadoGuardado (verdadero si quedó creado), o False si no se llegó a guardar.
+        """
         try:
-            print("🤖 INICIANDO PROCESAMIENTO DE CLIENTE")
-            sys.stdout.flush()
-            
-            # Iniciar navegador
-            print("🌐 INICIANDO NAVEGADOR...")
-            sys.stdout.flush()
-            if not self.iniciar_navegador():
-                print("❌ ERROR: No se pudo iniciar el navegador")
-                return False
+            log.info("🤖 INICIANDO PROCESAMIENTO DE CLIENTE")
             
-            # Login
-            print("🔐 HACIENDO LOGIN...")
-            sys.stdout.flush()
-            if not self.hacer_login():
-                print("❌ ERROR: Login falló")
-                return False
+            # Cliente que ya está en SACH: no se abre el navegador
+            conocido = self._cliente_conocido(datos_cliente)
+            if conocido:
+                return conocido
             
-            # Ir a formulario
-            print("🚀 NAVEGANDO A FORMULARIO...")
-            sys.stdout.flush()
-            self.page.goto('https://sach.com.ar/cliente/nuevo')
-            self.page.wait_for_timeout(2000)
-
-            # Validación: asegurarnos de estar en el formulario real (campo DNI presente)
+            if self.pool:
+                # Navegador caliente prestado del pool
+                log.info("♻️ USANDO NAVEGADOR DEL POOL...")
+                resultado = self.pool.ejecutar(self._procesar_en_slot, datos_cliente)
+            else:
+                # Iniciar navegador
+                log.info("🌐 INICIANDO NAVEGADOR...")
+                if not self.iniciar_navegador():
+                    log.error("❌ ERROR: No se pudo iniciar el navegador")
+                    return False
+                resultado = self._flujo_cliente(datos_cliente)
+            
+            self._recordar_cliente(datos_cliente, resultado)
+            return resultado
+                
+        except Exception as e:
+            log.error(f"❌ ERROR: {e}")
+            return False
+    
+    @metricas.medido("procesar_clientes")
+    def procesar_clientes(self, lista_datos):
+        """
+        Carga varias reservas a la vez, cada una en su pestaña del mismo contexto autenticado,
+        de a max_pestanas por tanda. Devuelve un resultado por reserva, en el mismo orden
+        (ResultadoGuardado, o False si no llegó a guardar); la falla de una pestaña no afecta a las demás.
+        """
+        # Los clientes que ya están en SACH no ocupan pestaña
+        resultados = [self._cliente_conocido(datos) for datos in lista_datos]
+        pendientes = [i for i, resultado in enumerate(resultados) if resultado is None]
+        for inicio in range(0, len(pendientes), self.max_pestanas):
+            indices = pendientes[inicio:inicio + self.max_pestanas]
+            grupo = [lista_datos[i] for i in indices]
+            log.info(f"🗂️ {len(grupo)} RESERVAS EN PESTAÑAS PARALELAS")
             try:
-                self.page.wait_for_selector('#ce_hue_nro_documento, input[name*="documento"], input[id*="dni"]', timeout=8000)
-            except Exception:
-                print("❌ No se cargó el formulario de Nuevo Cliente (campo DNI no aparece)")
-                print("📸 Guardando screenshot para debug...")
-                sys.stdout.flush()
-                self.page.screenshot(path="error_formulario_no_carga.png")
+                if self.pool:
+                    guardados = self.pool.ejecutar(self._pestanas_en_slot, grupo)
+                elif self.page is None and not self.iniciar_navegador():
+                    log.error("❌ ERROR: No se pudo iniciar el navegador")
+                    guardados = [False] * len(grupo)
+                else:
+                    guardados = self._flujo_pestanas(grupo)
+            except Exception as e:
+                log.error(f"❌ ERROR: {e}")
+                guardados = [False] * len(grupo)
+            for i, guardado in zip(indices, guardados):
+                resultados[i] = guardado
+                self._recordar_cliente(lista_datos[i], guardado)
+        return resultados
+    
+    def _datos_enviados(self, datos_cliente):
+        """Lo que el formulario manda a SACH para esta reserva: es lo que se busca y se indexa"""
+        return {campo: valor for campo, (_, valor) in self._campos_formulario(datos_cliente).items()}
+    
+    def _cliente_conocido(self, datos_cliente):
+        """
+        ResultadoGuardado del cliente si el índice local dice que ya está en SACH por DNI o
+        teléfono; si no, None. Una coincidencia solo por nombre no alcanza (homónimos).
+        Sin SACH_CLIENTES_OMITIR=1 solo se consulta y se loguea: el alta se hace igual
+        """
+        if self.clientes is None:
+            return None
+        registro = self.clientes.buscar(self._datos_enviados(datos_cliente))
+        if registro is None or registro["coincidencia"] not in COINCIDENCIAS_SEGURAS:
+            return None
+        if not self.omitir_conocidos:
+            log.debug(f"👤 Coincide con el cliente {registro['id_cliente']} (por {registro['coincidencia']}) - se crea igual")
+            return None
+        log.info(f"👤 CLIENTE YA CARGADO EN SACH (id {registro['id_cliente']}, por {registro['coincidencia']}) - no se crea")
+        return ResultadoGuardado(True, id_cliente=registro["id_cliente"], existente=True)
+    
+    def _recordar_cliente(self, datos_cliente, resultado):
+        """
+        Un alta confirmada por SACH entra al índice con los datos que se enviaron y el id
+        que asignó SACH. Si ya había un cliente con el mismo nombre, el alta queda marcada
+        como posible duplicado para revisar
+        """
+        if self.clientes is None or not resultado or resultado.existente:
+            return
+        enviados = self._datos_enviados(datos_cliente)
+        try:
+            registro = self.clientes.buscar(enviados)
+            if registro and registro["coincidencia"] not in COINCIDENCIAS_SEGURAS \
+                    and registro["id_cliente"] != resultado.id_cliente:
+                resultado.posible_duplicado = registro["id_cliente"]
+                log.warning(f"⚠️ Mismo nombre que el cliente {registro['id_cliente']}: revisar si es la misma persona")
+            self.clientes.registrar(enviados, resultado.id_cliente)
+        except Exception as e:
+            log.warning(f"⚠️ No se pudo registrar el cliente en el índice: {e}")
+    
+    def _procesar_en_slot(self, slot, datos_cliente):
+        """Corre el flujo sobre la página de un slot del pool (en el hilo del slot)"""
+        self._tomar_slot(slot)
+        try:
+            return self._flujo_cliente(datos_cliente)
+        finally:
+            self._soltar_slot(slot)
+            # Publicar enseguida la sesión recién obtenida para los otros navegadores y procesos
+            if self.login_reciente:
+                slot.guardar_sesion()
+    
+    def _pestanas_en_slot(self, slot, grupo):
+        """Como _procesar_en_slot, con una pestaña por reserva sobre el contexto del slot"""
+        self._tomar_slot(slot)
+        try:
+            return self._flujo_pestanas(grupo)
+        finally:
+            self._soltar_slot(slot)
+            if self.login_reciente:
+                slot.guardar_sesion()
+    
+    def _asegurar_sesion(self):
+        """Deja self.page en /cliente/nuevo autenticada; hace login solo si SACH redirige a 'iniciar'"""
+        if self.sesion.valida():
+            log.info("⚡ SESIÓN CALIENTE - DIRECTO AL FORMULARIO")
+            self.esperas.ir(self.page, URL_NUEVO_CLIENTE, "formulario_directo")
+            if "iniciar" not in self.page.url.lower():
+                self.sesion.contar("directas")
+                return True
+            log.info("🔐 La sesión venció (redirección a iniciar)")
+            self.sesion.invalidar()
+        
+        # Login
+        log.info("🔐 HACIENDO LOGIN...")
+        self.sesion.contar("logins")
+        if not self.hacer_login():
+            log.error("❌ ERROR: Login falló")
+            return False
+        self.login_reciente = True
+        
+        # Ir a formulario (hacer_login puede habernos dejado ya ahí)
+        log.info("🚀 NAVEGANDO A FORMULARIO...")
+        if "cliente/nuevo" not in self.page.url:
+            self.esperas.ir(self.page, URL_NUEVO_CLIENTE, "formulario_flujo")
+        return True
+    
+    def _formulario_listo(self):
+        """Valida que estemos en el formulario real (campo DNI visible) y marca la sesión como buena"""
+        if not self.esperas.elemento_visible(self.page, SELECTOR_DNI_LISTO, "formulario_flujo"):
+            return False
+        self.autenticado_en = time.time()
+        self.sesion.marcar_ok(self.context.cookies() if self.context else None, cuando=self.autenticado_en)
+        return True
+    
+    def _tomar_slot(self, slot):
+        self.browser = slot.browser
+        self.context = slot.context
+        self.page = slot.page
+        self.autenticado_en = slot.autenticado_en
+        self.login_reciente = False
+    
+    def _soltar_slot(self, slot):
+        slot.autenticado_en = self.autenticado_en
+        self.browser = None
+        self.context = None
+        self.page = None
+    
+    def _refrescar_en_slot(self, slot):
+        """Navegación autenticada de mantenimiento sobre un slot del pool (renueva la sesión)"""
+        self._tomar_slot(slot)
+        try:
+            return self._asegurar_sesion() and self._formulario_listo()
+        finally:
+            self._soltar_slot(slot)
+            slot.guardar_sesion()
+    
+    def _flujo_cliente(self, datos_cliente):
+        """Sesión, formulario de Nuevo Cliente y guardado sobre self.page ya abierta"""
+        try:
+            if not self._asegurar_sesion():
+                return False
+
+            # Validación: asegurarnos de estar en el formulario real (campo DNI visible)
+            if not self._formulario_listo():
+                log.error("❌ No se cargó el formulario de Nuevo Cliente (campo DNI no aparece)")
+                capturar(self.page, "error_formulario_no_carga.png")
                 return False
             
             # Llenar formulario
-            print("📝 LLENANDO FORMULARIO...")
-            sys.stdout.flush()
+            log.info("📝 LLENANDO FORMULARIO...")
             if not self.llenar_formulario_cliente(datos_cliente):
-                print("❌ ERROR: No se pudo llenar formulario")
+                log.error("❌ ERROR: No se pudo llenar formulario")
                 return False
             
             # Guardar
-            print("💾 GUARDANDO CLIENTE...")
-            sys.stdout.flush()
-            if not self.guardar_cliente():
-                print("❌ ERROR: No se pudo guardar")
+            log.info("💾 GUARDANDO CLIENTE...")
+            resultado = self.guardar_cliente()
+            if not resultado:
+                log.error("❌ ERROR: No se pudo guardar")
+                return resultado
+            
+            log.info("✅ CLIENTE GUARDADO EN SACH")
+            return resultado
+                
+        except Exception as e:
+            log.error(f"❌ ERROR: {e}")
+            return False
+
+    def _flujo_pestanas(self, grupo):
+        """
+        Sesión en self.page y una pestaña nueva por cada reserva extra. Cada paso se lanza
+        en todas las pestañas antes de esperar, así las esperas de red de SACH se solapan
+        (la API sync de Playwright corre todo en el hilo del navegador).
+        """
+        if not self._asegurar_sesion() or not self._formulario_listo():
+            log.error("❌ No se cargó el formulario de Nuevo Cliente (campo DNI no aparece)")
+            capturar(self.page, "error_formulario_no_carga.png")
+            return [False] * len(grupo)
+        
+        paginas = [self.page]
+        vivas = [True] * len(grupo)
+        envios = [None] * len(grupo)
+        resultados = [False] * len(grupo)
+        
+        def paso(nombre, funcion):
+            """Corre funcion(i, pagina) en cada pestaña viva; una excepción o False la descarta"""
+            for i, pagina in enumerate(paginas):
+                if not vivas[i]:
+                    continue
+                try:
+                    ok = funcion(i, pagina)
+                except Exception as e:
+                    log.error(f"❌ Pestaña {i}: {nombre} falló: {e}")
+                    ok = False
+                if not ok:
+                    vivas[i] = False
+                    capturar(pagina, f"error_{nombre}_pestana{i}.png")
+        
+        def enviar(i, pagina):
+            envios[i] = self._enviar_formulario(pagina)
+            return True
+        
+        def confirmar_envio(i, pagina):
+            resultados[i] = self._confirmar_guardado(pagina, envios[i])
+            return resultados[i]
+        
+        try:
+            # self.page ya está en el formulario; las demás navegan todas juntas
+            for _ in grupo[1:]:
+                pagina = self.context.new_page()
+                pagina.set_viewport_size({"width": 1280, "height": 720})
+                paginas.append(pagina)
+            paso("navegacion", lambda i, pagina: i == 0 or pagina.evaluate(NAVEGAR_JS, URL_NUEVO_CLIENTE) is None)
+            paso("formulario", lambda i, pagina: self.esperas.elemento_visible(pagina, SELECTOR_DNI_LISTO, "formulario_pestana"))
+            paso("llenado", lambda i, pagina: self.llenar_formulario_cliente(grupo[i], pagina=pagina, etiqueta=f"_pestana{i}"))
+            # Enviar todas sin esperar la navegación; después confirmar cada una por su respuesta
+            paso("envio", enviar)
+            paso("guardado", confirmar_envio)
+        finally:
+            for pagina in paginas[1:]:
+                try:
+                    pagina.close()
+                except Exception:
+                    pass
+        
+        guardadas = sum(vivas)
+        log.info(f"✅ {guardadas}/{len(grupo)} CLIENTES GUARDADOS EN PESTAÑAS")
+        return resultados
+    
+    def _enviar_formulario(self, pagina):
+        """
+        Clic en Guardar sin esperar la navegación que dispara. Devuelve la espera de la
+        respuesta al POST, registrada antes del clic para no perderla
+        """
+        boton = boton_guardar(pagina)
+        espera = self.esperas.respuesta(pagina, es_post_formulario, "guardar_respuesta")
+        boton.click(no_wait_after=True)
+        return espera
+    
+    def _confirmar_guardado(self, pagina, espera):
+        """ResultadoGuardado de un envío: redirección a /cliente/<id>, formulario rechazado o sin respuesta"""
+        resultado = confirmar(self.esperas, pagina, espera)
+        if resultado:
+            log.info(f"✅ Cliente guardado (id {resultado.id_cliente})")
+        else:
+            log.error(f"❌ {resultado.error}")
+        return resultado
+
+
+class RobotSACHAsync(RobotSACH):
+    """
+    RobotSACH sobre async_playwright: las mismas etapas como corrutinas, para cargar muchas
+    reservas intercaladas en un solo event loop (asyncio.gather) sin un hilo por navegador.
+    Un navegador y un contexto autenticado; cada reserva usa su propia pestaña y el login
+    se hace una sola vez aunque varias reservas lo necesiten a la vez.
+    """
+    
+    def __init__(self, max_pestanas=None):
+        super().__init__(pool=None, max_pestanas=max_pestanas)
+        self.esperas = EsperasAsync()
+        self.playwright = None
+        # Pestañas abiertas a la vez contra SACH (SACH_PESTANAS)
+        self._pestanas = asyncio.Semaphore(self.max_pestanas)
+        self._lock_navegador = asyncio.Lock()
+        self._lock_sesion = asyncio.Lock()
+    
+    @metricas.medido("iniciar_navegador")
+    async def iniciar_navegador(self):
+        """Inicia Chromium y el contexto compartido (con la sesión del almacén si hay)"""
+        try:
+            self.playwright = await async_playwright().start()
+            self.browser = await self.playwright.chromium.launch(
+                headless=True,
+                args=ARGS_CHROMIUM,
+                timeout=60000
+            )
+            
+            opciones = {"user_agent": USER_AGENT}
+            registro = self.almacen_sesion.cargar_registro()
+            if registro:
+                log.info(f"📂 Sesión previa encontrada (versión {registro['version']})")
+                opciones["storage_state"] = registro["storage_state"]
+                self.autenticado_en = registro["autenticado_en"]
+                self.sesion.sembrar(registro)
+            else:
+                log.info("🆕 No hay sesión previa, se creará una nueva")
+            self.context = await self.browser.new_context(**opciones)
+            await obtener_politica_recursos().aplicar_async(self.context)
+            
+            self.page = await self._nueva_pagina()
+            log.info("✅ Navegador iniciado correctamente")
+            return True
+        
+        except Exception as e:
+            log.error(f"❌ Error iniciando navegador: {e}")
+            # Lo que llegó a abrirse antes de la falla no puede quedar huérfano (Chromium y el driver de Node)
+            await self._liberar_navegador()
+            return False
+    
+    async def _liberar_navegador(self):
+        """Cierra contexto, navegador y Playwright en orden inverso; una falla no impide cerrar el resto"""
+        for nombre, objeto, metodo in (("contexto", self.context, "close"),
+                                       ("navegador", self.browser, "close"),
+                                       ("playwright", self.playwright, "stop")):
+            if objeto is None:
+                continue
+            try:
+                await getattr(objeto, metodo)()
+            except Exception as e:
+                log.warning(f"⚠️ Error cerrando {nombre}: {e}")
+        self.context = None
+        self.browser = None
+        self.page = None
+        self.playwright = None
+    
+    async def guardar_sesion(self):
+        """Guarda el estado de la sesión para reutilizarlo"""
+        try:
+            if self.context:
+                return self.almacen_sesion.guardar(await self.context.storage_state(), self.autenticado_en)
+        except Exception as e:
+            log.warning(f"⚠️ Error guardando sesión: {e}")
+        return False
+    
+    async def cerrar_navegador(self):
+        """Cierra el navegador y guarda la sesión"""
+        try:
+            log.info("🔒 Cerrando navegador...")
+            await self.guardar_sesion()
+        except Exception as e:
+            log.error(f"Error cerrando navegador: {e}")
+        await self._liberar_navegador()
+        log.info("✅ Navegador cerrado correctamente")
+    
+    @metricas.medido("hacer_login")
+    async def hacer_login(self, pagina=None):
+        """Login en SACH sobre 'pagina'; devuelve "FORM_READY" con el formulario de Nuevo Cliente listo"""
+        pagina = pagina or self.page
+        try:
+            log.info("🔐 INICIANDO PROCESO DE LOGIN EN SACH")
+            await self.esperas.ir(pagina, self.sach_url, "login_pagina")
+            await self.esperas.elemento_visible(
+                pagina,
+                'input#usuario, input[type="password"], a[href*="logout"], a[href*="salir"]',
+                "login_pagina"
+            )
+            
+            # ¿Ya estamos logueados? (descartando el falso positivo de seguir en 'iniciar')
+            selector = await self.selectores.resolver_async(pagina, "sesion_activa", SELECTORES_SESION_ACTIVA)
+            if selector and "iniciar" not in pagina.url.lower():
+                log.info("✅ LOGIN EXITOSO - YA ESTAMOS EN EL DASHBOARD")
+                return "FORM_READY"
+            
+            usuario = await self.selectores.resolver_async(pagina, "login_usuario", SELECTORES_LOGIN_USUARIO)
+            password = await self.selectores.resolver_async(pagina, "login_password", SELECTORES_LOGIN_PASSWORD)
+            if not usuario or not password:
+                log.warning("No se encontraron campos de login")
+                await capturar_async(pagina, "debug_login.png")
                 return False
             
-            print("✅ CLIENTE GUARDADO EN SACH")
-            sys.stdout.flush()
+            log.info("Ingresando credenciales...")
+            await pagina.locator(usuario).first.fill(self.sach_user)
+            await self.esperas.humanizar(pagina, "humanizar_usuario")
+            await pagina.locator(password).first.fill(self.sach_pass)
+            await self.esperas.humanizar(pagina, "humanizar_password")
+            await self.esperas.humanizar(pagina, "humanizar_click")
+            
+            selector = await self.selectores.resolver_async(pagina, "login_boton", SELECTORES_LOGIN_BOTON)
+            if selector:
+                try:
+                    await pagina.locator(selector).first.click()
+                    log.info("✅ Botón de login presionado")
+                except Exception as e:
+                    log.warning(f"⚠️ No se pudo presionar el botón de login: {e}")
+            
+            await self.esperas.url_sin(pagina, "iniciar", "login_redireccion")
+            
+            exitoso = await self.selectores.resolver_async(pagina, "login_exitoso", SELECTORES_LOGIN_EXITOSO)
+            if not exitoso and "iniciar" in pagina.url and pagina.url == self.sach_url:
+                log.error("❌ Login falló - seguimos en página de inicio de sesión")
+                selector = await self.selectores.resolver_async(pagina, "login_error", SELECTORES_LOGIN_ERROR)
+                if selector:
+                    try:
+                        error_text = (await pagina.locator(selector).first.text_content()).strip()
+                        if error_text:
+                            log.warning(f"Mensaje de error encontrado: {error_text}")
+                    except Exception:
+                        pass
+                return False
+            
+            log.info(f"✅ Login exitoso - URL actual: {pagina.url}")
+            await self.esperas.ir(pagina, URL_NUEVO_CLIENTE, "formulario")
+            if not await self.esperas.elemento_visible(pagina, SELECTOR_DNI_LISTO, "formulario"):
+                log.error("❌ No se detectó el campo DNI: el formulario de Nuevo Cliente no cargó")
+                await capturar_async(pagina, "error_no_dni_en_formulario.png")
+                return False
+            
+            log.info("🎉 ¡Llegamos al formulario de Nuevo Cliente!")
+            return "FORM_READY"
+        
+        except Exception as e:
+            log.error(f"Error en login: {e}")
+            return False
+    
+    @metricas.medido("llenar_formulario_cliente")
+    async def llenar_formulario_cliente(self, datos_cliente, pagina=None, etiqueta=""):
+        """Llena el formulario de Nuevo Cliente en un solo evaluate, con DNI obligatorio"""
+        pagina = pagina or self.page
+        try:
+            log.info("Llenando formulario de Nuevo Cliente...")
+            if modo_debug():
+                await diagnosticar_inputs_async(pagina)
+            
+            # CORTE RÁPIDO: si estamos viendo signin_*, seguimos en login, no en Nuevo Cliente
+            try:
+                if await pagina.locator('#signin_username, input[name^="signin"]').count() > 0:
+                    log.error("❌ Estamos en pantalla de login (signin_*). No es el formulario de Nuevo Cliente.")
+                    await capturar_async(pagina, f"error_estamos_en_login{etiqueta}.png")
+                    return False
+            except Exception:
+                pass
+            
+            resultados = await llenar_campos_async(pagina, self._campos_formulario(datos_cliente))
+            falla = self._revisar_llenado(resultados)
+            if falla == "dni":
+                await capturar_async(pagina, f"error_dni{etiqueta}.png")
+            if falla:
+                return False
+            
+            log.info("✅ Formulario completado ultra rápido")
             return True
-                
+        
         except Exception as e:
-            print(f"❌ ERROR: {e}")
-            sys.stdout.flush()
+            log.error(f"Error: {e}")
             return False
+    
+    @metricas.medido("guardar_cliente")
+    async def guardar_cliente(self, pagina=None, etiqueta=""):
+        """Un solo clic en Guardar, confirmado por la respuesta de SACH; devuelve un ResultadoGuardado"""
+        pagina = pagina or self.page
+        try:
+            log.info("Guardando cliente...")
+            boton = await boton_guardar_async(pagina)
+            espera = await self.esperas.respuesta(pagina, es_post_formulario, "guardar_respuesta")
+            await boton.click(no_wait_after=True)
+            resultado = await confirmar_async(self.esperas, pagina, espera)
+        except Exception as e:
+            log.error(f"Error guardando: {e}")
+            resultado = ResultadoGuardado(False, url=pagina.url, error=str(e))
+        if resultado:
+            log.info(f"✅ Cliente guardado (id {resultado.id_cliente})")
+        else:
+            log.error(f"❌ {resultado.error}")
+            resultado.captura = await capturar_async(pagina, f"error_guardar{etiqueta}.png")
+        return resultado
+    
+    @metricas.medido("procesar_cliente")
+    async def procesar_cliente(self, datos_cliente):
+        """
+        Carga una reserva en su propia pestaña. Se puede llamar muchas veces a la vez
+        (asyncio.gather): las pestañas comparten navegador, contexto y sesión.
+        Devuelve el ResultadoGuardado, o False si no se llegó a guardar.
+        """
+        # Cliente que ya está en SACH: ni pestaña ni turno del semáforo
+        conocido = self._cliente_conocido(datos_cliente)
+        if conocido:
+            return conocido
+        
+        async with self._pestanas:
+            pagina = None
+            try:
+                log.info("🤖 INICIANDO PROCESAMIENTO DE CLIENTE")
+                async with self._lock_navegador:
+                    if self.context is None and not await self.iniciar_navegador():
+                        log.error("❌ ERROR: No se pudo iniciar el navegador")
+                        return False
+                pagina = await self._nueva_pagina()
+                
+                if not await self._asegurar_sesion_async(pagina):
+                    return False
+                if not await self._formulario_listo_async(pagina):
+                    log.error("❌ No se cargó el formulario de Nuevo Cliente (campo DNI no aparece)")
+                    await capturar_async(pagina, "error_formulario_no_carga.png")
+                    return False
+                
+                log.info("📝 LLENANDO FORMULARIO...")
+                if not await self.llenar_formulario_cliente(datos_cliente, pagina=pagina):
+                    log.error("❌ ERROR: No se pudo llenar formulario")
+                    return False
+                
+                log.info("💾 GUARDANDO CLIENTE...")
+                resultado = await self.guardar_cliente(pagina)
+                if not resultado:
+                    log.error("❌ ERROR: No se pudo guardar")
+                    return resultado
+                
+                log.info("✅ CLIENTE GUARDADO EN SACH")
+                # La escritura en SQLite del índice, fuera del loop
+                await asyncio.to_thread(self._recordar_cliente, datos_cliente, resultado)
+                return resultado
+            
+            except Exception as e:
+                log.error(f"❌ ERROR: {e}")
+                return False
+            finally:
+                if pagina is not None:
+                    try:
+                        await pagina.close()
+                    except Exception:
+                        pass
+    
+    async def procesar_clientes(self, lista_datos):
+        """Todas las reservas intercaladas en el loop (de a max_pestanas); un resultado por reserva, en orden"""
+        return list(await asyncio.gather(*(self.procesar_cliente(datos) for datos in lista_datos)))
+    
+    async def _nueva_pagina(self):
+        pagina = await self.context.new_page()
+        await pagina.set_viewport_size({"width": 1280, "height": 720})
+        return pagina
+    
+    async def _asegurar_sesion_async(self, pagina):
+        """Deja 'pagina' en /cliente/nuevo autenticada; si hace falta login, lo hace una sola pestaña"""
+        if self.sesion.valida():
+            await self.esperas.ir(pagina, URL_NUEVO_CLIENTE, "formulario_directo")
+            if "iniciar" not in pagina.url.lower():
+                self.sesion.contar("directas")
+                return True
+            log.info("🔐 La sesión venció (redirección a iniciar)")
+            self.sesion.invalidar()
+        
+        async with self._lock_sesion:
+            # Otra pestaña pudo haber hecho el login mientras esperábamos el lock
+            if self.sesion.valida():
+                await self.esperas.ir(pagina, URL_NUEVO_CLIENTE, "formulario_directo")
+                if "iniciar" not in pagina.url.lower():
+                    self.sesion.contar("directas")
+                    return True
+            
+            log.info("🔐 HACIENDO LOGIN...")
+            self.sesion.contar("logins")
+            if not await self.hacer_login(pagina):
+                log.error("❌ ERROR: Login falló")
+                return False
+            if "cliente/nuevo" not in pagina.url:
+                await self.esperas.ir(pagina, URL_NUEVO_CLIENTE, "formulario_flujo")
+            # Marcar y publicar la sesión antes de soltar el lock: las que esperan van directo
+            if not await self._formulario_listo_async(pagina):
+                return False
+            await self.guardar_sesion()
+            return True
+    
+    async def _formulario_listo_async(self, pagina):
+        """Valida que estemos en el formulario real (campo DNI visible) y marca la sesión como buena"""
+        if not await self.esperas.elemento_visible(pagina, SELECTOR_DNI_LISTO, "formulario_flujo"):
+            return False
+        self.autenticado_en = time.time()
+        self.sesion.marcar_ok(await self.context.cookies(), cuando=self.autenticado_en)
+        return True
+
+
+def refrescar_sesiones(pool):
+    """Renueva la sesión en cada navegador del pool (lo llama RefrescoSesion en segundo plano)"""
+    resultados = pool.en_cada_slot(lambda slot: RobotSACH(pool=pool)._refrescar_en_slot(slot))
+    if not any(resultados):
+        raise RuntimeError("Ningún navegador pudo renovar la sesión")
+    return resultados
+
+def clave_registro(datos_cliente):
+    """Identidad estable de una reserva para el checkpoint (no depende del orden de las claves)"""
+    return hashlib.sha256(json.dumps(datos_cliente, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+def leer_checkpoint(ruta_checkpoint):
+    if not os.path.exists(ruta_checkpoint):
+        return set()
+    with open(ruta_checkpoint, 'r', encoding='utf-8') as f:
+        return {linea.rstrip('\n') for linea in f if linea.strip()}
+
+def cargar_lote(argv):
+    """
+    Carga reservas desde un JSON Lines (archivo o '-' para stdin) con una sola sesión SACH:
+    la primera reserva hace el login y publica la sesión; el resto va directo al formulario
+    en --paralelo navegadores del pool, de a --pestanas reservas por navegador. Emite una
+    línea JSON por reserva, reintenta las fallidas y registra las cargadas en el checkpoint
+    para no duplicarlas al reanudar.
+    """
+    parser = argparse.ArgumentParser(prog="cargar_reserva.py lote", description="Carga masiva de reservas en SACH")
+    parser.add_argument("origen", help="Archivo JSON Lines con una reserva por línea, o '-' para stdin")
+    parser.add_argument("--paralelo", type=int, default=2, help="Navegadores en paralelo (default: 2)")
+    parser.add_argument("--pestanas", type=int, default=None, help="Reservas simultáneas por navegador (default: SACH_PESTANAS o 4)")
+    parser.add_argument("--reintentos", type=int, default=2, help="Reintentos por reserva fallida (default: 2)")
+    parser.add_argument("--salida", help="Archivo JSON Lines de resultados (default: stdout)")
+    parser.add_argument("--checkpoint", help="Archivo de checkpoint (default: <salida>.checkpoint o cargar_reserva.checkpoint)")
+    args = parser.parse_args(argv)
+    
+    # Logs a stderr para no mezclarse con el JSON Lines de resultados
+    configurar_logging(formato_por_defecto="texto", salida=sys.stderr)
+    
+    ruta_checkpoint = args.checkpoint or (f"{args.salida}.checkpoint" if args.salida else "cargar_reserva.checkpoint")
+    hechos = leer_checkpoint(ruta_checkpoint)
+    
+    entrada = sys.stdin if args.origen == "-" else open(args.origen, 'r', encoding='utf-8')
+    salida = open(args.salida, 'a', encoding='utf-8') if args.salida else sys.stdout
+    pool = PoolNavegadores(tamano=args.paralelo)
+    pestanas = RobotSACH(pool=pool, max_pestanas=args.pestanas).max_pestanas
+    # Ctrl+C: los grupos en curso terminan su primer intento pero no reintentan
+    interrumpido = threading.Event()
+    
+    def error_de(resultado):
+        """None si quedó guardado; si no, el motivo"""
+        if resultado:
+            return None
+        return getattr(resultado, "error", None) or "No se pudo cargar el cliente"
+    
+    def reintentar(numero, datos_cliente, resultado):
+        """Reintentos de a una reserva, con backoff; devuelve (intentos, resultado)"""
+        intento = 1
+        while not resultado and intento <= args.reintentos:
+            if not getattr(resultado, "reintentable", True):
+                # El POST salió sin respuesta: reintentar podría crear el cliente dos veces
+                log.warning(f"⚠️ Línea {numero}: guardado sin confirmar, no se reintenta")
+                break
+            if interrumpido.is_set():
+                break
+            log.warning(f"⚠️ Línea {numero}: intento {intento} falló ({error_de(resultado)}), reintentando")
+            time.sleep(min(2 ** (intento - 1), 10))
+            intento += 1
+            try:
+                resultado = RobotSACH(pool=pool).procesar_cliente(datos_cliente)
+            except Exception as e:
+                resultado = ResultadoGuardado(False, error=str(e))
+        return intento, resultado
+    
+    def cargar_grupo(items):
+        """Primer intento de todo el grupo en pestañas paralelas; las fallidas se reintentan solas"""
+        inicio = time.perf_counter()
+        try:
+            guardados = RobotSACH(pool=pool, max_pestanas=pestanas).procesar_clientes([datos for _, datos in items])
+        except Exception:
+            guardados = [False] * len(items)
+        resultados = []
+        for (numero, datos_cliente), guardado in zip(items, guardados):
+            intentos, guardado = reintentar(numero, datos_cliente, guardado)
+            resultados.append({
+                "linea": numero,
+                "clave": clave_registro(datos_cliente),
+                "ok": bool(guardado),
+                "id_cliente": getattr(guardado, "id_cliente", None),
+                "existente": getattr(guardado, "existente", False),
+                "posible_duplicado": getattr(guardado, "posible_duplicado", None),
+                "intentos": intentos,
+                "datos": datos_cliente,
+                "error": error_de(guardado),
+                "segundos": round(time.perf_counter() - inicio, 3),
+            })
+        return resultados
+    
+    ok = fallidos = salteados = 0
+    
+    def registrar(resultado):
+        nonlocal ok, fallidos
+        salida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+        salida.flush()
+        if resultado["ok"]:
+            ok += 1
+            checkpoint.write(resultado["clave"] + "\n")
+            checkpoint.flush()
+        else:
+            fallidos += 1
+    
+    inicio = time.perf_counter()
+    try:
+        with open(ruta_checkpoint, 'a', encoding='utf-8') as checkpoint, \
+             ThreadPoolExecutor(max_workers=args.paralelo) as executor:
+            en_curso = set()
+            grupo = []
+            sesion_lista = False
+            
+            def registrar_grupo(futuro):
+                en_curso.discard(futuro)
+                if not futuro.cancelled():
+                    for resultado in futuro.result():
+                        registrar(resultado)
+            
+            def enviar(items):
+                # Se lee la entrada a medida que se libera lugar (stdin puede ser un stream)
+                if len(en_curso) >= args.paralelo * 2:
+                    listos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                    for futuro in listos:
+                        registrar_grupo(futuro)
+                en_curso.add(executor.submit(cargar_grupo, items))
+            
+            try:
+                for numero, linea in enumerate(entrada, 1):
+                    linea = linea.strip()
+                    if not linea:
+                        continue
+                    try:
+                        datos_cliente = json.loads(linea)
+                    except json.JSONDecodeError as e:
+                        registrar({"linea": numero, "clave": None, "ok": False, "id_cliente": None, "existente": False,
+                                   "posible_duplicado": None, "intentos": 0,
+                                   "datos": None, "error": f"JSON inválido: {e}", "segundos": 0.0})
+                        continue
+                    if clave_registro(datos_cliente) in hechos:
+                        salteados += 1
+                        continue
+                    
+                    if not sesion_lista:
+                        # La primera reserva sola: un único login para todo el lote
+                        [resultado] = cargar_grupo([(numero, datos_cliente)])
+                        registrar(resultado)
+                        sesion_lista = resultado["ok"]
+                        continue
+                    
+                    grupo.append((numero, datos_cliente))
+                    if len(grupo) >= pestanas:
+                        enviar(grupo)
+                        grupo = []
+                if grupo:
+                    enviar(grupo)
+                
+                for futuro in wait(en_curso).done:
+                    registrar_grupo(futuro)
+            except KeyboardInterrupt:
+                # Solo se cancelan los grupos que no arrancaron. Los que ya están enviando formularios
+                # se esperan y quedan en el checkpoint: si no, al reanudar se cargarían dos veces
+                interrumpido.set()
+                for futuro in list(en_curso):
+                    if futuro.cancel():
+                        en_curso.discard(futuro)
+                print(f"\n⏹️  Lote interrumpido: esperando {len(en_curso)} grupos en curso para registrarlos",
+                      file=sys.stderr)
+                try:
+                    for futuro in wait(en_curso).done:
+                        registrar_grupo(futuro)
+                except KeyboardInterrupt:
+                    for futuro in [f for f in en_curso if f.done()]:
+                        registrar_grupo(futuro)
+                    print("⚠️  Salida sin esperar: revisar en SACH las reservas de los grupos en curso", file=sys.stderr)
+                print("⏹️  Se reanuda desde el checkpoint en la próxima ejecución", file=sys.stderr)
+    finally:
+        pool.cerrar()
+        if entrada is not sys.stdin:
+            entrada.close()
+        if salida is not sys.stdout:
+            salida.close()
+    
+    transcurrido = time.perf_counter() - inicio
+    procesadas = ok + fallidos
+    print(f"\n=== RESUMEN DEL LOTE ===", file=sys.stderr)
+    print(f"✅ {ok} cargadas | ❌ {fallidos} fallidas | ⏭️ {salteados} ya cargadas | ⏱️ {transcurrido:.1f}s", file=sys.stderr)
+    print(f"📈 {procesadas / transcurrido * 60 if transcurrido else 0.0:.1f} reservas/minuto | "
+          f"🔐 {obtener_gestor_sesion().estadisticas().get('logins', 0)} logins", file=sys.stderr)
+    return 0 if fallidos == 0 else 1
 
 def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == "lote":
+        sys.exit(cargar_lote(sys.argv[2:]))
+    
     if len(sys.argv) != 2:
         print("Uso: python cargar_reserva.py '<datos_json>'")
+        print("     python cargar_reserva.py lote <reservas.jsonl|-> [--paralelo N] [--pestanas N] [--salida resultados.jsonl]")
         print("Ejemplo: python cargar_reserva.py '{\"nombre\":\"Juan Pérez\",\"cabana\":\"Cabaña 3\",\"fecha_entrada\":\"2024-02-15\",\"noches\":3,\"precio\":15000}'")
         sys.exit(1)
     
+    configurar_logging(formato_por_defecto="texto")
+    
     try:
         datos_json = sys.argv[1]
         datos_cliente = json.loads(datos_json)
@@ -834,6 +1508,12 @@ def main():
             print("✅ Cliente procesado exitosamente")
         else:
             print("❌ Error procesando cliente")
+        
+        print("\n⏱️ TIEMPOS POR PASO")
+        registro_esperas.imprimir_reporte()
+        
+        stats = obtener_resolutor().estadisticas()
+        print(f"\n🎯 Round trips de selectores: {stats['round_trips']} (sin memoria: {stats['round_trips_sin_cache']})")
             
     except json.JSONDecodeError:
         print("❌ Error: JSON inválido")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Cliente de la Graph API de WhatsApp
+Una sola sesión HTTP con keep-alive para todos los llamados (sin un handshake TLS por request),
+con timeouts, reintentos acotados con backoff y latencia por endpoint. Las lecturas (GET) se
+reintentan en 429/5xx; el envío de mensajes (POST) no es idempotente y solo se reintenta
+cuando consta que Graph no lo procesó: 429 o error de conexión antes de mandarlo
+"""
+
+import os
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class ErrorGraph(Exception):
+    """Respuesta no exitosa de la Graph API"""
+
+    def __init__(self, mensaje, status_code=None, cuerpo=None):
+        super().__init__(mensaje)
+        self.status_code = status_code
+        self.cuerpo = cuerpo
+
+
+class ReintentosGraph(Retry):
+    """Retry de urllib3 que a un POST solo lo repite ante un 429 (un 5xx puede llegar con el mensaje ya aceptado)"""
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if method.upper() == "POST":
+            return status_code == 429 and bool(self.total)
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class ClienteGraph:
+    """Cliente compartido (thread-safe) de la Graph API con pool de conexiones"""
+
+    def __init__(self, token, phone_number_id, base_url=None, version="v18.0",
+                 timeout=(5, 30), reintentos=3, backoff=0.5, tamano_pool=10):
+        self.token = token
+        self.phone_number_id = phone_number_id
+        self.base_url = (base_url or os.getenv('GRAPH_API_URL', 'https://graph.facebook.com')).rstrip('/')
+        self.version = version
+        self.timeout = timeout
+
+        # allowed_methods solo GET: un POST cortado después de enviarse (timeout de lectura) no se repite;
+        # los errores de conexión se reintentan en cualquier método porque el request no salió
+        reintento = ReintentosGraph(
+            total=reintentos,
+            backoff_factor=backoff,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adaptador = HTTPAdapter(pool_connections=tamano_pool, pool_maxsize=tamano_pool, max_retries=reintento)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adaptador)
+        self.session.mount("http://", adaptador)
+        self.session.headers["Authorization"] = f"Bearer {token}"
+
+        self._lock = threading.Lock()
+        self._latencias = {}
+
+    def _url(self, ruta):
+        return f"{self.base_url}/{self.version}/{ruta}"
+
+    def _registrar(self, endpoint, segundos, ok):
+        with self._lock:
+            m = self._latencias.setdefault(endpoint, {"llamadas": 0, "errores": 0, "total": 0.0, "max": 0.0})
+            m["llamadas"] += 1
+            m["total"] += segundos
+            m["max"] = max(m["max"], segundos)
+            if not ok:
+                m["errores"] += 1
+
+    def _request(self, endpoint, metodo, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        inicio = time.perf_counter()
+        ok = False
+        try:
+            response = self.session.request(metodo, url, **kwargs)
+            ok = response.status_code == 200
+            return response
+        finally:
+            self._registrar(endpoint, time.perf_counter() - inicio, ok)
+
+    def obtener_url_media(self, media_id):
+        """URL de descarga de un media de WhatsApp"""
+        response = self._request("media", "GET", self._url(media_id))
+        if response.status_code != 200:
+            raise ErrorGraph(f"Error getting media URL: {response.status_code} - {response.text}",
+                             response.status_code, response.text)
+        return response.json()['url']
+
+    def descargar_media(self, media_url):
+        """Descarga el contenido completo de un media"""
+        response = self._request("descarga", "GET", media_url)
+        if response.status_code != 200:
+            raise ErrorGraph(f"Error downloading audio: {response.status_code}", response.status_code)
+        return response.content
+
+    def descargar_media_stream(self, media_url, tamano_chunk=64 * 1024):
+        """Descarga un media en chunks sin cargar el cuerpo completo en la respuesta"""
+        inicio = time.perf_counter()
+        ok = False
+        try:
+            with self.session.get(media_url, stream=True, timeout=self.timeout) as response:
+                if response.status_code != 200:
+                    raise ErrorGraph(f"Error downloading audio: {response.status_code}", response.status_code)
+                for chunk in response.iter_content(chunk_size=tamano_chunk):
+                    yield chunk
+                ok = True
+        finally:
+            self._registrar("descarga", time.perf_counter() - inicio, ok)
+
+    def enviar_texto(self, numero, texto):
+        """Envía un mensaje de texto; devuelve la respuesta"""
+        data = {
+            "messaging_product": "whatsapp",
+            "to": numero,
+            "type": "text",
+            "text": {
+                "body": texto
+            }
+        }
+        return self._request("mensajes", "POST", self._url(f"{self.phone_number_id}/messages"), json=data)
+
+    def estadisticas(self):
+        """Latencia y errores por endpoint"""
+        with self._lock:
+            return {
+                endpoint: {
+                    "llamadas": m["llamadas"],
+                    "errores": m["errores"],
+                    "promedio_ms": round(m["total"] / m["llamadas"] * 1000, 1) if m["llamadas"] else 0.0,
+                    "max_ms": round(m["max"] * 1000, 1),
+                }
+                for endpoint, m in self._latencias.items()
+            }
+
+    def cerrar(self):
+        self.session.close()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Cola de Trabajos persistente
+Desacopla el webhook del pipeline audio→SACH: el webhook encola y responde al instante,
+un pool de workers con concurrencia acotada drena la cola guardada en SQLite.
+Varios procesos (workers de gunicorn) pueden compartir el mismo archivo de cola.
+Un manejador que lanza una excepción se reintenta con backoff exponencial (disponible_en);
+ErrorDefinitivo lo da por fallido sin reintentar.
+"""
+
+import logging
+import os
+import socket
+import json
+import time
+import sqlite3
+import threading
+import traceback
+from contextlib import contextmanager
+from metricas import metricas
+
+log = logging.getLogger("cola_trabajos")
+
+
+class ErrorDefinitivo(Exception):
+    """El trabajo falló y reintentarlo no sirve o es peligroso (p. ej. un guardado sin confirmar)"""
+
+
+def _proceso_vivo(dueno):
+    """dueno es 'host:pid'; en otro host (contenedor anterior) se da por muerto"""
+    host, _, pid = (dueno or "").rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ColaTrabajos:
+    """
+    Cola durable en SQLite con workers en hilos.
+    Los trabajos que quedaron 'procesando' en un proceso que ya no existe se reencolan al iniciar
+    con el backoff de su intento (o quedan fallidos si ya agotaron los intentos);
+    los de otros procesos vivos que comparten la cola no se tocan.
+    Cada worker reclama con su propia conexión y fuera del lock del proceso: esperar el lock de
+    escritura de SQLite de otro proceso no frena a encolar(), que solo comparte la conexión del webhook.
+    """
+
+    def __init__(self, ruta_db=None, workers=None, max_intentos=None, backoff=None, backoff_max=None):
+        self.ruta_db = ruta_db or os.getenv('COLA_DB', 'cola_trabajos.db')
+        self.workers = workers or int(os.getenv('COLA_WORKERS', '2'))
+        self.max_intentos = max_intentos or int(os.getenv('COLA_MAX_INTENTOS', '3'))
+        # Espera antes del reintento n: backoff * 2^(n-1), con techo backoff_max (segundos)
+        self.backoff = backoff if backoff is not None else float(os.getenv('COLA_BACKOFF_S', '5'))
+        self.backoff_max = backoff_max if backoff_max is not None else float(os.getenv('COLA_BACKOFF_MAX_S', '300'))
+
+        self._manejadores = {}
+        self._al_fallar = {}
+        self._hilos = []
+        self._lock = threading.Lock()
+        # La Condition solo despierta workers; _avisos evita perder un aviso entre reclamar y esperar
+        self._hay_trabajo = threading.Condition(self._lock)
+        self._avisos = 0
+        self._detener = False
+        # Conexión compartida por encolar() y las estadísticas (hilos de Flask)
+        self._lock_conn = threading.Lock()
+
+        # Métricas en memoria
+        self._procesando = 0
+        self._hechos = 0
+        self._fallidos = 0
+        self._reintentos = 0
+        self._espera = {"cantidad": 0, "total": 0.0, "max": 0.0}
+        self._proceso = {"cantidad": 0, "total": 0.0, "max": 0.0}
+        self._etapas = {}
+
+        self._dueno = f"{socket.gethostname()}:{os.getpid()}"
+        self._conn = self._conectar()
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS trabajos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tipo TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                estado TEXT NOT NULL DEFAULT 'pendiente',
+                intentos INTEGER NOT NULL DEFAULT 0,
+                creado REAL NOT NULL,
+                error TEXT,
+                dueno TEXT,
+                disponible_en REAL NOT NULL DEFAULT 0
+            )
+        """)
+        columnas = {fila[1] for fila in self._conn.execute("PRAGMA table_info(trabajos)")}
+        if "dueno" not in columnas:
+            self._conn.execute("ALTER TABLE trabajos ADD COLUMN dueno TEXT")
+        if "disponible_en" not in columnas:
+            self._conn.execute("ALTER TABLE trabajos ADD COLUMN disponible_en REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_trabajos_estado ON trabajos(estado, id)")
+
+        self._recuperar()
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.ruta_db, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _recuperar(self):
+        """
+        Trabajos que quedaron a medias en un reinicio o en un worker caído: el intento interrumpido
+        cuenta (puede haber sido el que tiró el proceso, o un guardado en SACH a mitad del envío),
+        así que vuelven con backoff o quedan fallidos si llegaron al máximo de intentos
+        """
+        recuperados = fallidos = 0
+        ahora = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            for id_trabajo, dueno, intentos in self._conn.execute(
+                "SELECT id, dueno, intentos FROM trabajos WHERE estado = 'procesando'"
+            ).fetchall():
+                if _proceso_vivo(dueno):
+                    continue
+                error = f"Interrumpido en el intento {intentos}: el proceso {dueno} terminó durante el trabajo"
+                if intentos >= self.max_intentos:
+                    self._conn.execute(
+                        "UPDATE trabajos SET estado = 'fallido', error = ? WHERE id = ?", (error, id_trabajo)
+                    )
+                    fallidos += 1
+                else:
+                    disponible_en = ahora + self._espera_reintento(intentos) if intentos else 0
+                    self._conn.execute(
+                        "UPDATE trabajos SET estado = 'pendiente', error = ?, disponible_en = ? WHERE id = ?",
+                        (error, disponible_en, id_trabajo)
+                    )
+                    recuperados += 1
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        if recuperados:
+            log.info(f"♻️ {recuperados} trabajos recuperados de la ejecución anterior")
+        if fallidos:
+            log.error(f"❌ {fallidos} trabajos interrumpidos ya habían agotado los intentos: quedan fallidos")
+
+    def registrar(self, tipo, funcion, al_fallar=None):
+        """
+        Asocia un tipo de trabajo con la función que lo procesa: funcion(payload).
+        al_fallar(payload, error) corre una sola vez, cuando el trabajo queda fallido
+        (sin más reintentos), p. ej. para avisarle al usuario
+        """
+        self._manejadores[tipo] = funcion
+        if al_fallar:
+            self._al_fallar[tipo] = al_fallar
+
+    def encolar(self, tipo, payload):
+        """Guarda el trabajo en disco y despierta a un worker; devuelve el id"""
+        with self._lock_conn:
+            cursor = self._conn.execute(
+                "INSERT INTO trabajos (tipo, payload, creado) VALUES (?, ?, ?)",
+                (tipo, json.dumps(payload), time.time())
+            )
+        self._avisar()
+        return cursor.lastrowid
+
+    def _avisar(self):
+        with self._hay_trabajo:
+            self._avisos += 1
+            self._hay_trabajo.notify()
+
+    def _reclamar(self, conn):
+        """
+        Toma el trabajo pendiente más antiguo cuyo backoff ya pasó, con la conexión del worker.
+        BEGIN IMMEDIATE hace atómico el SELECT + UPDATE frente a otros hilos y procesos.
+        """
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            fila = conn.execute(
+                "SELECT id, tipo, payload, intentos, creado FROM trabajos "
+                "WHERE estado = 'pendiente' AND disponible_en <= ? ORDER BY id LIMIT 1",
+                (time.time(),)
+            ).fetchone()
+            if fila:
+                conn.execute(
+                    "UPDATE trabajos SET estado = 'procesando', intentos = intentos + 1, dueno = ? WHERE id = ?",
+                    (self._dueno, fila[0])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return fila
+
+    def _hasta_proximo(self, conn):
+        """Segundos hasta que un reintento en backoff quede disponible (máximo 5: otros procesos encolan)"""
+        proximo = conn.execute(
+            "SELECT MIN(disponible_en) FROM trabajos WHERE estado = 'pendiente'"
+        ).fetchone()[0]
+        if proximo is None:
+            return 5
+        return min(5, max(proximo - time.time(), 0.01))
+
+    def _espera_reintento(self, intento):
+        return min(self.backoff * 2 ** (intento - 1), self.backoff_max)
+
+    def _worker(self):
+        conn = self._conectar()
+        try:
+            while True:
+                with self._hay_trabajo:
+                    if self._detener:
+                        return
+                    aviso = self._avisos
+                fila = self._reclamar(conn)
+                if fila is None:
+                    espera = self._hasta_proximo(conn)
+                    with self._hay_trabajo:
+                        if self._avisos == aviso and not self._detener:
+                            self._hay_trabajo.wait(timeout=espera)
+                    continue
+                self._procesar(conn, fila)
+        finally:
+            conn.close()
+
+    def _procesar(self, conn, fila):
+        with self._lock:
+            self._procesando += 1
+
+        id_trabajo, tipo, payload, intentos, creado = fila
+        inicio = time.time()
+        self._registrar_tiempo(self._espera, inicio - creado)
+        metricas.observar("sach_cola_espera_segundos", inicio - creado, tipo=tipo)
+
+        intento = intentos + 1
+        error = None
+        definitivo = False
+        try:
+            manejador = self._manejadores.get(tipo)
+            if manejador is None:
+                raise ErrorDefinitivo(f"Tipo de trabajo desconocido: {tipo}")
+            manejador(json.loads(payload))
+        except ErrorDefinitivo as e:
+            error, definitivo = str(e), True
+            log.error(f"❌ Trabajo {id_trabajo} ({tipo}) falló sin reintento: {error}")
+        except Exception:
+            error = traceback.format_exc()
+            log.error(f"❌ Trabajo {id_trabajo} ({tipo}) falló (intento {intento} de {self.max_intentos}): {error}")
+
+        duracion = time.time() - inicio
+        self._registrar_tiempo(self._proceso, duracion)
+        metricas.observar("sach_cola_proceso_segundos", duracion, tipo=tipo,
+                          resultado="ok" if error is None else "error")
+        if error is None:
+            conn.execute("DELETE FROM trabajos WHERE id = ?", (id_trabajo,))
+            with self._lock:
+                self._procesando -= 1
+                self._hechos += 1
+            return
+        if not definitivo and intento < self.max_intentos:
+            conn.execute(
+                "UPDATE trabajos SET estado = 'pendiente', error = ?, disponible_en = ? WHERE id = ?",
+                (error, time.time() + self._espera_reintento(intento), id_trabajo)
+            )
+            with self._lock:
+                self._procesando -= 1
+                self._reintentos += 1
+            self._avisar()
+            return
+        conn.execute("UPDATE trabajos SET estado = 'fallido', error = ? WHERE id = ?", (error, id_trabajo))
+        with self._lock:
+            self._procesando -= 1
+            self._fallidos += 1
+        al_fallar = self._al_fallar.get(tipo)
+        if al_fallar:
+            try:
+                al_fallar(json.loads(payload), error)
+            except Exception as e:
+                log.warning(f"⚠️ Aviso de falla del trabajo {id_trabajo} no enviado: {e}")
+
+    def _registrar_tiempo(self, acumulado, segundos):
+        with self._lock:
+            acumulado["cantidad"] += 1
+            acumulado["total"] += segundos
+            acumulado["max"] = max(acumulado["max"], segundos)
+
+    @contextmanager
+    def etapa(self, nombre):
+        """Mide el tiempo de una etapa del pipeline (descarga, whisper, llama, sach...)"""
+        inicio = time.time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                acumulado = self._etapas.setdefault(nombre, {"cantidad": 0, "total": 0.0, "max": 0.0})
+            duracion = time.time() - inicio
+            self._registrar_tiempo(acumulado, duracion)
+            metricas.observar("sach_pipeline_etapa_segundos", duracion, etapa=nombre)
+
+    def iniciar(self):
+        """Arranca los workers (una sola vez)"""
+        if self._hilos:
+            return
+        self._detener = False
+        for i in range(self.workers):
+            hilo = threading.Thread(target=self._worker, name=f"cola-worker-{i}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def detener(self, esperar=True, timeout=None):
+        """
+        Deja de tomar trabajos nuevos y espera (hasta timeout segundos en total) a que terminen
+        los que están en proceso; los pendientes quedan en disco para el próximo inicio.
+        Devuelve True si no quedó ningún trabajo a medias.
+        """
+        with self._hay_trabajo:
+            self._detener = True
+            self._hay_trabajo.notify_all()
+        if esperar:
+            limite = time.time() + timeout if timeout is not None else None
+            for hilo in self._hilos:
+                hilo.join(None if limite is None else max(limite - time.time(), 0))
+        vivos = [hilo for hilo in self._hilos if hilo.is_alive()]
+        self._hilos = []
+        return not vivos
+
+    def en_backoff(self):
+        """Pendientes que esperan su próximo reintento"""
+        with self._lock_conn:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM trabajos WHERE estado = 'pendiente' AND disponible_en > ?", (time.time(),)
+            ).fetchone()[0]
+
+    def profundidad(self):
+        with self._lock_conn:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM trabajos WHERE estado = 'pendiente'"
+            ).fetchone()[0]
+
+    def estadisticas(self):
+        """Profundidad de la cola, tiempos de espera y de proceso por etapa"""
+        def resumen(acumulado):
+            cantidad = acumulado["cantidad"]
+            return {
+                "cantidad": cantidad,
+                "promedio_s": round(acumulado["total"] / cantidad, 3) if cantidad else 0.0,
+                "max_s": round(acumulado["max"], 3),
+            }
+
+        profundidad = self.profundidad()
+        en_backoff = self.en_backoff()
+        with self._lock_conn:
+            fallidos_db = self._conn.execute(
+                "SELECT COUNT(*) FROM trabajos WHERE estado = 'fallido'"
+            ).fetchone()[0]
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "profundidad": profundidad,
+                "en_backoff": en_backoff,
+                "procesando": self._procesando,
+                "hechos": self._hechos,
+                "reintentos": self._reintentos,
+                "fallidos": self._fallidos,
+                "fallidos_en_disco": fallidos_db,
+                "espera": resumen(self._espera),
+                "proceso": resumen(self._proceso),
+                "etapas": {nombre: resumen(a) for nombre, a in self._etapas.items()},
+            }
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Deduplicador de mensajes de WhatsApp
+Meta reenvía los webhooks lentos: recordamos los message['id'] ya vistos
+durante un TTL para no transcribir ni cargar dos veces el mismo audio
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class DeduplicadorMensajes:
+    """
+    Índice de ids vistos con TTL.
+    En memoria es un OrderedDict en orden de llegada: consultar es O(1) y expirar
+    solo mira la punta más vieja. Con ruta_db se persiste en SQLite para sobrevivir reinicios
+    y para deduplicar entre varios procesos que comparten el archivo.
+    """
+
+    def __init__(self, ttl=None, max_entradas=None, ruta_db=None):
+        self.ttl = ttl or float(os.getenv('DEDUP_TTL', '86400'))
+        self.max_entradas = max_entradas or int(os.getenv('DEDUP_MAX', '1000000'))
+        self.ruta_db = ruta_db if ruta_db is not None else os.getenv('DEDUP_DB') or None
+
+        self._vistos = OrderedDict()
+        self._lock = threading.Lock()
+        self._consultas = 0
+        self._duplicados = 0
+        self._conn = None
+
+        if self.ruta_db:
+            self._conn = sqlite3.connect(self.ruta_db, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS mensajes_vistos (id TEXT PRIMARY KEY, visto REAL NOT NULL)")
+            limite = time.time() - self.ttl
+            self._conn.execute("DELETE FROM mensajes_vistos WHERE visto < ?", (limite,))
+            for id_mensaje, visto in self._conn.execute("SELECT id, visto FROM mensajes_vistos ORDER BY visto"):
+                self._vistos[id_mensaje] = visto
+
+    def _expirar(self, ahora):
+        """Descarta desde la punta vieja lo vencido o lo que excede el máximo"""
+        limite = ahora - self.ttl
+        while self._vistos:
+            id_mensaje, visto = next(iter(self._vistos.items()))
+            if visto >= limite and len(self._vistos) <= self.max_entradas:
+                break
+            self._vistos.popitem(last=False)
+
+    def es_duplicado(self, id_mensaje):
+        """
+        Registra el id y devuelve True si ya se había visto dentro del TTL.
+        Chequeo y marca son atómicos: dos entregas simultáneas no pasan las dos.
+        """
+        if not id_mensaje:
+            return False
+
+        ahora = time.time()
+        with self._lock:
+            self._consultas += 1
+            self._expirar(ahora)
+            if id_mensaje in self._vistos:
+                self._duplicados += 1
+                return True
+            if self._conn:
+                # El disco es la fuente de verdad entre procesos: si otro worker ya lo registró
+                # dentro del TTL, el upsert no cambia ninguna fila
+                marcado = self._conn.execute(
+                    "INSERT INTO mensajes_vistos (id, visto) VALUES (?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET visto = excluded.visto WHERE visto < ?",
+                    (id_mensaje, ahora, ahora - self.ttl)
+                ).rowcount
+                # Limpieza ocasional del disco, no en cada mensaje
+                if self._consultas % 1000 == 0:
+                    self._conn.execute("DELETE FROM mensajes_vistos WHERE visto < ?", (ahora - self.ttl,))
+            self._vistos[id_mensaje] = ahora
+            if self._conn and not marcado:
+                self._duplicados += 1
+                return True
+            return False
+
+    def olvidar(self, id_mensaje):
+        """
+        Deshace la marca de es_duplicado cuando el mensaje no se pudo encolar,
+        para que la reentrega de Meta se acepte en lugar de descartarse
+        """
+        if not id_mensaje:
+            return
+        with self._lock:
+            self._vistos.pop(id_mensaje, None)
+            if self._conn:
+                self._conn.execute("DELETE FROM mensajes_vistos WHERE id = ?", (id_mensaje,))
+
+    def __len__(self):
+        return len(self._vistos)
+
+    def estadisticas(self):
+        """Consultas, duplicados descartados y tasa de aciertos"""
+        with self._lock:
+            return {
+                "entradas": len(self._vistos),
+                "ttl_s": self.ttl,
+                "consultas": self._consultas,
+                "duplicados": self._duplicados,
+                "tasa_duplicados": round(self._duplicados / self._consultas, 4) if self._consultas else 0.0,
+                "persistente": self._conn is not None,
+            }
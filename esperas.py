@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Esperas por condiciones para RobotSACH
+Reemplaza los wait_for_timeout fijos por eventos (navegación, URL, elementos visibles)
+con un presupuesto de timeout por paso, humanización opcional y reporte del tiempo ahorrado
+"""
+
+import os
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+# Presupuesto máximo (ms) de cada paso: es un techo, en el caso normal se sale antes
+PRESUPUESTOS_MS = {
+    "login_pagina": 15000,
+    "login_redireccion": 8000,
+    "formulario": 10000,
+    "menu_cliente": 8000,
+    "menu_clic_cliente": 8000,
+    "menu_clic_nuevo": 8000,
+    "guardar": 5000,
+    "guardar_respuesta": 15000,
+    "guardar_rechazo": 2000,
+    "guardar_reserva": 5000,
+}
+
+# Sleeps fijos que había antes en cada paso (para calcular el ahorro)
+LEGADO_MS = {
+    "login_pagina": 2000,
+    "humanizar_usuario": 500,
+    "humanizar_password": 800,
+    "humanizar_click": 1000,
+    "login_redireccion": 2000,
+    "formulario": 3000,
+    "formulario_flujo": 2000,
+    "menu_cliente": 3000,
+    "menu_clic_cliente": 2000,
+    "menu_clic_nuevo": 2000,
+    "guardar": 500,
+    "guardar_reserva": 2000,
+}
+
+
+def _leer_presupuestos():
+    """SACH_PRESUPUESTOS_MS='formulario=6000,guardar=3000' pisa los valores por defecto"""
+    presupuestos = dict(PRESUPUESTOS_MS)
+    for par in os.getenv('SACH_PRESUPUESTOS_MS', '').split(','):
+        if '=' in par:
+            paso, valor = par.split('=', 1)
+            presupuestos[paso.strip()] = int(valor)
+    return presupuestos
+
+
+def _leer_humanizacion():
+    """SACH_HUMANIZAR_MS='300,900' activa pausas aleatorias; vacío = sin pausas"""
+    valor = os.getenv('SACH_HUMANIZAR_MS', '').strip()
+    if not valor:
+        return None
+    minimo, _, maximo = valor.partition(',')
+    return int(minimo), int(maximo or minimo)
+
+
+class RegistroEsperas:
+    """Tiempos reales por paso agregados entre todos los robots del proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pasos = {}
+
+    def registrar(self, paso, segundos):
+        with self._lock:
+            p = self._pasos.setdefault(paso, {"veces": 0, "total": 0.0})
+            p["veces"] += 1
+            p["total"] += segundos
+
+    def reporte(self):
+        """Por paso: promedio real, sleep fijo anterior y ahorro por ejecución"""
+        with self._lock:
+            pasos = {nombre: dict(p) for nombre, p in self._pasos.items()}
+        reporte = {}
+        for nombre, p in sorted(pasos.items()):
+            promedio_ms = p["total"] / p["veces"] * 1000
+            legado = LEGADO_MS.get(nombre)
+            reporte[nombre] = {
+                "veces": p["veces"],
+                "promedio_ms": round(promedio_ms, 1),
+                "legado_ms": legado,
+                "ahorro_ms": round(legado - promedio_ms, 1) if legado is not None else None,
+            }
+        return reporte
+
+    def imprimir_reporte(self):
+        print(f"{'paso':<26} | {'veces':>5} | {'real (ms)':>9} | {'antes (ms)':>10} | {'ahorro (ms)':>11}")
+        for nombre, r in self.reporte().items():
+            legado = r["legado_ms"] if r["legado_ms"] is not None else "-"
+            ahorro = r["ahorro_ms"] if r["ahorro_ms"] is not None else "-"
+            print(f"{nombre:<26} | {r['veces']:>5} | {r['promedio_ms']:>9} | {legado:>10} | {ahorro:>11}")
+
+
+registro_esperas = RegistroEsperas()
+
+
+class Esperas:
+    """Capa de esperas de un robot: cada método sale apenas se cumple la condición"""
+
+    def __init__(self, presupuestos=None, humanizacion=None, registro=None):
+        self.presupuestos = presupuestos or _leer_presupuestos()
+        self.humanizacion = humanizacion if humanizacion is not None else _leer_humanizacion()
+        self.registro = registro or registro_esperas
+
+    def presupuesto(self, paso):
+        return self.presupuestos.get(paso, 10000)
+
+    @contextmanager
+    def medir(self, paso):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registro.registrar(paso, time.perf_counter() - inicio)
+
+    def ir(self, page, url, paso):
+        """Navega y vuelve con el DOM listo (sin esperar imágenes ni un sleep fijo)"""
+        with self.medir(f"{paso}_navegacion"):
+            return page.goto(url, wait_until="domcontentloaded", timeout=self.presupuesto(paso))
+
+    def elemento_visible(self, page, selector, paso):
+        """Espera a que el selector (puede ser una unión CSS) esté visible; True/False"""
+        with self.medir(paso):
+            try:
+                page.wait_for_selector(selector, state="visible", timeout=self.presupuesto(paso))
+                return True
+            except Exception:
+                return False
+
+    def url_sin(self, page, fragmento, paso):
+        """Espera a que la URL deje de contener 'fragmento' (redirección tras login o guardado)"""
+        with self.medir(paso):
+            try:
+                page.wait_for_url(lambda url: fragmento not in url, timeout=self.presupuesto(paso))
+                return True
+            except Exception:
+                return False
+
+    def respuesta(self, page, predicado, paso):
+        """
+        Empieza a escuchar la respuesta que cumple 'predicado'; se llama antes de la acción que
+        la dispara. Devuelve la espera: su .value trae la respuesta o lanza si vence el presupuesto
+        """
+        # El listener queda registrado al crearla; sin 'with' para esperar más tarde (pestañas)
+        return page.expect_response(predicado, timeout=self.presupuesto(paso)).__enter__()
+
+    def red_inactiva(self, page, paso):
+        """Espera a que no haya requests en vuelo (para pantallas sin un elemento claro de 'listo')"""
+        with self.medir(paso):
+            try:
+                page.wait_for_load_state("networkidle", timeout=self.presupuesto(paso))
+                return True
+            except Exception:
+                return False
+
+    def humanizar(self, page, paso):
+        """Pausa aleatoria solo si se configuró SACH_HUMANIZAR_MS"""
+        with self.medir(paso):
+            if self.humanizacion:
+                page.wait_for_timeout(random.uniform(*self.humanizacion))
+
+
+class EsperasAsync(Esperas):
+    """Las mismas esperas para páginas de async_playwright (corrutinas)"""
+
+    async def ir(self, page, url, paso):
+        with self.medir(f"{paso}_navegacion"):
+            return await page.goto(url, wait_until="domcontentloaded", timeout=self.presupuesto(paso))
+
+    async def elemento_visible(self, page, selector, paso):
+        with self.medir(paso):
+            try:
+                await page.wait_for_selector(selector, state="visible", timeout=self.presupuesto(paso))
+                return True
+            except Exception:
+                return False
+
+    async def url_sin(self, page, fragmento, paso):
+        with self.medir(paso):
+            try:
+                await page.wait_for_url(lambda url: fragmento not in url, timeout=self.presupuesto(paso))
+                return True
+            except Exception:
+                return False
+
+    async def respuesta(self, page, predicado, paso):
+        return await page.expect_response(predicado, timeout=self.presupuesto(paso)).__aenter__()
+
+    async def red_inactiva(self, page, paso):
+        with self.medir(paso):
+            try:
+                await page.wait_for_load_state("networkidle", timeout=self.presupuesto(paso))
+                return True
+            except Exception:
+                return False
+
+    async def humanizar(self, page, paso):
+        with self.medir(paso):
+            if self.humanizacion:
+                await page.wait_for_timeout(random.uniform(*self.humanizacion))
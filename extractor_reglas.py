@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Extractor de reservas por reglas
+Parser determinístico para frases formulaicas ("Cabaña 5 para el 15 de febrero de 2024,
+3 noches, 18.000 pesos"). Si falta un campo o es ambiguo se deja en None y decide el LLM.
+El precio es el total: un precio por noche se multiplica por las noches.
+"""
+
+import re
+import unicodedata
+
+CAMPOS_REQUERIDOS = ("nombre", "cabana", "fecha_entrada", "noches", "precio")
+
+MESES = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6,
+    "julio": 7, "agosto": 8, "septiembre": 9, "setiembre": 9, "octubre": 10,
+    "noviembre": 11, "diciembre": 12,
+}
+
+NUMEROS = {
+    "un": 1, "una": 1, "uno": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5,
+    "seis": 6, "siete": 7, "ocho": 8, "nueve": 9, "diez": 10, "once": 11,
+    "doce": 12, "catorce": 14, "quince": 15, "veinte": 20, "treinta": 30,
+}
+
+_NUMERO = r"(\d+|" + "|".join(NUMEROS) + r")"
+
+RE_FECHA_TEXTO = re.compile(
+    r"\b(\d{1,2})\s+de\s+(" + "|".join(MESES) + r")(?:\s+(?:de|del)\s+(\d{4}))?",
+    re.IGNORECASE
+)
+RE_FECHA_NUMERICA = re.compile(r"\b(\d{1,2})[/-](\d{1,2})[/-](\d{4})\b")
+RE_CABANA = re.compile(r"\bcaba[ñn]a\s*(?:n(?:[uú]mero|ro\.?|°|º)\s*)?" + _NUMERO + r"\b", re.IGNORECASE)
+RE_NOCHES = re.compile(r"\b" + _NUMERO + r"\s+noches?\b", re.IGNORECASE)
+RE_PRECIO = re.compile(
+    r"(?:\$\s*(\d{1,3}(?:\.\d{3})+|\d+)(\s*mil)?)"
+    r"|(?:\b(\d{1,3}(?:\.\d{3})+|\d+)(\s*mil)?\s*(?:pesos|\$))",
+    re.IGNORECASE
+)
+# "20.000 pesos por noche", "$20.000 la noche", "20.000 c/noche", "18.000 pesos cada una" / "la noche sale $20.000"
+RE_POR_NOCHE_DESPUES = re.compile(
+    r"\s*(?:(?:por|la|cada|x|c/|/)\s*noche\b|cada\s+una\b|c/u\b|por\s+d[ií]a\b)", re.IGNORECASE
+)
+RE_POR_NOCHE_ANTES = re.compile(
+    r"\b(?:por|la|cada|x|c/)\s*noche\s*(?:sale|cuesta|es|son|vale)?\s*(?:a|de)?\s*$", re.IGNORECASE
+)
+# Palabras de la reserva que pueden venir capitalizadas sin puntuación antes ("Juan Pérez Cabaña 3")
+PALABRAS_NO_NOMBRE = (
+    "caba[ñn]as?", "noches?", "d[ií]as?", "el", "la", "los", "las", "para", "por", "del", "de", "desde",
+    "hasta", "con", "en", "al", "y", "entrada", "ingreso", "pesos", "precio", "fecha",
+) + tuple(MESES)
+_PALABRA_NOMBRE = r"(?!(?i:" + "|".join(PALABRAS_NO_NOMBRE) + r")\b)[A-ZÁÉÍÓÚÑ][a-záéíóúñü]+"
+# Solo el prefijo ignora mayúsculas: el nombre tiene que venir capitalizado para no comerse la frase
+RE_NOMBRE = re.compile(
+    r"(?i:mi nombre es|me llamo|a nombre de|reserva para|el nombre es)\s+"
+    r"(" + _PALABRA_NOMBRE + r"(?:\s+(?:(?:de|del|la|las|los)\s+)*" + _PALABRA_NOMBRE + r"){0,3})"
+)
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sin acentos ni puntuación y espacios colapsados (clave de caché)"""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r"[^\w$/.-]+", " ", texto)
+    return " ".join(texto.split()).strip(" .")
+
+
+def _a_entero(valor):
+    valor = valor.lower()
+    return NUMEROS[valor] if valor in NUMEROS else int(valor)
+
+
+def _unico(valores):
+    """El valor si todas las menciones coinciden; None si no hay o son ambiguas"""
+    distintos = set(valores)
+    return distintos.pop() if len(distintos) == 1 else None
+
+
+def _fechas(texto):
+    for dia, mes, anio in RE_FECHA_TEXTO.findall(texto):
+        # Sin año la fecha es ambigua (¿este año o el próximo?): que decida el LLM
+        if anio:
+            yield f"{int(anio):04d}-{MESES[mes.lower()]:02d}-{int(dia):02d}"
+    for dia, mes, anio in RE_FECHA_NUMERICA.findall(texto):
+        if 1 <= int(mes) <= 12:
+            yield f"{int(anio):04d}-{int(mes):02d}-{int(dia):02d}"
+
+
+def _precios(texto):
+    """(importe, es_por_noche) por cada precio mencionado"""
+    for m in RE_PRECIO.finditer(texto):
+        con_signo, mil_signo, con_pesos, mil_pesos = m.groups()
+        numero = int((con_signo or con_pesos).replace(".", ""))
+        if mil_signo or mil_pesos:
+            numero *= 1000
+        por_noche = bool(
+            RE_POR_NOCHE_DESPUES.match(texto, m.end())
+            or RE_POR_NOCHE_ANTES.search(texto, max(0, m.start() - 30), m.start())
+        )
+        yield numero, por_noche
+
+
+def _precio_total(precios, noches):
+    """Lleva los precios por noche al total; sin la cantidad de noches queda para el LLM"""
+    totales = []
+    for numero, por_noche in precios:
+        if por_noche:
+            if noches is None:
+                return None
+            numero *= noches
+        totales.append(numero)
+    return _unico(totales)
+
+
+def extraer_por_reglas(texto):
+    """Devuelve el dict de reserva con None en los campos no encontrados o ambiguos"""
+    if not texto:
+        return dict.fromkeys(CAMPOS_REQUERIDOS)
+
+    nombres = [" ".join(n.split()) for n in RE_NOMBRE.findall(texto)]
+    cabanas = [_a_entero(c) for c in RE_CABANA.findall(texto)]
+    noches = [_a_entero(n) for n in RE_NOCHES.findall(texto)]
+
+    cabana = _unico(cabanas)
+    cantidad_noches = _unico(noches)
+    return {
+        "nombre": _unico(nombres),
+        "cabana": f"Cabaña {cabana}" if cabana is not None else None,
+        "fecha_entrada": _unico(_fechas(texto)),
+        "noches": cantidad_noches,
+        "precio": _precio_total(_precios(texto), cantidad_noches),
+    }
+
+
+def datos_completos(datos):
+    return all(datos.get(campo) is not None for campo in CAMPOS_REQUERIDOS)
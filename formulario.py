@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Llenado de formularios en un solo round trip
+En lugar de un fill() + input_value() por campo, todo el mapa de campos se llena y valida
+dentro de una única llamada a page.evaluate, disparando los eventos input/change que
+esperan los formularios de SACH.
+"""
+
+import logging
+import os
+
+log = logging.getLogger("formulario")
+
+# Recibe [{nombre, selectores, valor}] y devuelve un resultado por campo.
+# Usa el setter nativo de value para que los listeners del framework vean el cambio.
+LLENADO_JS = """
+(campos) => {
+    const buscar = (sel) => {
+        if (sel.startsWith('//') || sel.startsWith('xpath=')) {
+            return document.evaluate(sel.replace(/^xpath=/, ''), document, null,
+                                     XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        }
+        return document.querySelector(sel);
+    };
+    const setterNativo = (el) => {
+        const proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype
+                    : el instanceof HTMLSelectElement ? HTMLSelectElement.prototype
+                    : HTMLInputElement.prototype;
+        return Object.getOwnPropertyDescriptor(proto, 'value').set;
+    };
+    return campos.map(({nombre, selectores, valor}) => {
+        const resultado = {nombre, ok: false, selector: null, valor: null, error: null};
+        let el = null;
+        for (const sel of selectores) {
+            try {
+                el = buscar(sel);
+            } catch (e) {
+                continue;
+            }
+            if (el) { resultado.selector = sel; break; }
+        }
+        if (!el) {
+            resultado.error = 'no encontrado';
+            return resultado;
+        }
+        if (el.disabled || el.readOnly) {
+            resultado.error = 'no editable';
+            return resultado;
+        }
+        try {
+            el.focus();
+            setterNativo(el).call(el, String(valor));
+            el.dispatchEvent(new Event('input', {bubbles: true}));
+            el.dispatchEvent(new Event('change', {bubbles: true}));
+            el.blur();
+            resultado.valor = el.value;
+            resultado.ok = el.value === String(valor);
+            if (!resultado.ok) resultado.error = 'el valor no quedó escrito';
+        } catch (e) {
+            resultado.error = String(e);
+        }
+        return resultado;
+    });
+}
+"""
+
+# Atributos de los inputs de la página en un solo evaluate (antes: 3 get_attribute por input)
+DIAGNOSTICO_JS = """
+(limite) => {
+    const inputs = Array.from(document.querySelectorAll('input'));
+    return {
+        total: inputs.length,
+        inputs: inputs.slice(0, limite).map((el) => ({
+            name: el.getAttribute('name') || 'sin-name',
+            id: el.getAttribute('id') || 'sin-id',
+            type: el.getAttribute('type') || 'sin-type',
+        })),
+    };
+}
+"""
+
+
+def modo_debug():
+    """SACH_DEBUG=1 (o LOG_LEVEL=DEBUG) activa los volcados de diagnóstico"""
+    return os.getenv('SACH_DEBUG', '0') == '1' or log.isEnabledFor(logging.DEBUG)
+
+
+def _carga(campos):
+    return [
+        {"nombre": nombre, "selectores": list(selectores), "valor": valor}
+        for nombre, (selectores, valor) in campos.items()
+    ]
+
+
+def _todos_fallidos(carga, error):
+    return {
+        c["nombre"]: {"nombre": c["nombre"], "ok": False, "selector": None, "valor": None, "error": str(error)}
+        for c in carga
+    }
+
+
+def llenar_campos(page, campos):
+    """
+    Llena y valida varios campos en una sola llamada al navegador.
+    'campos' es {nombre: (selectores, valor)}; devuelve {nombre: resultado} con
+    ok, selector usado, valor leído del DOM y error.
+    """
+    carga = _carga(campos)
+    try:
+        resultados = page.evaluate(LLENADO_JS, carga)
+    except Exception as e:
+        return _todos_fallidos(carga, e)
+    return {r["nombre"]: r for r in resultados}
+
+
+async def llenar_campos_async(page, campos):
+    """Como llenar_campos, para páginas de async_playwright"""
+    carga = _carga(campos)
+    try:
+        resultados = await page.evaluate(LLENADO_JS, carga)
+    except Exception as e:
+        return _todos_fallidos(carga, e)
+    return {r["nombre"]: r for r in resultados}
+
+
+def _mostrar_diagnostico(diagnostico):
+    log.debug(f"   Total de inputs encontrados: {diagnostico['total']}")
+    for i, inp in enumerate(diagnostico["inputs"]):
+        log.debug(f"   Input {i}: name={inp['name']}, id={inp['id']}, type={inp['type']}")
+
+
+def diagnosticar_inputs(page, limite=10):
+    """Imprime los primeros inputs de la página (name, id, type)"""
+    try:
+        diagnostico = page.evaluate(DIAGNOSTICO_JS, limite)
+    except Exception as e:
+        log.debug(f"   No se pudo diagnosticar: {e}")
+        return
+    _mostrar_diagnostico(diagnostico)
+
+
+async def diagnosticar_inputs_async(page, limite=10):
+    """Como diagnosticar_inputs, para páginas de async_playwright"""
+    try:
+        diagnostico = await page.evaluate(DIAGNOSTICO_JS, limite)
+    except Exception as e:
+        log.debug(f"   No se pudo diagnosticar: {e}")
+        return
+    _mostrar_diagnostico(diagnostico)
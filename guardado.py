@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Confirmación del guardado en SACH
+El guardado se confirma con la respuesta al POST del formulario de Nuevo Cliente y con la
+URL a la que llega la página (un solo clic, sin Enter de respaldo) y se devuelve un
+ResultadoGuardado con el id del cliente.
+Las capturas de pantalla se sacan solo cuando algo falla y se escriben en segundo plano.
+"""
+
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+log = logging.getLogger("guardado")
+
+SELECTOR_BOTON_GUARDAR = '#ce_hue_btn_guardar'
+SELECTOR_ALERTA_ERROR = '.alert-danger, .alert-error, .error, .invalid-feedback'
+# SACH redirige a /cliente/<id> cuando el cliente quedó creado
+RE_ID_CLIENTE = re.compile(r"/cliente/(\d+)")
+
+# Un solo hilo para escribir capturas: el PNG ya viene del navegador, solo falta el disco
+_escritor_capturas = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sach-capturas")
+
+
+class ResultadoGuardado:
+    """
+    Resultado de enviar el formulario de Nuevo Cliente. Es verdadero solo si SACH confirmó
+    el alta, así que 'if robot.guardar_cliente():' sigue funcionando.
+    """
+
+    __slots__ = ("ok", "id_cliente", "estado_http", "url", "error", "reintentable", "captura", "existente",
+                 "posible_duplicado")
+
+    def __init__(self, ok, id_cliente=None, estado_http=None, url=None, error=None,
+                 reintentable=True, captura=None, existente=False):
+        self.ok = ok
+        self.id_cliente = id_cliente
+        self.estado_http = estado_http
+        self.url = url
+        self.error = error
+        # False si el POST salió y no sabemos qué pasó: reintentar podría duplicar el cliente
+        self.reintentable = reintentable
+        self.captura = captura
+        # True si no se creó porque el índice de clientes ya lo conocía (por DNI o teléfono)
+        self.existente = existente
+        # Id de un cliente con el mismo nombre (sin DNI ni teléfono que lo confirme): revisar en SACH
+        self.posible_duplicado = None
+
+    def __bool__(self):
+        return self.ok
+
+    def __repr__(self):
+        if self.ok:
+            return f"ResultadoGuardado({'existente' if self.existente else 'ok'}, id_cliente={self.id_cliente!r})"
+        return f"ResultadoGuardado(fallo, estado_http={self.estado_http!r}, error={self.error!r})"
+
+    def a_dict(self):
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+
+def es_post_formulario(respuesta):
+    """La respuesta al envío del formulario de Nuevo Cliente (no la de un asset ni la del GET)"""
+    return (
+        respuesta.request.method == "POST"
+        and urlparse(respuesta.url).path.rstrip("/").endswith("/cliente/nuevo")
+    )
+
+
+def extraer_id_cliente(url):
+    coincidencia = RE_ID_CLIENTE.search(urlparse(url or "").path)
+    return coincidencia.group(1) if coincidencia else None
+
+
+def interpretar(respuesta, url_final, mensaje=None):
+    """
+    Traduce el envío en un ResultadoGuardado. Manda la evidencia más fuerte: si la página
+    llegó a /cliente/<id> el alta se hizo aunque no se haya visto el POST (envío por JS,
+    cadena de redirecciones). Solo es reintentable si consta que SACH no guardó nada
+    (formulario rechazado, sesión vencida, 4xx); ante la duda se marca para revisar.
+    respuesta=None significa que no se capturó la respuesta al POST.
+    """
+    estado = respuesta.status if respuesta is not None else None
+    destino = None
+    if estado is not None and 300 <= estado < 400:
+        destino = respuesta.headers.get("location") or url_final or ""
+
+    id_cliente = extraer_id_cliente(url_final) or extraer_id_cliente(destino)
+    if id_cliente:
+        return ResultadoGuardado(True, id_cliente=id_cliente, estado_http=estado, url=url_final or destino)
+
+    if "iniciar" in (destino or url_final or ""):
+        return ResultadoGuardado(False, estado_http=estado, url=destino or url_final,
+                                 error="La sesión venció al guardar")
+
+    if estado is None:
+        if mensaje:
+            return ResultadoGuardado(False, url=url_final, error=mensaje)
+        return ResultadoGuardado(False, url=url_final, reintentable=False,
+                                 error="SACH no confirmó el guardado (revisar si el cliente quedó creado)")
+
+    if destino is not None:
+        if "cliente/nuevo" in destino:
+            return ResultadoGuardado(False, estado_http=estado, url=destino,
+                                     error=mensaje or "SACH volvió al formulario")
+        # Redirección fuera del formulario sin id a la vista: el alta se hizo
+        return ResultadoGuardado(True, estado_http=estado, url=url_final or destino)
+
+    if estado >= 500:
+        # Un 5xx (o un 502/504 del proxy) puede llegar con el cliente ya insertado
+        return ResultadoGuardado(False, estado_http=estado, url=url_final, reintentable=False,
+                                 error=f"SACH respondió {estado} al guardado (revisar si el cliente quedó creado)")
+    if estado >= 400:
+        return ResultadoGuardado(False, estado_http=estado, url=url_final,
+                                 error=f"SACH respondió {estado} al guardado")
+
+    # 200 sobre /cliente/nuevo: es un rechazo solo si SACH mostró el error de validación
+    if mensaje:
+        return ResultadoGuardado(False, estado_http=estado, url=url_final, error=mensaje)
+    return ResultadoGuardado(False, estado_http=estado, url=url_final, reintentable=False,
+                             error=f"SACH respondió {estado} sin confirmar el alta (revisar si el cliente quedó creado)")
+
+
+def boton_guardar(pagina):
+    boton = pagina.locator(SELECTOR_BOTON_GUARDAR)
+    if boton.count() == 0:
+        boton = pagina.get_by_role("button", name="Guardar")
+    return boton.first
+
+
+async def boton_guardar_async(pagina):
+    boton = pagina.locator(SELECTOR_BOTON_GUARDAR)
+    if await boton.count() == 0:
+        boton = pagina.get_by_role("button", name="Guardar")
+    return boton.first
+
+
+def _mensaje_error(esperas, pagina):
+    """Texto de la alerta de validación de SACH, si aparece"""
+    if not esperas.elemento_visible(pagina, SELECTOR_ALERTA_ERROR, "guardar_rechazo"):
+        return None
+    try:
+        return pagina.locator(SELECTOR_ALERTA_ERROR).first.text_content().strip() or "SACH rechazó el formulario"
+    except Exception:
+        return "SACH rechazó el formulario"
+
+
+async def _mensaje_error_async(esperas, pagina):
+    if not await esperas.elemento_visible(pagina, SELECTOR_ALERTA_ERROR, "guardar_rechazo"):
+        return None
+    try:
+        return (await pagina.locator(SELECTOR_ALERTA_ERROR).first.text_content()).strip() or "SACH rechazó el formulario"
+    except Exception:
+        return "SACH rechazó el formulario"
+
+
+def confirmar(esperas, pagina, espera):
+    """
+    Termina un envío empezado con esperas.respuesta(): espera la respuesta al POST y la
+    navegación que sigue. Si el POST no se vio, decide la URL a la que llegó la página
+    """
+    try:
+        with esperas.medir("guardar_respuesta"):
+            respuesta = espera.value
+    except Exception as e:
+        log.warning(f"⚠️ Sin respuesta al guardado: {e}")
+        respuesta = None
+
+    mensaje = None
+    if respuesta is None or 300 <= respuesta.status < 400:
+        if not esperas.url_sin(pagina, "cliente/nuevo", "guardar") and "cliente/nuevo" in pagina.url:
+            mensaje = _mensaje_error(esperas, pagina)
+    elif respuesta.status < 400:
+        mensaje = _mensaje_error(esperas, pagina)
+    return interpretar(respuesta, pagina.url, mensaje)
+
+
+async def confirmar_async(esperas, pagina, espera):
+    """Como confirmar, para páginas de async_playwright"""
+    try:
+        with esperas.medir("guardar_respuesta"):
+            respuesta = await espera.value
+    except Exception as e:
+        log.warning(f"⚠️ Sin respuesta al guardado: {e}")
+        respuesta = None
+
+    mensaje = None
+    if respuesta is None or 300 <= respuesta.status < 400:
+        if not await esperas.url_sin(pagina, "cliente/nuevo", "guardar") and "cliente/nuevo" in pagina.url:
+            mensaje = await _mensaje_error_async(esperas, pagina)
+    elif respuesta.status < 400:
+        mensaje = await _mensaje_error_async(esperas, pagina)
+    return interpretar(respuesta, pagina.url, mensaje)
+
+
+def _escribir(ruta, datos):
+    try:
+        with open(ruta, "wb") as f:
+            f.write(datos)
+    except OSError as e:
+        log.warning(f"⚠️ No se pudo escribir la captura {ruta}: {e}")
+
+
+def capturar(pagina, ruta):
+    """Captura de diagnóstico (solo en fallos): el PNG se pide al navegador y se escribe en segundo plano"""
+    try:
+        datos = pagina.screenshot()
+    except Exception as e:
+        log.debug(f"No se pudo capturar {ruta}: {e}")
+        return None
+    _escritor_capturas.submit(_escribir, ruta, datos)
+    log.info(f"📸 Captura de diagnóstico: {ruta}")
+    return ruta
+
+
+async def capturar_async(pagina, ruta):
+    """Como capturar, para páginas de async_playwright"""
+    try:
+        datos = await pagina.screenshot()
+    except Exception as e:
+        log.debug(f"No se pudo capturar {ruta}: {e}")
+        return None
+    _escritor_capturas.submit(_escribir, ruta, datos)
+    log.info(f"📸 Captura de diagnóstico: {ruta}")
+    return ruta
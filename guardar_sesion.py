@@ -4,7 +4,10 @@ Script para guardar la sesión de SACH (Storage State)
 Permite evitar el captcha guardando las cookies y estado de autenticación
 """
 
+import os
+import time
 from playwright.sync_api import sync_playwright
+from almacen_sesion import obtener_almacen_sesion
 
 def guardar_sesion():
     print("--- VENTANA ABIERTA: LOGUEATE AHORA ---")
@@ -15,8 +18,9 @@ def guardar_sesion():
         context = browser.new_context()
         page = context.new_page()
         
-        print("📝 Navegando a https://sach.com.ar/iniciar")
-        page.goto("https://sach.com.ar/iniciar")
+        url_login = f"{os.getenv('SACH_BASE_URL', 'https://sach.com.ar').rstrip('/')}/iniciar"
+        print(f"📝 Navegando a {url_login}")
+        page.goto(url_login)
         
         print("🔐 LOGUEATE MANUALMENTE Y RESOLVÉ EL CAPTCHA")
         print("💾 Cuando termines, volvé a esta terminal y presioná Enter")
@@ -27,9 +31,11 @@ def guardar_sesion():
         
         # Guardar el estado de autenticación
         print("💾 Guardando estado de autenticación...")
-        context.storage_state(path="auth.json")
+        # Login manual recién hecho: cuenta como la autenticación más reciente
+        almacen = obtener_almacen_sesion()
+        almacen.guardar(context.storage_state(), autenticado_en=time.time())
         
-        print("✅ Sesión guardada en auth.json")
+        print(f"✅ Sesión guardada en {almacen.estadisticas()['ruta']}")
         print("🎉 Ahora el robot podrá usar esta sesión para evitar el captcha")
         
         browser.close()
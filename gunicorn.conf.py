@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Configuración de gunicorn para producción: gunicorn -c gunicorn.conf.py app:app
+
+Cada worker es un proceso con su propio cliente de Groq, su pool de Chromium y sus
+workers de la cola (la cola y el deduplicador se comparten por SQLite). La cantidad de
+workers sale de los CPU y de cuántos navegadores entran en la máquina.
+"""
+
+import os
+import sys
+
+# Sin preload: sync Playwright y las conexiones SQLite no sobreviven a un fork.
+# Cada worker importa app.py (cliente de Groq, pool, cola) antes de aceptar conexiones.
+preload_app = False
+
+
+def _cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def calcular_workers():
+    """
+    WEB_CONCURRENCY manda si está definido. Si no, un worker por CPU sin pasarse del
+    presupuesto de navegadores: SACH_NAVEGADORES_MAX (por defecto uno por CPU) dividido
+    los SACH_POOL_NAVEGADORES de cada worker.
+    """
+    if os.getenv('WEB_CONCURRENCY'):
+        return max(1, int(os.environ['WEB_CONCURRENCY']))
+    cpus = _cpus()
+    por_worker = int(os.getenv('SACH_POOL_NAVEGADORES', '2'))
+    navegadores_max = int(os.getenv('SACH_NAVEGADORES_MAX', str(cpus)))
+    return max(1, min(cpus, navegadores_max // por_worker))
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = calcular_workers()
+# El webhook solo encola: unos pocos hilos por worker alcanzan para responder rápido a Meta
+worker_class = "gthread"
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+# Tiempo para terminar las reservas en curso y cerrar Chromium antes del SIGKILL
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '90'))
+keepalive = 5
+
+# Con más de un worker la deduplicación tiene que ser compartida (Meta reintenta contra cualquiera)
+if workers > 1 and not os.getenv('DEDUP_DB'):
+    os.environ['DEDUP_DB'] = 'dedup_mensajes.db'
+
+
+def on_starting(server):
+    server.log.info(
+        f"🚀 {workers} workers x {threads} hilos, "
+        f"{os.getenv('SACH_POOL_NAVEGADORES', '2')} navegadores por worker, {_cpus()} CPU"
+    )
+
+
+def post_worker_init(worker):
+    """Ya con app.py importado en el worker: calentar el pool y arrancar cola y refresco"""
+    from app import iniciar_servicios
+    iniciar_servicios()
+
+
+def worker_exit(server, worker):
+    """Drena las reservas en curso y cierra Chromium; deja margen para el cierre dentro del graceful"""
+    app = sys.modules.get('app')
+    if app is None:  # el worker no llegó a cargar la app
+        return
+    app.detener_servicios(timeout=max(graceful_timeout - 15, 5))
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Índice local de clientes SACH
+Antes de abrir el navegador se busca al cliente por DNI, teléfono o nombre (con tolerancia a
+errores de tipeo). Solo DNI y teléfono identifican a un cliente: con esas coincidencias no se
+vuelve a crear; una coincidencia solo por nombre se informa para revisar. Se alimenta con
+los datos que se enviaron en cada guardado exitoso y, opcionalmente, con una exportación
+masiva de SACH (CSV o JSON Lines).
+Todo vive en memoria (diccionarios); con ruta_db se persiste en SQLite y se comparte
+entre procesos.
+
+Uso: python indice_clientes.py importar exportacion.csv
+     python indice_clientes.py buscar "Juan Pérez" [--dni 22455958] [--telefono 1122334455]
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+import unicodedata
+
+log = logging.getLogger("indice_clientes")
+
+# Con más candidatos que esto el nombre es demasiado común para decidir por aproximación
+MAX_CANDIDATOS = 32
+# El mejor candidato tiene que sacarle esta ventaja al segundo (si son clientes distintos)
+MARGEN_AMBIGUEDAD = 0.05
+
+# Coincidencias que identifican a un cliente; por nombre puede ser un homónimo
+COINCIDENCIAS_SEGURAS = ("dni", "telefono")
+
+# Columnas que se aceptan en una exportación de SACH (en minúsculas)
+COLUMNAS_ID = ("id_cliente", "id", "cliente_id", "codigo")
+COLUMNAS_DNI = ("dni", "documento", "nro_documento", "numero_documento")
+COLUMNAS_TELEFONO = ("telefono", "movil", "celular", "tel")
+COLUMNAS_NOMBRE = ("nombre", "nombre_completo", "cliente")
+
+
+def normalizar_nombre(nombre):
+    """Minúsculas, sin acentos ni signos y con espacios simples: 'Pérez,  JUAN' -> 'perez juan'"""
+    if not nombre:
+        return ""
+    sin_acentos = unicodedata.normalize("NFKD", str(nombre))
+    sin_acentos = "".join(c for c in sin_acentos if not unicodedata.combining(c))
+    limpio = "".join(c if c.isalnum() else " " for c in sin_acentos.lower())
+    return " ".join(limpio.split())
+
+
+def normalizar_dni(dni):
+    digitos = "".join(c for c in str(dni or "") if c.isdigit()).lstrip("0")
+    return digitos or None
+
+
+def normalizar_telefono(telefono):
+    """Últimos 10 dígitos (código de área + número): +54 9 11 2233-4455 y 11 2233 4455 coinciden"""
+    digitos = "".join(c for c in str(telefono or "") if c.isdigit())
+    return digitos[-10:] if len(digitos) >= 8 else None
+
+
+def _primero(datos, columnas):
+    for columna in columnas:
+        if datos.get(columna):
+            return datos[columna]
+    return None
+
+
+def campos_cliente(datos):
+    """(dni, nombre, telefono) normalizados de una reserva o de una fila de exportación"""
+    datos = {str(k).strip().lower(): v for k, v in datos.items()}
+    nombre = _primero(datos, COLUMNAS_NOMBRE)
+    if not nombre and (datos.get("nombres") or datos.get("apellido")):
+        nombre = f"{datos.get('nombres') or ''} {datos.get('apellido') or ''}"
+    return (
+        normalizar_dni(_primero(datos, COLUMNAS_DNI)),
+        normalizar_nombre(nombre),
+        normalizar_telefono(_primero(datos, COLUMNAS_TELEFONO)),
+    )
+
+
+def _variantes(token):
+    """El token y sus borrados de una letra: dos tokens a un error de tipeo comparten alguna"""
+    return {token} | {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def _a_un_error(a, b):
+    """True si a y b difieren en a lo sumo una letra (cambiada, agregada, borrada o dos vecinas invertidas)"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    i = 0
+    while i < min(len(a), len(b)) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:] or (a[i + 2:] == b[i + 2:] and a[i:i + 2] == b[i:i + 2][::-1])
+    corto, largo = (a, b) if len(a) < len(b) else (b, a)
+    return corto[i:] == largo[i + 1:]
+
+
+def similitud(a, b):
+    """
+    0..1 entre dos nombres normalizados: las letras de los tokens que coinciden (tal cual o a un
+    error de tipeo, en cualquier orden) sobre el total. Cada error de tipeo descuenta una letra por lado.
+    """
+    if a == b:
+        return 1.0
+    pendientes = b.split()
+    total = sum(map(len, pendientes))
+    coincidentes = 0
+    for token in a.split():
+        total += len(token)
+        for i, otro in enumerate(pendientes):
+            if token == otro or _a_un_error(token, otro):
+                coincidentes += len(token) + len(otro) - (0 if token == otro else 2)
+                del pendientes[i]
+                break
+    return coincidentes / total if total else 0.0
+
+
+class IndiceClientes:
+    """
+    Clientes conocidos por DNI, teléfono y nombre normalizado.
+    DNI y teléfono son búsquedas exactas en un dict. El nombre usa un índice invertido
+    por token, con las variantes de un borrado de cada token para tolerar errores de
+    tipeo. Solo se puntúan los pocos candidatos que comparten todos los tokens.
+    Consultar no recorre los clientes: se mantiene por debajo del milisegundo con 100k.
+    """
+
+    def __init__(self, ruta_db=None, umbral=None):
+        self.ruta_db = ruta_db if ruta_db is not None else os.getenv('SACH_CLIENTES_DB', 'sach_clientes.db') or None
+        self.umbral = umbral or float(os.getenv('SACH_CLIENTES_UMBRAL', '0.88'))
+
+        self._lock = threading.Lock()
+        self._registros = {}
+        self._por_dni = {}
+        self._por_telefono = {}
+        self._por_nombre = {}
+        self._por_token = {}
+        self._variantes = {}
+        self._stats = {"consultas": 0, "dni": 0, "telefono": 0, "nombre": 0, "nombre_aproximado": 0,
+                       "ambiguos": 0, "no_encontrados": 0, "registrados": 0}
+
+        self._conn = None
+        self._ultimo_orden = 0
+        if self.ruta_db:
+            self._conn = sqlite3.connect(self.ruta_db, check_same_thread=False, isolation_level=None, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # 'orden' crece con cada alta o cambio: los otros procesos leen solo lo nuevo
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS clientes ("
+                "orden INTEGER PRIMARY KEY AUTOINCREMENT, clave TEXT UNIQUE NOT NULL, id_cliente TEXT, "
+                "dni TEXT, nombre TEXT, telefono TEXT, actualizado REAL NOT NULL)"
+            )
+            with self._lock:
+                self._sincronizar()
+
+    # --- índice en memoria ---
+
+    @staticmethod
+    def _clave(dni, nombre, telefono, id_cliente=None):
+        """Sin DNI, el id de SACH separa a dos homónimos sin teléfono"""
+        if dni:
+            return f"dni:{dni}"
+        if id_cliente is not None:
+            return f"id:{id_cliente}"
+        return f"nombre:{nombre}:{telefono or ''}"
+
+    def _quitar(self, clave):
+        registro = self._registros.pop(clave, None)
+        if registro is None:
+            return
+        if registro["dni"]:
+            self._por_dni.pop(registro["dni"], None)
+        for indice, valor in ((self._por_telefono, registro["telefono"]), (self._por_nombre, registro["nombre"])):
+            if valor and valor in indice:
+                indice[valor].discard(clave)
+                if not indice[valor]:
+                    del indice[valor]
+        for token in set(registro["nombre"].split()):
+            claves = self._por_token.get(token)
+            if claves is not None:
+                claves.discard(clave)
+                if not claves:
+                    del self._por_token[token]
+                    for variante in _variantes(token):
+                        tokens = self._variantes.get(variante)
+                        if tokens is not None:
+                            tokens.discard(token)
+                            if not tokens:
+                                del self._variantes[variante]
+
+    def _agregar(self, registro):
+        clave = registro["clave"]
+        self._quitar(clave)
+        self._registros[clave] = registro
+        if registro["dni"]:
+            self._por_dni[registro["dni"]] = clave
+        if registro["telefono"]:
+            self._por_telefono.setdefault(registro["telefono"], set()).add(clave)
+        if registro["nombre"]:
+            self._por_nombre.setdefault(registro["nombre"], set()).add(clave)
+        for token in set(registro["nombre"].split()):
+            if len(token) < 3:
+                continue
+            if token not in self._por_token:
+                self._por_token[token] = set()
+                for variante in _variantes(token):
+                    self._variantes.setdefault(variante, set()).add(token)
+            self._por_token[token].add(clave)
+
+    def _sincronizar(self):
+        """Trae lo que registraron otros procesos desde la última lectura"""
+        if not self._conn:
+            return
+        filas = self._conn.execute(
+            "SELECT orden, clave, id_cliente, dni, nombre, telefono FROM clientes WHERE orden > ? ORDER BY orden",
+            (self._ultimo_orden,)
+        ).fetchall()
+        for orden, clave, id_cliente, dni, nombre, telefono in filas:
+            self._agregar({"clave": clave, "id_cliente": id_cliente, "dni": dni,
+                           "nombre": nombre or "", "telefono": telefono})
+            self._ultimo_orden = orden
+
+    # --- alta ---
+
+    def _preparar(self, datos, id_cliente):
+        dni, nombre, telefono = campos_cliente(datos)
+        if not dni and not nombre:
+            return None
+        clave = self._clave(dni, nombre, telefono, id_cliente)
+        anterior = self._registros.get(clave)
+        return {
+            "clave": clave,
+            # Un alta sin id (SACH no lo informó) no pisa el id que ya se conocía
+            "id_cliente": str(id_cliente) if id_cliente is not None else (anterior or {}).get("id_cliente"),
+            "dni": dni,
+            "nombre": nombre,
+            "telefono": telefono,
+        }
+
+    def registrar(self, datos_cliente, id_cliente=None):
+        """Agrega (o actualiza) un cliente guardado en SACH; devuelve True si tenía con qué indexarlo"""
+        return self.registrar_varios([(datos_cliente, id_cliente)]) == 1
+
+    def registrar_varios(self, clientes):
+        """Alta masiva de (datos, id_cliente) en una sola transacción; devuelve cuántos se indexaron"""
+        ahora = time.time()
+        with self._lock:
+            registros = [r for r in (self._preparar(d, i) for d, i in clientes) if r]
+            for registro in registros:
+                self._agregar(registro)
+            if self._conn and registros:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO clientes (clave, id_cliente, dni, nombre, telefono, actualizado) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        [(r["clave"], r["id_cliente"], r["dni"], r["nombre"], r["telefono"], ahora) for r in registros]
+                    )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            self._stats["registrados"] += len(registros)
+        return len(registros)
+
+    def importar(self, ruta):
+        """Carga una exportación de clientes de SACH (.csv o JSON Lines); devuelve cuántos se indexaron"""
+        with open(ruta, "r", encoding="utf-8-sig", newline="") as f:
+            if ruta.lower().endswith(".csv"):
+                filas = list(csv.DictReader(f))
+            else:
+                filas = [json.loads(linea) for linea in f if linea.strip()]
+        cantidad = self.registrar_varios(
+            (fila, _primero({str(k).strip().lower(): v for k, v in fila.items()}, COLUMNAS_ID))
+            for fila in filas
+        )
+        log.info(f"📇 {cantidad} de {len(filas)} clientes importados de {ruta}")
+        return cantidad
+
+    # --- consulta ---
+
+    def _coincidencia(self, clave, motivo, puntaje=1.0):
+        self._stats[motivo] += 1
+        return dict(self._registros[clave], coincidencia=motivo, similitud=round(puntaje, 3))
+
+    def _tokens_parecidos(self, token):
+        """Tokens indexados a un error de tipeo de 'token'"""
+        parecidos = set()
+        for variante in _variantes(token):
+            parecidos.update(self._variantes.get(variante, ()))
+        return [p for p in parecidos if _a_un_error(token, p)]
+
+    def _candidatos_por_nombre(self, nombre):
+        """Claves que comparten los tokens del nombre, tal cual o con un error de tipeo (no modificar)"""
+        tokens = [t for t in set(nombre.split()) if len(t) >= 3]
+        if len(tokens) < 2:
+            # Un solo nombre ('Juan') no alcanza para identificar a un cliente
+            return set()
+
+        # Por token: las claves que lo tienen tal cual, o los tokens parecidos y cuántas claves suman
+        opciones = []
+        faltantes = 0
+        for token in tokens:
+            if token in self._por_token:
+                opciones.append((len(self._por_token[token]), token, None))
+                continue
+            parecidos = self._tokens_parecidos(token)
+            cantidad = sum(len(self._por_token[p]) for p in parecidos)
+            if cantidad:
+                opciones.append((cantidad, token, parecidos))
+            else:
+                faltantes += len(token)
+        # Un token que nadie tiene (segundo nombre) no descarta candidatos, pero si es largo
+        # ningún cliente puede llegar al umbral: es un cliente nuevo
+        if not opciones or 1 - faltantes / (2 * len(nombre.replace(" ", ""))) < self.umbral:
+            return set()
+
+        # Del token más raro al más común: 'chico & grande' cuesta lo que el chico
+        opciones.sort(key=lambda opcion: opcion[0])
+        candidatos = None
+        for _, token, parecidos in opciones:
+            if parecidos is None:
+                otros = self._por_token[token]
+            elif candidatos is not None and len(candidatos) <= MAX_CANDIDATOS * 4:
+                # Con pocos candidatos alcanza con mirar sus nombres
+                otros = {c for c in candidatos
+                         if any(_a_un_error(token, t) for t in self._registros[c]["nombre"].split())}
+            else:
+                otros = set()
+                for parecido in parecidos:
+                    otros |= self._por_token[parecido]
+            if candidatos is None:
+                candidatos = otros
+            else:
+                # Un token que no comparten (segundo nombre) no descarta a los candidatos
+                candidatos = candidatos & otros or candidatos
+        return candidatos
+
+    def _mejor(self, nombre, claves):
+        """La clave con el nombre más parecido, si supera el umbral y no hay empate con otro cliente"""
+        puntajes = sorted(((similitud(nombre, self._registros[c]["nombre"]), c) for c in claves), reverse=True)
+        if not puntajes or puntajes[0][0] < self.umbral:
+            return None, 0.0
+        if len(puntajes) > 1 and puntajes[1][0] > puntajes[0][0] - MARGEN_AMBIGUEDAD:
+            self._stats["ambiguos"] += 1
+            return None, 0.0
+        return puntajes[0][1], puntajes[0][0]
+
+    def buscar(self, datos_cliente):
+        """
+        Registro del cliente ya cargado en SACH (con 'coincidencia' y 'similitud'), o None.
+        Un DNI manda: si viene y no está, es otro cliente aunque el nombre se parezca.
+        Las coincidencias 'nombre' y 'nombre_aproximado' pueden ser homónimos: quien llama
+        decide (el robot solo saltea el alta con COINCIDENCIAS_SEGURAS).
+        """
+        dni, nombre, telefono = campos_cliente(datos_cliente)
+        with self._lock:
+            self._stats["consultas"] += 1
+            self._sincronizar()
+
+            if dni:
+                clave = self._por_dni.get(dni)
+                if clave:
+                    return self._coincidencia(clave, "dni")
+                self._stats["no_encontrados"] += 1
+                return None
+
+            if telefono and telefono in self._por_telefono:
+                claves = self._por_telefono[telefono]
+                if not nombre and len(claves) == 1:
+                    return self._coincidencia(next(iter(claves)), "telefono")
+                # Un teléfono puede ser de toda la familia: además tiene que parecerse el nombre
+                clave, puntaje = self._mejor(nombre, claves)
+                if clave:
+                    return self._coincidencia(clave, "telefono", puntaje)
+
+            if nombre:
+                claves = self._por_nombre.get(nombre, ())
+                if len(claves) == 1:
+                    return self._coincidencia(next(iter(claves)), "nombre")
+                if len(claves) > 1:
+                    self._stats["ambiguos"] += 1
+                    return None
+
+                candidatos = self._candidatos_por_nombre(nombre)
+                if len(candidatos) > MAX_CANDIDATOS:
+                    self._stats["ambiguos"] += 1
+                    return None
+                clave, puntaje = self._mejor(nombre, candidatos)
+                if clave:
+                    return self._coincidencia(clave, "nombre_aproximado", puntaje)
+
+            self._stats["no_encontrados"] += 1
+            return None
+
+    def __len__(self):
+        return len(self._registros)
+
+    def estadisticas(self):
+        """Clientes indexados y coincidencias por DNI, teléfono y nombre (exacto o aproximado)"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["clientes"] = len(self._registros)
+        encontrados = stats["dni"] + stats["telefono"] + stats["nombre"] + stats["nombre_aproximado"]
+        stats["tasa_conocidos"] = round(encontrados / stats["consultas"], 4) if stats["consultas"] else 0.0
+        stats["persistente"] = self._conn is not None
+        stats["umbral"] = self.umbral
+        return stats
+
+
+_indice_global = None
+_indice_global_lock = threading.Lock()
+
+
+def obtener_indice_clientes():
+    """Índice compartido por todos los robots del proceso"""
+    global _indice_global
+    with _indice_global_lock:
+        if _indice_global is None:
+            _indice_global = IndiceClientes()
+        return _indice_global
+
+
+def main():
+    from bitacora import configurar_logging
+
+    parser = argparse.ArgumentParser(description="Índice local de clientes SACH")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("importar", help="Carga una exportación de clientes de SACH (.csv o .jsonl)")
+    p.add_argument("ruta")
+    p = sub.add_parser("buscar", help="Busca un cliente como lo haría el robot antes de cargarlo")
+    p.add_argument("nombre", nargs="?", default="")
+    p.add_argument("--dni")
+    p.add_argument("--telefono")
+    sub.add_parser("estadisticas", help="Clientes indexados y coincidencias")
+    args = parser.parse_args()
+
+    configurar_logging(formato_por_defecto="texto")
+    indice = obtener_indice_clientes()
+    if args.comando == "importar":
+        inicio = time.perf_counter()
+        cantidad = indice.importar(args.ruta)
+        print(f"✅ {cantidad} clientes indexados en {time.perf_counter() - inicio:.1f}s ({len(indice)} en total)")
+    elif args.comando == "buscar":
+        inicio = time.perf_counter()
+        registro = indice.buscar({"nombre": args.nombre, "dni": args.dni, "telefono": args.telefono})
+        microsegundos = (time.perf_counter() - inicio) * 1e6
+        print(json.dumps(registro, ensure_ascii=False) if registro else "❌ Cliente no encontrado")
+        print(f"⏱️ {microsegundos:.0f} µs")
+        return 0 if registro else 1
+    else:
+        print(json.dumps(indice.estadisticas(), ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
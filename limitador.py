@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Limitador de llamadas a Groq
+Semáforo global de concurrencia más token bucket por tipo de modelo,
+para que un proceso lleve decenas de notas de voz sin pasarse de los límites del proveedor.
+El camino sync (hilos de la cola) y el async (event loop) comparten el mismo presupuesto
+"""
+
+import os
+import time
+import asyncio
+import threading
+from contextlib import contextmanager, asynccontextmanager
+
+# Cada cuánto vuelve a probar una corrutina que espera lugar en el semáforo compartido
+ESPERA_SEMAFORO_S = 0.02
+
+
+class CuboTokens:
+    """Token bucket: 'tasa' tokens por segundo con ráfagas de hasta 'capacidad' (thread-safe)"""
+
+    def __init__(self, tasa, capacidad):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self._tokens = capacidad
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _tomar(self):
+        """Consume un token y devuelve 0, o los segundos que faltan para el próximo"""
+        with self._lock:
+            ahora = time.monotonic()
+            self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+            self._ultimo = ahora
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.tasa
+
+    def adquirir(self):
+        """Bloquea el hilo hasta que haya un token y lo consume"""
+        while True:
+            espera = self._tomar()
+            if not espera:
+                return
+            time.sleep(espera)
+
+    async def adquirir_async(self):
+        """Como adquirir, sin bloquear el event loop"""
+        while True:
+            espera = self._tomar()
+            if not espera:
+                return
+            await asyncio.sleep(espera)
+
+
+class LimitadorGroq:
+    """
+    Concurrencia máxima compartida por todos los modelos y pacing por minuto de cada uno.
+    turno() es para hilos (ProcesadorAudio) y turno_async() para corrutinas (ProcesadorAudioAsync);
+    los dos cuentan contra los mismos cubos y el mismo semáforo.
+    """
+
+    def __init__(self, max_concurrentes=None, rpm=None):
+        self.max_concurrentes = max_concurrentes or int(os.getenv('GROQ_MAX_CONCURRENTES', '8'))
+        rpm = rpm or {
+            "transcripcion": float(os.getenv('GROQ_RPM_TRANSCRIPCION', '20')),
+            "extraccion": float(os.getenv('GROQ_RPM_EXTRACCION', '30')),
+        }
+        # Ráfaga de hasta un cuarto del límite por minuto (mínimo 1)
+        self._cubos = {tipo: CuboTokens(valor / 60.0, max(1.0, valor / 4)) for tipo, valor in rpm.items()}
+        # Semáforo de hilos: sirve a cualquier event loop y a los workers de la cola
+        self._semaforo = threading.BoundedSemaphore(self.max_concurrentes)
+
+        self._lock = threading.Lock()
+        self._en_vuelo = 0
+        self._esperando = 0
+        self._llamadas = {tipo: 0 for tipo in rpm}
+        self._espera_total = 0.0
+
+    def _esperar(self, delta):
+        with self._lock:
+            self._esperando += delta
+
+    def _entrar(self, tipo, inicio):
+        with self._lock:
+            self._espera_total += time.monotonic() - inicio
+            self._llamadas[tipo] += 1
+            self._en_vuelo += 1
+
+    def _salir(self):
+        with self._lock:
+            self._en_vuelo -= 1
+        self._semaforo.release()
+
+    @contextmanager
+    def turno(self, tipo):
+        """Espera token y lugar en el semáforo antes de llamar a Groq (bloquea el hilo)"""
+        inicio = time.monotonic()
+        self._esperar(1)
+        try:
+            self._cubos[tipo].adquirir()
+            self._semaforo.acquire()
+        finally:
+            self._esperar(-1)
+        self._entrar(tipo, inicio)
+        try:
+            yield
+        finally:
+            self._salir()
+
+    @asynccontextmanager
+    async def turno_async(self, tipo):
+        """Como turno, para corrutinas: espera sin bloquear el event loop"""
+        inicio = time.monotonic()
+        self._esperar(1)
+        try:
+            await self._cubos[tipo].adquirir_async()
+            while not self._semaforo.acquire(blocking=False):
+                await asyncio.sleep(ESPERA_SEMAFORO_S)
+        finally:
+            self._esperar(-1)
+        self._entrar(tipo, inicio)
+        try:
+            yield
+        finally:
+            self._salir()
+
+    def estadisticas(self):
+        with self._lock:
+            total = sum(self._llamadas.values())
+            return {
+                "max_concurrentes": self.max_concurrentes,
+                "en_vuelo": self._en_vuelo,
+                "esperando": self._esperando,
+                "llamadas": dict(self._llamadas),
+                "espera_promedio_s": round(self._espera_total / total, 3) if total else 0.0,
+            }
+
+
+_limitador_global = None
+_limitador_global_lock = threading.Lock()
+
+
+def obtener_limitador():
+    """Limitador compartido por el proceso"""
+    global _limitador_global
+    with _limitador_global_lock:
+        if _limitador_global is None:
+            _limitador_global = LimitadorGroq()
+        return _limitador_global
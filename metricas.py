@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Métricas del pipeline de voz
+Spans alrededor de cada etapa (Graph, Whisper, Llama, navegador, login, formulario, respuesta)
+agregados en histogramas y exportados en el formato de texto de Prometheus para /metrics.
+"""
+
+import time
+import asyncio
+import functools
+import threading
+from contextlib import contextmanager
+
+# Segundos: desde una llamada HTTP rápida hasta un login lento con arranque de Chromium
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+AYUDAS = {
+    "sach_etapa_segundos": "Duración de cada etapa instrumentada del pipeline",
+    "sach_pipeline_etapa_segundos": "Duración de las etapas de un trabajo de la cola",
+    "sach_cola_espera_segundos": "Tiempo de un trabajo en la cola hasta que lo toma un worker",
+    "sach_cola_proceso_segundos": "Tiempo de proceso de un trabajo de la cola",
+}
+
+
+class Histograma:
+    """Histograma acumulativo con buckets fijos (thread-safe vía el lock del registro)"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.cuentas = [0] * len(buckets)
+        self.cantidad = 0
+        self.suma = 0.0
+
+    def observar(self, valor):
+        self.cantidad += 1
+        self.suma += valor
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.cuentas[i] += 1
+                break
+
+    def acumuladas(self):
+        total = 0
+        for limite, cuenta in zip(self.buckets, self.cuentas):
+            total += cuenta
+            yield limite, total
+
+
+def _resultado(valor):
+    """ok, o 'fallo' si la etapa devolvió False/None (o un resultado con ok=False) sin lanzar excepción"""
+    return "fallo" if valor is None or valor is False or getattr(valor, "ok", None) is False else "ok"
+
+
+def _etiquetas(etiquetas):
+    return ",".join(f'{k}="{v}"' for k, v in etiquetas)
+
+
+class RegistroMetricas:
+    """Histogramas por (métrica, etiquetas) y medidores que se leen al exportar"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogramas = {}
+        self._medidores = []
+
+    def observar(self, nombre, segundos, **etiquetas):
+        clave = (nombre, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            histograma = self._histogramas.get(clave)
+            if histograma is None:
+                histograma = self._histogramas[clave] = Histograma()
+            histograma.observar(segundos)
+
+    @contextmanager
+    def span(self, etapa, nombre="sach_etapa_segundos"):
+        """Mide un bloque; la etiqueta resultado queda en 'error' si sale por excepción"""
+        inicio = time.perf_counter()
+        resultado = "error"
+        try:
+            yield
+            resultado = "ok"
+        finally:
+            self.observar(nombre, time.perf_counter() - inicio, etapa=etapa, resultado=resultado)
+
+    def medido(self, etapa):
+        """Decorador de span para funciones y corrutinas: ok / fallo (False o None) / error"""
+        def decorador(funcion):
+            if asyncio.iscoroutinefunction(funcion):
+                @functools.wraps(funcion)
+                async def envoltura_async(*args, **kwargs):
+                    inicio = time.perf_counter()
+                    resultado = "error"
+                    try:
+                        valor = await funcion(*args, **kwargs)
+                        resultado = _resultado(valor)
+                        return valor
+                    finally:
+                        self.observar("sach_etapa_segundos", time.perf_counter() - inicio,
+                                      etapa=etapa, resultado=resultado)
+                return envoltura_async
+
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                inicio = time.perf_counter()
+                resultado = "error"
+                try:
+                    valor = funcion(*args, **kwargs)
+                    resultado = _resultado(valor)
+                    return valor
+                finally:
+                    self.observar("sach_etapa_segundos", time.perf_counter() - inicio,
+                                  etapa=etapa, resultado=resultado)
+            return envoltura
+        return decorador
+
+    def registrar_medidor(self, nombre, ayuda, funcion):
+        """funcion() -> número o {etiqueta: número}; se evalúa en cada exportación"""
+        with self._lock:
+            self._medidores.append((nombre, ayuda, funcion))
+
+    def resumen(self):
+        """Cantidad, promedio y suma por serie (para endpoints JSON y el CLI)"""
+        with self._lock:
+            return {
+                f"{nombre}{{{_etiquetas(etiquetas)}}}": {
+                    "cantidad": h.cantidad,
+                    "promedio_s": round(h.suma / h.cantidad, 4) if h.cantidad else 0.0,
+                    "suma_s": round(h.suma, 4),
+                }
+                for (nombre, etiquetas), h in sorted(self._histogramas.items())
+            }
+
+    def exportar_prometheus(self):
+        """Formato de exposición de texto de Prometheus (version 0.0.4)"""
+        lineas = []
+        with self._lock:
+            series = sorted(self._histogramas.items())
+            medidores = list(self._medidores)
+            anterior = None
+            for (nombre, etiquetas), h in series:
+                if nombre != anterior:
+                    lineas.append(f"# HELP {nombre} {AYUDAS.get(nombre, nombre)}")
+                    lineas.append(f"# TYPE {nombre} histogram")
+                    anterior = nombre
+                base = _etiquetas(etiquetas)
+                separador = "," if base else ""
+                for limite, acumulado in h.acumuladas():
+                    lineas.append(f'{nombre}_bucket{{{base}{separador}le="{limite}"}} {acumulado}')
+                lineas.append(f'{nombre}_bucket{{{base}{separador}le="+Inf"}} {h.cantidad}')
+                lineas.append(f"{nombre}_sum{{{base}}} {h.suma:.6f}")
+                lineas.append(f"{nombre}_count{{{base}}} {h.cantidad}")
+
+        for nombre, ayuda, funcion in medidores:
+            try:
+                valor = funcion()
+            except Exception:
+                continue
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} gauge")
+            if isinstance(valor, dict):
+                for etiqueta, v in sorted(valor.items()):
+                    lineas.append(f'{nombre}{{{etiqueta}}} {v}')
+            else:
+                lineas.append(f"{nombre} {valor}")
+        return "\n".join(lineas) + "\n"
+
+
+metricas = RegistroMetricas()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+SACH local de prueba
+Reproduce lo que toca RobotSACH: /iniciar (#usuario, #password, "Iniciar Sesión"),
+el panel, /cliente/nuevo (#ce_hue_nro_documento, #ce_hue_btn_guardar) y las redirecciones,
+con latencia inyectable y assets pesados opcionales. Sirve para medir sin tocar producción.
+
+Uso: python mock_sach.py [--puerto 8800] [--latencia 0.05] [--assets-pesados]
+     SACH_BASE_URL=http://127.0.0.1:8800 SACH_USER=robot SACH_PASS=robot python cargar_reserva.py '<json>'
+"""
+
+import sys
+import time
+import random
+import secrets
+import argparse
+import threading
+from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COOKIE_SESION = "SACHSESSID"
+
+LOGIN_HTML = """
+<form method="post" action="/iniciar">
+  {error}
+  <input id="usuario" name="usuario" type="text" placeholder="Usuario">
+  <input id="password" name="password" type="password" placeholder="Contraseña">
+  <button type="submit">Iniciar Sesión</button>
+</form>
+"""
+
+PANEL_HTML = """
+<nav class="nav">
+  <a href="/inicio">Inicio</a>
+  <a href="/cliente">Clientes</a>
+  <a href="/salir" class="logout">Salir</a>
+</nav>
+{contenido}
+"""
+
+FORMULARIO_HTML = """
+<form method="post" action="/cliente/nuevo">
+  <input id="ce_hue_nro_documento" name="ce_hue[nro_documento]" type="text">
+  <input id="ce_hue_nombres" name="ce_hue[nombres]" type="text">
+  <input id="ce_hue_apellido" name="ce_hue[apellido]" type="text">
+  <input id="ce_hue_email" name="ce_hue[email]" type="email">
+  <input id="ce_hue_movil" name="ce_hue[movil]" type="text">
+  <button id="ce_hue_btn_guardar" type="submit">Guardar</button>
+</form>
+"""
+
+
+class ServidorMockSACH:
+    """Servidor HTTP en un hilo; las sesiones y los clientes viven en memoria"""
+
+    def __init__(self, usuario="robot", password="robot", latencia=0.0, jitter=0.0,
+                 assets_pesados=False, ttl_sesion=None, puerto=0, host="127.0.0.1"):
+        self.usuario = usuario
+        self.password = password
+        self.latencia = latencia
+        self.jitter = jitter
+        self.assets_pesados = assets_pesados
+        self.ttl_sesion = ttl_sesion
+        self.host = host
+        self.puerto = puerto
+
+        self._lock = threading.Lock()
+        self._sesiones = {}
+        self.clientes = []
+        self._stats = {"requests": 0, "bytes": 0, "logins": 0, "logins_fallidos": 0, "redirecciones_login": 0}
+        self._servidor = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self._servidor.server_port}"
+
+    def iniciar(self):
+        self._servidor = ThreadingHTTPServer((self.host, self.puerto), self._manejador())
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, name="mock-sach", daemon=True).start()
+        return self.url
+
+    def detener(self):
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+
+    def estadisticas(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["sesiones"] = len(self._sesiones)
+            stats["clientes"] = len(self.clientes)
+        return stats
+
+    def _contar(self, nombre, valor=1):
+        with self._lock:
+            self._stats[nombre] += valor
+
+    def _sesion_valida(self, token):
+        with self._lock:
+            creada = self._sesiones.get(token)
+            if creada is None:
+                return False
+            if self.ttl_sesion and time.time() - creada > self.ttl_sesion:
+                del self._sesiones[token]
+                return False
+            return True
+
+    def _assets(self, puerto):
+        if not self.assets_pesados:
+            return ""
+        imagenes = "".join(f'<img src="/img/{i}.png">' for i in range(10))
+        return (
+            '<link rel="stylesheet" href="/estilos.css">'
+            '<style>@font-face{font-family:F;src:url(/fuente.woff2)} body{font-family:F}</style>'
+            '<script src="/app.js"></script>'
+            # "Analytics" en otro host (localhost en vez de 127.0.0.1) para probar el bloqueo de terceros
+            f'<script src="http://localhost:{puerto}/analytics.js"></script>'
+            f"{imagenes}"
+        )
+
+    def _manejador(self):
+        mock = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _demorar(self):
+                if mock.latencia or mock.jitter:
+                    time.sleep(mock.latencia + random.uniform(0, mock.jitter))
+
+            def _token(self):
+                for parte in self.headers.get("Cookie", "").split(";"):
+                    nombre, _, valor = parte.strip().partition("=")
+                    if nombre == COOKIE_SESION:
+                        return valor
+                return None
+
+            def _enviar(self, estado, cuerpo=b"", tipo="text/html; charset=utf-8", headers=None):
+                mock._contar("requests")
+                mock._contar("bytes", len(cuerpo))
+                self.send_response(estado)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                for nombre, valor in (headers or {}).items():
+                    self.send_header(nombre, valor)
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def _pagina(self, titulo, cuerpo, headers=None):
+                html = (f"<html><head><title>{titulo}</title>{mock._assets(self.server.server_port)}</head>"
+                        f"<body>{cuerpo}</body></html>")
+                self._enviar(200, html.encode(), headers=headers)
+
+            def _redirigir(self, destino, headers=None):
+                self._enviar(302, headers={"Location": destino, **(headers or {})})
+
+            def _requiere_sesion(self):
+                if mock._sesion_valida(self._token()):
+                    return True
+                mock._contar("redirecciones_login")
+                self._redirigir("/iniciar")
+                return False
+
+            def _formulario(self):
+                largo = int(self.headers.get("Content-Length", 0))
+                campos = parse_qs(self.rfile.read(largo).decode())
+                return {k: v[0] for k, v in campos.items()}
+
+            def do_GET(self):
+                ruta = urlparse(self.path).path
+                if self._asset(ruta):
+                    return
+                self._demorar()
+                if ruta == "/iniciar":
+                    if mock._sesion_valida(self._token()):
+                        return self._redirigir("/inicio")
+                    return self._pagina("Iniciar sesión - SACH", LOGIN_HTML.format(error=""))
+                if ruta == "/salir":
+                    with mock._lock:
+                        mock._sesiones.pop(self._token(), None)
+                    return self._redirigir("/iniciar")
+                if not self._requiere_sesion():
+                    return
+                if ruta in ("/", "/inicio"):
+                    return self._pagina("Inicio - SACH", PANEL_HTML.format(contenido="<h1>Panel</h1>"))
+                if ruta == "/cliente/nuevo":
+                    return self._pagina("Nuevo Cliente - SACH", PANEL_HTML.format(contenido=FORMULARIO_HTML))
+                if ruta.startswith("/cliente/"):
+                    contenido = f'<div class="alert alert-success">Cliente {ruta.rsplit("/", 1)[-1]} guardado</div>'
+                    return self._pagina("Cliente - SACH", PANEL_HTML.format(contenido=contenido))
+                self._enviar(404, b"no encontrado")
+
+            def do_POST(self):
+                ruta = urlparse(self.path).path
+                self._demorar()
+                campos = self._formulario()
+                if ruta == "/iniciar":
+                    if campos.get("usuario") == mock.usuario and campos.get("password") == mock.password:
+                        token = secrets.token_hex(16)
+                        with mock._lock:
+                            mock._sesiones[token] = time.time()
+                        mock._contar("logins")
+                        return self._redirigir("/inicio", {"Set-Cookie": f"{COOKIE_SESION}={token}; Path=/; HttpOnly"})
+                    mock._contar("logins_fallidos")
+                    error = '<div class="alert alert-danger">Usuario o contraseña incorrecto</div>'
+                    return self._pagina("Iniciar sesión - SACH", LOGIN_HTML.format(error=error))
+                if ruta == "/cliente/nuevo":
+                    if not self._requiere_sesion():
+                        return
+                    if not campos.get("ce_hue[nro_documento]"):
+                        contenido = '<div class="alert alert-danger">El documento es obligatorio</div>' + FORMULARIO_HTML
+                        return self._pagina("Nuevo Cliente - SACH", PANEL_HTML.format(contenido=contenido))
+                    with mock._lock:
+                        mock.clientes.append(campos)
+                        id_cliente = len(mock.clientes)
+                    return self._redirigir(f"/cliente/{id_cliente}")
+                self._enviar(404, b"no encontrado")
+
+            def _asset(self, ruta):
+                """Assets pesados: sin latencia extra (la latencia simula el backend de SACH)"""
+                if ruta.startswith("/img/"):
+                    self._enviar(200, b"\0" * 300 * 1024, "image/png", {"Cache-Control": "max-age=3600"})
+                elif ruta == "/fuente.woff2":
+                    self._enviar(200, b"\0" * 200 * 1024, "font/woff2", {"Cache-Control": "max-age=3600"})
+                elif ruta in ("/app.js", "/analytics.js"):
+                    self._enviar(200, b"//" + b"x" * 300 * 1024, "application/javascript",
+                                 {"Cache-Control": "max-age=3600"})
+                elif ruta == "/estilos.css":
+                    self._enviar(200, b"/*" + b"x" * 300 * 1024 + b"*/", "text/css",
+                                 {"Cache-Control": "max-age=3600"})
+                else:
+                    return False
+                return True
+
+        return Manejador
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SACH local de prueba")
+    parser.add_argument("--puerto", type=int, default=8800)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos por página de SACH")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Segundos aleatorios extra por página")
+    parser.add_argument("--assets-pesados", action="store_true", help="Imágenes, fuente, JS/CSS y analytics")
+    parser.add_argument("--ttl-sesion", type=float, default=None, help="Vencimiento de la sesión en segundos")
+    parser.add_argument("--usuario", default="robot")
+    parser.add_argument("--password", default="robot")
+    args = parser.parse_args()
+
+    mock = ServidorMockSACH(
+        usuario=args.usuario, password=args.password, latencia=args.latencia, jitter=args.jitter,
+        assets_pesados=args.assets_pesados, ttl_sesion=args.ttl_sesion, puerto=args.puerto
+    )
+    url = mock.iniciar()
+    print(f"🧪 SACH de prueba en {url}")
+    print(f"   SACH_BASE_URL={url} SACH_USER={args.usuario} SACH_PASS={args.password}")
+    sys.stdout.flush()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.detener()
+
+
+if __name__ == "__main__":
+    main()
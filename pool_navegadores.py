@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Pool de Navegadores SACH
+Mantiene navegadores Chromium calientes para que RobotSACH no pague el arranque en frío en cada reserva
+"""
+
+import logging
+import os
+import contextvars
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from playwright.sync_api import sync_playwright
+from almacen_sesion import obtener_almacen_sesion
+from sesion import obtener_gestor_sesion
+from recursos import obtener_politica_recursos
+from metricas import metricas
+
+log = logging.getLogger("pool_navegadores")
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+ARGS_CHROMIUM = ["--no-sandbox", "--disable-gpu", "--disable-dev-shm-usage"]
+
+
+class SlotNavegador:
+    """
+    Un navegador caliente con su contexto y página.
+    La API sync de Playwright está atada al hilo que la creó, por eso cada slot
+    tiene su propio hilo y todo el trabajo sobre la página se ejecuta ahí.
+    """
+
+    def __init__(self, indice, almacen, max_usos):
+        self.indice = indice
+        self.almacen = almacen
+        self.max_usos = max_usos
+        # Cuándo se autenticó por última vez el contexto actual (None = no se sabe)
+        self.autenticado_en = None
+
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.page = None
+
+        # Lo escribe solo el hilo del slot (al lanzar y en el evento "disconnected"):
+        # las sondas y métricas lo leen sin tocar objetos de Playwright desde otro hilo
+        self.conectado = False
+
+        self.usos = 0
+        self.reciclados = 0
+        self.caidas = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"sach-navegador-{indice}")
+
+    def ejecutar(self, funcion, *args, **kwargs):
+        """Ejecuta funcion(slot, ...) en el hilo del slot y devuelve su resultado"""
+        return self.encolar(funcion, *args, **kwargs).result()
+
+    def encolar(self, funcion, *args, **kwargs):
+        """Como ejecutar, pero devuelve el future sin esperar"""
+        # Copia el contexto para que el id de correlación del log llegue al hilo del slot
+        contexto = contextvars.copy_context()
+        return self._executor.submit(contexto.run, self._ejecutar, funcion, *args, **kwargs)
+
+    def calentar(self):
+        """Lanza el navegador en segundo plano; devuelve el future"""
+        return self._executor.submit(self._asegurar_listo)
+
+    def _ejecutar(self, funcion, *args, **kwargs):
+        self._asegurar_listo()
+        try:
+            resultado = funcion(self, *args, **kwargs)
+        except Exception:
+            # Caída durante el uso: el contexto puede quedar en estado inconsistente
+            self.caidas += 1
+            self._reciclar(cerrar_navegador=not self._navegador_vivo())
+            raise
+
+        self.usos += 1
+        if self.max_usos and self.usos >= self.max_usos:
+            self._reciclar()
+        return resultado
+
+    def _navegador_vivo(self):
+        try:
+            return self.browser is not None and self.browser.is_connected()
+        except Exception:
+            return False
+
+    def _al_desconectar(self, browser):
+        # Un cierre propio (_liberar) ya bajó el flag: solo se avisa la caída
+        if browser is self.browser and self.conectado:
+            log.warning(f"⚠️ Navegador {self.indice} desconectado")
+            self.conectado = False
+
+    def _asegurar_listo(self):
+        """Health-check: relanza lo que haga falta antes de prestar el slot"""
+        if self.playwright is None:
+            self.playwright = sync_playwright().start()
+
+        if not self._navegador_vivo():
+            if self.browser is not None:
+                log.warning(f"⚠️ Navegador {self.indice} caído - relanzando")
+                self.caidas += 1
+            self.conectado = False
+            with metricas.span("iniciar_navegador"):
+                self.browser = self.playwright.chromium.launch(
+                    headless=True,
+                    args=ARGS_CHROMIUM,
+                    timeout=60000
+                )
+            self.browser.on("disconnected", self._al_desconectar)
+            self.context = None
+            self.page = None
+        self.conectado = True
+
+        if self.context is None:
+            opciones = {"user_agent": USER_AGENT}
+            registro = self.almacen.cargar_registro()
+            if registro:
+                opciones["storage_state"] = registro["storage_state"]
+                obtener_gestor_sesion().sembrar(registro)
+            self.context = self.browser.new_context(**opciones)
+            obtener_politica_recursos().aplicar(self.context)
+            self.autenticado_en = registro["autenticado_en"] if registro else None
+            self.page = None
+            self.usos = 0
+
+        if self.page is None or self.page.is_closed():
+            self.page = self.context.new_page()
+            self.page.set_viewport_size({"width": 1280, "height": 720})
+
+    def guardar_sesion(self):
+        """Persiste las cookies del contexto (si no hay un estado autenticado más reciente)"""
+        try:
+            if self.context:
+                return self.almacen.guardar(self.context.storage_state(), self.autenticado_en)
+        except Exception as e:
+            log.warning(f"⚠️ Error guardando sesión del navegador {self.indice}: {e}")
+        return False
+
+    def _reciclar(self, cerrar_navegador=False):
+        """Descarta el contexto (y opcionalmente el navegador) para empezar limpio"""
+        self._liberar(cerrar_navegador)
+        self.reciclados += 1
+
+    def _liberar(self, cerrar_navegador):
+        self.guardar_sesion()
+        try:
+            if self.context:
+                self.context.close()
+        except Exception:
+            pass
+        self.context = None
+        self.page = None
+        self.usos = 0
+
+        if cerrar_navegador:
+            self.conectado = False
+            try:
+                if self.browser:
+                    self.browser.close()
+            except Exception:
+                pass
+            self.browser = None
+
+    def _cerrar(self):
+        self._liberar(cerrar_navegador=True)
+        if self.playwright:
+            self.playwright.stop()
+            self.playwright = None
+
+    def cerrar(self):
+        """Cierra el navegador guardando la sesión y termina el hilo del slot"""
+        try:
+            self._executor.submit(self._cerrar).result()
+        except Exception as e:
+            log.error(f"Error cerrando navegador {self.indice}: {e}")
+        self._executor.shutdown(wait=True)
+
+
+class PoolNavegadores:
+    """
+    Pool de N navegadores calientes que se prestan a RobotSACH.
+    Cada contexto se recicla después de K usos o si el navegador se cae.
+    """
+
+    def __init__(self, tamano=None, max_usos=None, almacen=None):
+        self.tamano = tamano or int(os.getenv('SACH_POOL_NAVEGADORES', '2'))
+        self.max_usos = max_usos if max_usos is not None else int(os.getenv('SACH_POOL_MAX_USOS', '50'))
+        self.almacen = almacen or obtener_almacen_sesion()
+
+        self._slots = [SlotNavegador(i, self.almacen, self.max_usos) for i in range(self.tamano)]
+        self._libres = queue.Queue()
+        for slot in self._slots:
+            self._libres.put(slot)
+
+        self._lock = threading.Lock()
+        self._ocupados = 0
+        self._prestamos = 0
+        self._esperando = 0
+        self._cerrado = False
+
+    @contextmanager
+    def prestar(self, timeout=None):
+        """Presta un slot libre; bloquea hasta que haya uno disponible"""
+        if self._cerrado:
+            raise RuntimeError("El pool de navegadores está cerrado")
+
+        with self._lock:
+            self._esperando += 1
+        try:
+            slot = self._libres.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("No hay navegadores libres en el pool")
+        finally:
+            with self._lock:
+                self._esperando -= 1
+
+        with self._lock:
+            self._ocupados += 1
+            self._prestamos += 1
+        try:
+            yield slot
+        finally:
+            with self._lock:
+                self._ocupados -= 1
+            self._libres.put(slot)
+
+    def ejecutar(self, funcion, *args, timeout=None, **kwargs):
+        """Ejecuta funcion(slot, ...) con un navegador prestado del pool"""
+        with self.prestar(timeout=timeout) as slot:
+            return slot.ejecutar(funcion, *args, **kwargs)
+
+    def en_cada_slot(self, funcion):
+        """
+        Ejecuta funcion(slot) en todos los navegadores, en paralelo.
+        Cada slot la corre en su hilo, entre un préstamo y el siguiente.
+        """
+        futuros = [slot.encolar(funcion) for slot in self._slots]
+        resultados = []
+        for futuro in futuros:
+            try:
+                resultados.append(futuro.result())
+            except Exception as e:
+                log.warning(f"⚠️ Error en navegador del pool: {e}")
+                resultados.append(None)
+        return resultados
+
+    def calentar(self):
+        """Lanza todos los navegadores por adelantado, en paralelo"""
+        for futuro in [slot.calentar() for slot in self._slots]:
+            futuro.result()
+
+    def vivos(self):
+        """Cantidad de navegadores lanzados y todavía conectados (según el flag de cada slot)"""
+        return sum(1 for s in self._slots if s.conectado)
+
+    def estadisticas(self):
+        """Ocupación del pool y contadores de reciclado"""
+        with self._lock:
+            ocupados = self._ocupados
+            esperando = self._esperando
+            prestamos = self._prestamos
+        return {
+            "tamano": self.tamano,
+            "ocupados": ocupados,
+            "libres": self.tamano - ocupados,
+            "esperando": esperando,
+            "prestamos_totales": prestamos,
+            "max_usos": self.max_usos,
+            "calientes": sum(1 for s in self._slots if s.browser is not None),
+            "vivos": self.vivos(),
+            "reciclados": sum(s.reciclados for s in self._slots),
+            "caidas": sum(s.caidas for s in self._slots),
+        }
+
+    def cerrar(self):
+        """Cierra todos los navegadores del pool"""
+        self._cerrado = True
+        for slot in self._slots:
+            slot.cerrar()
+
+
+_pool_global = None
+_pool_global_lock = threading.Lock()
+
+
+def obtener_pool():
+    """Pool compartido por el proceso (se crea la primera vez que se pide)"""
+    global _pool_global
+    with _pool_global_lock:
+        if _pool_global is None:
+            _pool_global = PoolNavegadores()
+        return _pool_global
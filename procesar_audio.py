@@ -5,17 +5,40 @@ Usa Groq Whisper para transcripción y Llama 3 para extracción de datos
 """
 
 import os
+import io
 import json
 import sys
+import logging
+import glob
+import time
+import wave
+import shutil
+import hashlib
+import asyncio
+import argparse
+import threading
+import contextlib
+import subprocess
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from groq import Groq
+from groq import Groq, AsyncGroq
+from cache_transcripciones import CacheTranscripciones, hash_audio
+from extractor_reglas import extraer_por_reglas, datos_completos, normalizar_texto
+from limitador import obtener_limitador
+from metricas import metricas
+from bitacora import configurar_logging
+
+log = logging.getLogger("procesar_audio")
 
 # Cargar variables de entorno
 load_dotenv()
 
+MODELO_TRANSCRIPCION = "whisper-large-v3-turbo"
+MODELO_EXTRACCION = "llama-3.3-70b-versatile"
+
 class ProcesadorAudio:
-    def __init__(self):
+    def __init__(self, cache_transcripciones=None, limitador=None):
         self.clave_api = os.getenv('GROQ_API_KEY')
         if not self.clave_api:
             raise ValueError("GROQ_API_KEY no encontrada en el archivo .env")
@@ -23,27 +46,133 @@ class ProcesadorAudio:
         # Forzar inicialización de Groq SIN argumentos extra
         self.client = Groq(api_key=self.clave_api)
         
-    def transcribir_audio(self, archivo_audio):
+        # Caché por SHA-256 del audio: reenvíos de la misma nota no pagan Whisper
+        self.cache_transcripciones = cache_transcripciones or CacheTranscripciones()
+        
+        # Caché de extracciones por texto normalizado (solo memoria) y contadores de uso del LLM
+        self.cache_extracciones = CacheTranscripciones(directorio="")
+        self._lock_extraccion = threading.Lock()
+        self._extracciones = {"cache": 0, "reglas": 0, "llm": 0}
+        
+        # Concurrencia y llamadas por minuto a Groq, compartidas con el camino async
+        self.limitador = limitador or obtener_limitador()
+        
+    @staticmethod
+    def _abrir_audio(archivo_audio):
+        """
+        Normaliza la entrada a un objeto tipo archivo sin copias extra:
+        ruta, bytes, archivo abierto o iterador de chunks (descarga en streaming)
+        """
+        if isinstance(archivo_audio, (str, os.PathLike)):
+            return open(archivo_audio, "rb"), True
+        if isinstance(archivo_audio, (bytes, bytearray, memoryview)):
+            return io.BytesIO(archivo_audio), False
+        if hasattr(archivo_audio, "read"):
+            return archivo_audio, False
+        # Iterador de chunks: se vuelcan a un único buffer
+        buffer = io.BytesIO()
+        for chunk in archivo_audio:
+            buffer.write(chunk)
+        buffer.seek(0)
+        return buffer, False
+    
+    def _preparar_audio(self, archivo_audio, nombre_archivo):
+        """Abre el audio y calcula su hash: (archivo, abierto_aca, nombre, clave)"""
+        if nombre_archivo is None:
+            nombre_archivo = os.path.basename(archivo_audio) if isinstance(archivo_audio, (str, os.PathLike)) else "audio.m4a"
+        archivo, abierto_aca = self._abrir_audio(archivo_audio)
+        if not archivo.seekable():
+            archivo = io.BytesIO(archivo.read())
+        return archivo, abierto_aca, nombre_archivo, hash_audio(archivo)
+    
+    def _guardar_transcripcion(self, clave, transcription):
+        if isinstance(transcription, str) and transcription.strip():
+            self.cache_transcripciones.guardar(clave, transcription)
+    
+    @metricas.medido("transcribir_audio")
+    def transcribir_audio(self, archivo_audio, nombre_archivo=None):
         """
-        Transcribe el archivo de audio usando Whisper de Groq
+        Transcribe el audio usando Whisper de Groq.
+        Acepta una ruta, bytes, un objeto tipo archivo o un iterador de chunks.
         """
         try:
-            with open(archivo_audio, "rb") as file:
-                transcription = self.client.audio.transcriptions.create(
-                    file=(archivo_audio, file.read()),
-                    model="whisper-large-v3-turbo",
-                    language="es",  # Español
-                    response_format="text"
-                )
+            archivo, abierto_aca, nombre_archivo, clave = self._preparar_audio(archivo_audio, nombre_archivo)
+            try:
+                cacheada = self.cache_transcripciones.obtener(clave)
+                if cacheada is not None:
+                    log.info("♻️ Transcripción obtenida de la caché")
+                    return cacheada
+                
+                with self.limitador.turno("transcripcion"):
+                    transcription = self.client.audio.transcriptions.create(
+                        file=(nombre_archivo, archivo),
+                        model=MODELO_TRANSCRIPCION,
+                        language="es",  # Español
+                        response_format="text"
+                    )
+            finally:
+                if abierto_aca:
+                    archivo.close()
+            
+            self._guardar_transcripcion(clave, transcription)
             return transcription
         except Exception as e:
-            print(f"Error en transcripción: {e}")
+            log.error(f"Error en transcripción: {e}")
             return None
     
+    def _contar_extraccion(self, origen):
+        with self._lock_extraccion:
+            self._extracciones[origen] += 1
+    
+    def estadisticas_extraccion(self):
+        """Cuántas extracciones evitaron el LLM (caché o reglas)"""
+        with self._lock_extraccion:
+            total = sum(self._extracciones.values())
+            sin_llm = self._extracciones["cache"] + self._extracciones["reglas"]
+            return {
+                **self._extracciones,
+                "total": total,
+                "tasa_sin_llm": round(sin_llm / total, 4) if total else 0.0,
+            }
+    
+    def _extraer_sin_llm(self, texto_transcrito):
+        """Caché y parser por reglas: (clave, datos) con datos None si hace falta el LLM"""
+        clave = hashlib.sha256(normalizar_texto(texto_transcrito).encode('utf-8')).hexdigest()
+        cacheado = self.cache_extracciones.obtener(clave)
+        if cacheado is not None:
+            self._contar_extraccion("cache")
+            return clave, json.loads(cacheado)
+        
+        datos = extraer_por_reglas(texto_transcrito)
+        if datos_completos(datos):
+            log.info("⚡ Datos extraídos por reglas (sin LLM)")
+            self._contar_extraccion("reglas")
+            self._guardar_extraccion(clave, datos)
+            return clave, datos
+        return clave, None
+    
+    def _guardar_extraccion(self, clave, datos):
+        if datos:
+            self.cache_extracciones.guardar(clave, json.dumps(datos, ensure_ascii=False))
+    
+    @metricas.medido("extraer_datos_reserva")
     def extraer_datos_reserva(self, texto_transcrito):
         """
-        Usa Llama 3 para extraer datos estructurados del texto transcrito
+        Extrae datos estructurados del texto transcrito.
+        Primero caché y parser por reglas; Llama 3 solo si faltan campos o son ambiguos.
         """
+        if not texto_transcrito:
+            return None
+        
+        clave, datos = self._extraer_sin_llm(texto_transcrito)
+        if datos is None:
+            datos = self._extraer_con_llm(texto_transcrito)
+            self._contar_extraccion("llm")
+            self._guardar_extraccion(clave, datos)
+        return datos
+    
+    @staticmethod
+    def _mensajes_extraccion(texto_transcrito):
         prompt = f"""
 Analiza el siguiente texto de una reserva y extrae la información en formato JSON.
 Solo responde con el JSON, sin texto adicional.
@@ -55,7 +184,7 @@ Extrae los siguientes campos si están presentes:
 - cabana: Número o nombre de la cabaña
 - fecha_entrada: Fecha de check-in (formato YYYY-MM-DD)
 - noches: Cantidad de noches
-- precio: Precio total de la reserva
+- precio: Precio total de la reserva (si se dice un precio por noche, multiplicalo por las noches)
 
 Ejemplo de respuesta esperada:
 {{
@@ -68,67 +197,271 @@ Ejemplo de respuesta esperada:
 
 Si algún dato no está presente, usa null:
 """
-
+        return [
+            {"role": "system", "content": "Eres un asistente experto en extraer datos de reservas. Responde solo con JSON válido."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    @staticmethod
+    def _parsear_json_llm(contenido):
+        """Limpia los fences de markdown y parsea el JSON de la respuesta"""
+        contenido = contenido.strip()
+        
+        # Intentar encontrar el JSON en la respuesta
+        if contenido.startswith('```json'):
+            contenido = contenido[7:-3].strip()
+        elif contenido.startswith('```'):
+            contenido = contenido[3:-3].strip()
+        
         try:
-            response = self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": "Eres un asistente experto en extraer datos de reservas. Responde solo con JSON válido."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                max_tokens=500
-            )
-            
-            # Limpiar y parsear el JSON
-            contenido = response.choices[0].message.content.strip()
-            
-            # Intentar encontrar el JSON en la respuesta
-            if contenido.startswith('```json'):
-                contenido = contenido[7:-3].strip()
-            elif contenido.startswith('```'):
-                contenido = contenido[3:-3].strip()
-                
             return json.loads(contenido)
-            
         except json.JSONDecodeError as e:
-            print(f"Error parseando JSON: {e}")
-            print(f"Contenido recibido: {contenido}")
+            log.error(f"Error parseando JSON del LLM: {e}")
+            # Trae datos del huésped: solo en DEBUG (y pasa por el filtro de redacción)
+            log.debug(f"Contenido recibido: {contenido}")
             return None
+    
+    def _extraer_con_llm(self, texto_transcrito):
+        """
+        Usa Llama 3 para extraer datos estructurados del texto transcrito
+        """
+        try:
+            with self.limitador.turno("extraccion"):
+                response = self.client.chat.completions.create(
+                    model=MODELO_EXTRACCION,
+                    messages=self._mensajes_extraccion(texto_transcrito),
+                    temperature=0.1,
+                    max_tokens=500
+                )
+            return self._parsear_json_llm(response.choices[0].message.content)
         except Exception as e:
-            print(f"Error en extracción de datos: {e}")
+            log.error(f"Error en extracción de datos: {e}")
             return None
     
     def procesar_audio(self, archivo_audio):
         """
         Procesa el archivo de audio completo y devuelve los datos estructurados
         """
-        print(f"Procesando archivo: {archivo_audio}")
+        log.info(f"Procesando archivo: {archivo_audio}")
         
         # Verificar que el archivo existe
         if not Path(archivo_audio).exists():
             raise FileNotFoundError(f"No se encuentra el archivo: {archivo_audio}")
         
         # Transcribir audio
-        print("Transcribiendo audio...")
+        log.info("Transcribiendo audio...")
         texto = self.transcribir_audio(archivo_audio)
         if not texto:
             return None
         
-        print(f"Texto transcrito: {texto}")
+        log.debug(f"Texto transcrito: {texto}")
         
         # Extraer datos
-        print("Extrayendo datos de la reserva...")
+        log.info("Extrayendo datos de la reserva...")
         datos = self.extraer_datos_reserva(texto)
         
         return datos
 
+class ProcesadorAudioAsync(ProcesadorAudio):
+    """
+    Variante async sobre AsyncGroq: transcribir_audio, extraer_datos_reserva y procesar_audio
+    son corrutinas. Las llamadas pasan por el mismo limitador del proceso que la versión sync.
+    Comparte cachés y parser por reglas con la versión sync.
+    """
+    
+    def __init__(self, cache_transcripciones=None, limitador=None):
+        super().__init__(cache_transcripciones, limitador)
+        self.client_async = AsyncGroq(api_key=self.clave_api)
+    
+    @metricas.medido("transcribir_audio")
+    async def transcribir_audio(self, archivo_audio, nombre_archivo=None):
+        """Transcribe el audio con Whisper de Groq sin bloquear el event loop"""
+        try:
+            # Leer el archivo y calcular el SHA-256 es IO y CPU: fuera del event loop
+            archivo, abierto_aca, nombre_archivo, clave = await asyncio.to_thread(
+                self._preparar_audio, archivo_audio, nombre_archivo
+            )
+            try:
+                cacheada = self.cache_transcripciones.obtener(clave)
+                if cacheada is not None:
+                    return cacheada
+                
+                async with self.limitador.turno_async("transcripcion"):
+                    transcription = await self.client_async.audio.transcriptions.create(
+                        file=(nombre_archivo, archivo),
+                        model=MODELO_TRANSCRIPCION,
+                        language="es",  # Español
+                        response_format="text"
+                    )
+            finally:
+                if abierto_aca:
+                    archivo.close()
+            
+            self._guardar_transcripcion(clave, transcription)
+            return transcription
+        except Exception as e:
+            log.error(f"Error en transcripción: {e}")
+            return None
+    
+    @metricas.medido("extraer_datos_reserva")
+    async def extraer_datos_reserva(self, texto_transcrito):
+        """Caché y reglas primero; Llama 3 async solo si hace falta"""
+        if not texto_transcrito:
+            return None
+        
+        clave, datos = self._extraer_sin_llm(texto_transcrito)
+        if datos is None:
+            datos = await self._extraer_con_llm(texto_transcrito)
+            self._contar_extraccion("llm")
+            self._guardar_extraccion(clave, datos)
+        return datos
+    
+    async def _extraer_con_llm(self, texto_transcrito):
+        try:
+            async with self.limitador.turno_async("extraccion"):
+                response = await self.client_async.chat.completions.create(
+                    model=MODELO_EXTRACCION,
+                    messages=self._mensajes_extraccion(texto_transcrito),
+                    temperature=0.1,
+                    max_tokens=500
+                )
+            return self._parsear_json_llm(response.choices[0].message.content)
+        except Exception as e:
+            log.error(f"Error en extracción de datos: {e}")
+            return None
+    
+    async def procesar_audio(self, archivo_audio, nombre_archivo=None):
+        """Transcribe y extrae; acepta ruta, bytes, archivo o iterador de chunks"""
+        if isinstance(archivo_audio, (str, os.PathLike)) and not Path(archivo_audio).exists():
+            raise FileNotFoundError(f"No se encuentra el archivo: {archivo_audio}")
+        
+        texto = await self.transcribir_audio(archivo_audio, nombre_archivo)
+        if not texto:
+            return None
+        return await self.extraer_datos_reserva(texto)
+
+EXTENSIONES_AUDIO = {'.wav', '.mp3', '.m4a', '.ogg', '.opus', '.flac', '.webm', '.mp4', '.mpeg', '.mpga'}
+
+def listar_audios(origen):
+    """Archivos de audio de un directorio, o los que coinciden con un glob"""
+    if os.path.isdir(origen):
+        return sorted(
+            str(p) for p in Path(origen).rglob('*')
+            if p.is_file() and p.suffix.lower() in EXTENSIONES_AUDIO
+        )
+    return sorted(p for p in glob.glob(origen, recursive=True) if os.path.isfile(p))
+
+def duracion_audio(ruta):
+    """Duración en segundos (wav nativo, el resto con ffprobe si está instalado) o None"""
+    try:
+        if ruta.lower().endswith('.wav'):
+            with wave.open(ruta, 'rb') as w:
+                return w.getnframes() / float(w.getframerate())
+        if shutil.which('ffprobe'):
+            salida = subprocess.run(
+                ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', ruta],
+                capture_output=True, text=True, timeout=30
+            )
+            return float(salida.stdout.strip())
+    except Exception:
+        pass
+    return None
+
+def leer_checkpoint(ruta_checkpoint):
+    if not os.path.exists(ruta_checkpoint):
+        return set()
+    with open(ruta_checkpoint, 'r', encoding='utf-8') as f:
+        return {linea.rstrip('\n') for linea in f if linea.strip()}
+
+def procesar_lote(argv):
+    """
+    Procesa un directorio o glob de audios en paralelo.
+    Emite una línea JSON por archivo y registra los exitosos en el checkpoint para poder reanudar.
+    """
+    parser = argparse.ArgumentParser(prog="procesar_audio.py lote", description="Procesamiento por lotes de audios")
+    parser.add_argument("origen", help="Directorio o patrón glob (ej: 'audios/**/*.m4a')")
+    parser.add_argument("--workers", type=int, default=4, help="Archivos en paralelo (default: 4)")
+    parser.add_argument("--salida", help="Archivo JSON Lines de resultados (default: stdout)")
+    parser.add_argument("--checkpoint", help="Archivo de checkpoint (default: <salida>.checkpoint o procesar_audio.checkpoint)")
+    args = parser.parse_args(argv)
+    
+    # Logs a stderr para no mezclarse con el JSON Lines de resultados
+    configurar_logging(formato_por_defecto="texto", salida=sys.stderr)
+    
+    ruta_checkpoint = args.checkpoint or (f"{args.salida}.checkpoint" if args.salida else "procesar_audio.checkpoint")
+    hechos = leer_checkpoint(ruta_checkpoint)
+    archivos = listar_audios(args.origen)
+    pendientes = [a for a in archivos if os.path.abspath(a) not in hechos]
+    
+    print(f"📂 {len(archivos)} audios encontrados, {len(archivos) - len(pendientes)} ya procesados, {len(pendientes)} pendientes", file=sys.stderr)
+    if not pendientes:
+        return 0
+    
+    salida = open(args.salida, 'a', encoding='utf-8') if args.salida else sys.stdout
+    procesador = ProcesadorAudio()
+    
+    def procesar_uno(ruta):
+        inicio = time.perf_counter()
+        try:
+            datos = procesador.procesar_audio(ruta)
+            error = None if datos else "No se pudieron extraer los datos"
+        except Exception as e:
+            datos, error = None, str(e)
+        return {
+            "archivo": ruta,
+            "ok": error is None,
+            "datos": datos,
+            "error": error,
+            "segundos": round(time.perf_counter() - inicio, 3),
+            "duracion_audio": duracion_audio(ruta),
+        }
+    
+    ok = fallidos = 0
+    segundos_audio = 0.0
+    inicio = time.perf_counter()
+    try:
+        # Los mensajes de progreso van a stderr para no mezclarse con el JSON Lines
+        with contextlib.redirect_stdout(sys.stderr), \
+             open(ruta_checkpoint, 'a', encoding='utf-8') as checkpoint, \
+             ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futuros = [executor.submit(procesar_uno, ruta) for ruta in pendientes]
+            try:
+                for futuro in as_completed(futuros):
+                    resultado = futuro.result()
+                    salida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+                    salida.flush()
+                    if resultado["ok"]:
+                        ok += 1
+                        checkpoint.write(os.path.abspath(resultado["archivo"]) + "\n")
+                        checkpoint.flush()
+                    else:
+                        fallidos += 1
+                    segundos_audio += resultado["duracion_audio"] or 0.0
+            except KeyboardInterrupt:
+                # No arrancar los pendientes; los que están en curso terminan
+                executor.shutdown(wait=False, cancel_futures=True)
+                print("\n⏹️  Lote interrumpido: se reanuda desde el checkpoint en la próxima ejecución", file=sys.stderr)
+    finally:
+        if salida is not sys.stdout:
+            salida.close()
+    
+    transcurrido = time.perf_counter() - inicio
+    print(f"\n=== RESUMEN DEL LOTE ===", file=sys.stderr)
+    print(f"✅ {ok} ok | ❌ {fallidos} fallidos | ⏱️ {transcurrido:.1f}s", file=sys.stderr)
+    print(f"📈 {(ok + fallidos) / transcurrido:.2f} archivos/s | {segundos_audio / transcurrido:.2f} segundos de audio/s", file=sys.stderr)
+    return 0 if fallidos == 0 else 1
+
 def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == "lote":
+        sys.exit(procesar_lote(sys.argv[2:]))
+    
     if len(sys.argv) != 2:
         print("Uso: python procesar_audio.py <archivo_audio>")
+        print("     python procesar_audio.py lote <directorio|glob> [--workers N] [--salida resultados.jsonl]")
         sys.exit(1)
     
     archivo_audio = sys.argv[1]
+    configurar_logging(formato_por_defecto="texto")
     
     try:
         procesador = ProcesadorAudio()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Política de recursos para los contextos de Playwright
+El robot solo interactúa con inputs: imágenes, media, fuentes y dominios de terceros
+(analytics) se cortan en el contexto, y el JS/CSS estático de SACH se puede servir
+desde una caché en memoria compartida entre contextos. La caché respeta Cache-Control
+(no-store, no-cache, max-age) con un TTL por defecto, y revalida con ETag/Last-Modified.
+"""
+
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+TIPOS_BLOQUEADOS = "image,media,font"
+# Además de SACH, los dominios del captcha del login (google-analytics/googletagmanager quedan fuera)
+DOMINIOS_PERMITIDOS = "google.com,gstatic.com,recaptcha.net"
+TIPOS_ESTATICOS = ("script", "stylesheet")
+RE_MAX_AGE = re.compile(r"\bmax-age\s*=\s*(\d+)")
+
+
+def _lista(valor):
+    return [v.strip().lower() for v in valor.split(',') if v.strip()]
+
+
+def _dominios_por_defecto():
+    """El host de SACH_BASE_URL (sach.com.ar o el mock local) más los del captcha"""
+    host = urlparse(os.getenv('SACH_BASE_URL', 'https://sach.com.ar')).hostname or 'sach.com.ar'
+    return f"{host},{DOMINIOS_PERMITIDOS}"
+
+
+class PoliticaRecursos:
+    """
+    Handler de context.route que decide por cada request: abortar, servir de caché o dejar pasar.
+    Con route() activo Chromium no usa su caché HTTP, por eso la caché de estáticos es propia.
+    """
+
+    def __init__(self, tipos_bloqueados=None, dominios_permitidos=None, cachear_estaticos=None, max_mb_cache=None,
+                 ttl_cache=None):
+        self.tipos_bloqueados = set(tipos_bloqueados if tipos_bloqueados is not None
+                                    else _lista(os.getenv('SACH_BLOQUEAR_RECURSOS', TIPOS_BLOQUEADOS)))
+        self.dominios_permitidos = (dominios_permitidos if dominios_permitidos is not None
+                                    else _lista(os.getenv('SACH_DOMINIOS_PERMITIDOS', _dominios_por_defecto())))
+        self.cachear_estaticos = (cachear_estaticos if cachear_estaticos is not None
+                                  else os.getenv('SACH_CACHE_ESTATICOS', '1') == '1')
+        self.max_bytes_cache = int((max_mb_cache or float(os.getenv('SACH_CACHE_ESTATICOS_MB', '20'))) * 1024 * 1024)
+        # Segundos que vale un estático sin max-age (después de un deploy de SACH se vuelve a pedir)
+        self.ttl_cache = ttl_cache if ttl_cache is not None else float(os.getenv('SACH_CACHE_ESTATICOS_TTL', '300'))
+
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._bytes_cache = 0
+        self._stats = {
+            "permitidos": 0,
+            "bloqueados_tipo": 0,
+            "bloqueados_terceros": 0,
+            "cache_aciertos": 0,
+            "cache_fallos": 0,
+            "cache_revalidados": 0,
+            "cache_vencidos": 0,
+        }
+
+    def activa(self):
+        return bool(self.tipos_bloqueados or self.dominios_permitidos or self.cachear_estaticos)
+
+    def aplicar(self, context):
+        """Registra la política en un contexto recién creado"""
+        if self.activa():
+            context.route("**/*", self._manejar)
+
+    async def aplicar_async(self, context):
+        """Como aplicar, para contextos de async_playwright"""
+        if self.activa():
+            await context.route("**/*", self._manejar_async)
+
+    def _contar(self, nombre):
+        with self._lock:
+            self._stats[nombre] += 1
+
+    def _permitido(self, host):
+        if not self.dominios_permitidos:
+            return True
+        return any(host == d or host.endswith("." + d) for d in self.dominios_permitidos)
+
+    def _decidir(self, request):
+        """'abortar', 'estatico' o 'continuar' (ya contado en las estadísticas salvo 'estatico')"""
+        tipo = request.resource_type
+
+        if tipo in self.tipos_bloqueados:
+            self._contar("bloqueados_tipo")
+            return "abortar"
+
+        if not self._permitido((urlparse(request.url).hostname or "").lower()):
+            self._contar("bloqueados_terceros")
+            return "abortar"
+
+        if self.cachear_estaticos and tipo in TIPOS_ESTATICOS and request.method == "GET":
+            return "estatico"
+
+        self._contar("permitidos")
+        return "continuar"
+
+    def _manejar(self, route):
+        decision = self._decidir(route.request)
+        if decision == "abortar":
+            return route.abort()
+        if decision == "estatico":
+            return self._servir_estatico(route)
+        return route.continue_()
+
+    async def _manejar_async(self, route):
+        decision = self._decidir(route.request)
+        if decision == "abortar":
+            return await route.abort()
+        if decision == "estatico":
+            return await self._servir_estatico_async(route)
+        return await route.continue_()
+
+    def _vigencia(self, headers):
+        """Segundos que se puede servir una respuesta sin volver a pedirla; None = no cachear"""
+        control = (headers.get("cache-control") or "").lower()
+        if "no-store" in control or "no-cache" in control:
+            return None
+        max_age = RE_MAX_AGE.search(control)
+        segundos = int(max_age.group(1)) if max_age else self.ttl_cache
+        return segundos if segundos > 0 else None
+
+    @staticmethod
+    def _validadores(headers):
+        return {"etag": headers.get("etag"), "last-modified": headers.get("last-modified")}
+
+    def _de_cache(self, url):
+        """
+        (entrada, fresca): una vencida con ETag/Last-Modified se devuelve para revalidarla;
+        sin validadores se descarta
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._cache.get(url)
+            if entrada and entrada["vence"] > ahora:
+                self._cache.move_to_end(url)
+                self._stats["cache_aciertos"] += 1
+                return entrada, True
+            if entrada:
+                self._stats["cache_vencidos"] += 1
+                if any(entrada["validadores"].values()):
+                    return entrada, False
+                self._quitar(url)
+            self._stats["cache_fallos"] += 1
+        return None, False
+
+    @staticmethod
+    def _condicionales(request, entrada):
+        """Headers del request con If-None-Match / If-Modified-Since para revalidar una entrada vencida"""
+        if entrada is None:
+            return None
+        headers = dict(request.headers)
+        if entrada["validadores"]["etag"]:
+            headers["if-none-match"] = entrada["validadores"]["etag"]
+        if entrada["validadores"]["last-modified"]:
+            headers["if-modified-since"] = entrada["validadores"]["last-modified"]
+        return headers
+
+    def _renovar(self, url, respuesta):
+        """304: el estático no cambió; vuelve a valer con la vigencia que informó el servidor. None si ya no se puede cachear"""
+        vigencia = self._vigencia(respuesta.headers)
+        with self._lock:
+            entrada = self._cache.get(url)
+            if entrada is None:
+                return None
+            if vigencia is None:
+                self._quitar(url)
+            else:
+                entrada["vence"] = time.monotonic() + vigencia
+                self._cache.move_to_end(url)
+            self._stats["cache_revalidados"] += 1
+        return entrada
+
+    def _cachear(self, url, respuesta, cuerpo):
+        vigencia = self._vigencia(respuesta.headers)
+        if respuesta.ok and vigencia is not None and len(cuerpo) <= self.max_bytes_cache:
+            # El cuerpo ya viene decodificado: sin content-encoding/length originales
+            headers = {k: v for k, v in respuesta.headers.items()
+                       if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")}
+            self._guardar(url, {"status": respuesta.status, "headers": headers, "body": cuerpo,
+                                "vence": time.monotonic() + vigencia,
+                                "validadores": self._validadores(respuesta.headers)})
+
+    def _servir_estatico(self, route):
+        url = route.request.url
+        entrada, fresca = self._de_cache(url)
+        if fresca:
+            return route.fulfill(status=entrada["status"], headers=entrada["headers"], body=entrada["body"])
+
+        try:
+            respuesta = route.fetch(headers=self._condicionales(route.request, entrada))
+            if entrada is not None and respuesta.status == 304:
+                self._renovar(url, respuesta)
+                return route.fulfill(status=entrada["status"], headers=entrada["headers"], body=entrada["body"])
+            cuerpo = respuesta.body()
+        except Exception:
+            return route.continue_()
+
+        self._cachear(url, respuesta, cuerpo)
+        return route.fulfill(response=respuesta, body=cuerpo)
+
+    async def _servir_estatico_async(self, route):
+        url = route.request.url
+        entrada, fresca = self._de_cache(url)
+        if fresca:
+            return await route.fulfill(status=entrada["status"], headers=entrada["headers"], body=entrada["body"])
+
+        try:
+            respuesta = await route.fetch(headers=self._condicionales(route.request, entrada))
+            if entrada is not None and respuesta.status == 304:
+                self._renovar(url, respuesta)
+                return await route.fulfill(status=entrada["status"], headers=entrada["headers"], body=entrada["body"])
+            cuerpo = await respuesta.body()
+        except Exception:
+            return await route.continue_()
+
+        self._cachear(url, respuesta, cuerpo)
+        return await route.fulfill(response=respuesta, body=cuerpo)
+
+    def _quitar(self, url):
+        vieja = self._cache.pop(url, None)
+        if vieja is not None:
+            self._bytes_cache -= len(vieja["body"])
+
+    def _expirar(self, ahora):
+        """Saca las vencidas que no se pueden revalidar (la caché tiene pocas entradas)"""
+        for url in [u for u, e in self._cache.items() if e["vence"] <= ahora and not any(e["validadores"].values())]:
+            self._quitar(url)
+
+    def _guardar(self, url, entrada):
+        with self._lock:
+            # Una versión nueva (vencida y vuelta a bajar) reemplaza a la anterior
+            self._quitar(url)
+            self._expirar(time.monotonic())
+            self._cache[url] = entrada
+            self._bytes_cache += len(entrada["body"])
+            while self._bytes_cache > self.max_bytes_cache:
+                _, vieja = self._cache.popitem(last=False)
+                self._bytes_cache -= len(vieja["body"])
+
+    def estadisticas(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cache_entradas"] = len(self._cache)
+            stats["cache_mb"] = round(self._bytes_cache / (1024 * 1024), 2)
+        stats.update({
+            "tipos_bloqueados": sorted(self.tipos_bloqueados),
+            "dominios_permitidos": self.dominios_permitidos,
+            "cachear_estaticos": self.cachear_estaticos,
+            "ttl_cache_s": self.ttl_cache,
+        })
+        return stats
+
+
+_politica_global = None
+_politica_global_lock = threading.Lock()
+
+
+def obtener_politica_recursos():
+    """Política compartida por todos los contextos del proceso (incluida la caché de estáticos)"""
+    global _politica_global
+    with _politica_global_lock:
+        if _politica_global is None:
+            _politica_global = PoliticaRecursos()
+        return _politica_global
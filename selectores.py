@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Resolución de selectores con memoria
+Cada lista de selectores de respaldo se resolvía con un locator(...).count() por candidato.
+Acá se recuerda el selector ganador por campo lógico y versión de página: se prueba primero
+(1 round trip) y ante un fallo se evalúa toda la lista en una sola llamada a page.evaluate.
+"""
+
+import logging
+import os
+import json
+import threading
+from urllib.parse import urlparse
+
+log = logging.getLogger("selectores")
+
+# Busca en el DOM el primer selector de la lista que exista, en un solo round trip.
+# Entiende CSS, XPath ('//...') y el pseudo ':has-text("...")' de Playwright.
+SONDA_JS = """
+(selectores) => {
+    const noSoportados = [];
+    const texto = (el) => (el.textContent || '').replace(/\\s+/g, ' ').trim().toLowerCase();
+    for (let i = 0; i < selectores.length; i++) {
+        const sel = selectores[i];
+        try {
+            if (sel.startsWith('//') || sel.startsWith('xpath=')) {
+                const r = document.evaluate(sel.replace(/^xpath=/, ''), document, null,
+                                            XPathResult.FIRST_ORDERED_NODE_TYPE, null);
+                if (r.singleNodeValue) return {indice: i, noSoportados};
+                continue;
+            }
+            const m = sel.match(/^(.*?):has-text\\((["'])(.*)\\2\\)$/);
+            if (m) {
+                const buscado = m[3].toLowerCase();
+                for (const el of document.querySelectorAll(m[1] || '*')) {
+                    if (texto(el).includes(buscado)) return {indice: i, noSoportados};
+                }
+                continue;
+            }
+            if (document.querySelector(sel)) return {indice: i, noSoportados};
+        } catch (e) {
+            noSoportados.push(i);
+        }
+    }
+    return {indice: -1, noSoportados};
+}
+"""
+
+
+def version_pagina(page):
+    """Versión de la página para indexar ganadores (la ruta; no cuesta un round trip)"""
+    return urlparse(page.url).path or "/"
+
+
+class ResolutorSelectores:
+    """Recuerda el selector que funciona para cada (campo, versión de página) entre reinicios"""
+
+    def __init__(self, ruta=None):
+        self.ruta = ruta or os.getenv('SACH_SELECTORES_FILE', 'sach_selectores.json')
+        self._lock = threading.Lock()
+        self._ganadores = {}
+        self._stats = {
+            "resoluciones": 0,
+            "aciertos_recordado": 0,
+            "sondeos": 0,
+            "secuenciales": 0,
+            "no_encontrados": 0,
+            "round_trips": 0,
+            "round_trips_sin_cache": 0,
+        }
+        self._cargar()
+
+    def _cargar(self):
+        try:
+            with open(self.ruta, 'r') as f:
+                self._ganadores = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            log.warning(f"⚠️ Error cargando selectores aprendidos: {e}")
+
+    def guardar(self):
+        """Persistencia atómica de los ganadores"""
+        with self._lock:
+            datos = json.dumps(self._ganadores, indent=2, ensure_ascii=False)
+        temporal = f"{self.ruta}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, 'w') as f:
+                f.write(datos)
+            os.replace(temporal, self.ruta)
+        except Exception as e:
+            log.warning(f"⚠️ Error guardando selectores aprendidos: {e}")
+
+    def _clave(self, campo, version):
+        return f"{campo}@{version}"
+
+    def _contar(self, **incrementos):
+        with self._lock:
+            for nombre, valor in incrementos.items():
+                self._stats[nombre] += valor
+
+    def _recordar(self, clave, selector):
+        with self._lock:
+            anterior = self._ganadores.get(clave, {}).get("selector")
+            entrada = self._ganadores.setdefault(clave, {"selector": selector, "aciertos": 0})
+            entrada["selector"] = selector
+            entrada["aciertos"] += 1
+        if anterior != selector:
+            self.guardar()
+
+    def _recordado(self, campo, page):
+        clave = self._clave(campo, version_pagina(page))
+        with self._lock:
+            recordado = self._ganadores.get(clave, {}).get("selector")
+        self._contar(resoluciones=1)
+        return clave, recordado
+
+    def _acierto(self, clave, selectores, recordado):
+        self._contar(aciertos_recordado=1, round_trips_sin_cache=selectores.index(recordado) + 1)
+        self._recordar(clave, recordado)
+        return recordado
+
+    def _cerrar(self, clave, selectores, ganador):
+        if ganador is None:
+            self._contar(no_encontrados=1, round_trips_sin_cache=len(selectores))
+            return None
+        # Lo que habría costado el loop original: un count() por candidato hasta el ganador
+        self._contar(round_trips_sin_cache=selectores.index(ganador) + 1)
+        self._recordar(clave, ganador)
+        return ganador
+
+    def resolver(self, page, campo, selectores):
+        """Devuelve el primer selector de la lista presente en la página, o None"""
+        clave, recordado = self._recordado(campo, page)
+
+        if recordado in selectores:
+            try:
+                self._contar(round_trips=1)
+                if page.locator(recordado).count() > 0:
+                    return self._acierto(clave, selectores, recordado)
+            except Exception:
+                pass
+
+        # Fallo: toda la lista en un solo evaluate
+        self._contar(sondeos=1, round_trips=1)
+        try:
+            resultado = page.evaluate(SONDA_JS, list(selectores))
+        except Exception:
+            resultado = {"indice": -1, "noSoportados": list(range(len(selectores)))}
+
+        ganador = selectores[resultado["indice"]] if resultado["indice"] >= 0 else None
+        if ganador is None and resultado["noSoportados"]:
+            # Solo los que la sonda no pudo evaluar se prueban con el motor de Playwright
+            self._contar(secuenciales=1)
+            for indice in resultado["noSoportados"]:
+                self._contar(round_trips=1)
+                try:
+                    if page.locator(selectores[indice]).count() > 0:
+                        ganador = selectores[indice]
+                        break
+                except Exception:
+                    continue
+
+        return self._cerrar(clave, selectores, ganador)
+
+    async def resolver_async(self, page, campo, selectores):
+        """Como resolver, para páginas de async_playwright"""
+        clave, recordado = self._recordado(campo, page)
+
+        if recordado in selectores:
+            try:
+                self._contar(round_trips=1)
+                if await page.locator(recordado).count() > 0:
+                    return self._acierto(clave, selectores, recordado)
+            except Exception:
+                pass
+
+        self._contar(sondeos=1, round_trips=1)
+        try:
+            resultado = await page.evaluate(SONDA_JS, list(selectores))
+        except Exception:
+            resultado = {"indice": -1, "noSoportados": list(range(len(selectores)))}
+
+        ganador = selectores[resultado["indice"]] if resultado["indice"] >= 0 else None
+        if ganador is None and resultado["noSoportados"]:
+            self._contar(secuenciales=1)
+            for indice in resultado["noSoportados"]:
+                self._contar(round_trips=1)
+                try:
+                    if await page.locator(selectores[indice]).count() > 0:
+                        ganador = selectores[indice]
+                        break
+                except Exception:
+                    continue
+
+        return self._cerrar(clave, selectores, ganador)
+
+    def estadisticas(self):
+        """Round trips al navegador con memoria vs los que habría hecho el loop original"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["ganadores"] = {clave: e["selector"] for clave, e in self._ganadores.items()}
+        return stats
+
+
+_resolutor_global = None
+_resolutor_global_lock = threading.Lock()
+
+
+def obtener_resolutor():
+    """Resolutor compartido por todos los robots del proceso"""
+    global _resolutor_global
+    with _resolutor_global_lock:
+        if _resolutor_global is None:
+            _resolutor_global = ResolutorSelectores()
+        return _resolutor_global
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Validez de la sesión SACH
+Recuerda cuándo fue la última navegación autenticada y cuándo vencen las cookies, para ir
+directo a /cliente/nuevo con la sesión caliente y refrescarla en segundo plano antes de que venza.
+"""
+
+import logging
+import os
+import time
+import threading
+
+log = logging.getLogger("sesion")
+
+
+class GestorSesion:
+    """
+    Estado de la sesión compartido por todos los robots del proceso.
+    SACH extiende la sesión con cada navegación autenticada (vencimiento deslizante),
+    y además las cookies pueden traer un vencimiento absoluto.
+    """
+
+    def __init__(self, ttl=None, margen=None):
+        self.ttl = ttl or int(os.getenv('SACH_SESION_TTL', '1200'))
+        self.margen = margen if margen is not None else int(os.getenv('SACH_SESION_MARGEN', '300'))
+        self._lock = threading.Lock()
+        self._ultimo_ok = None
+        self._expira_cookies = None
+        self._stats = {"directas": 0, "vencidas": 0, "logins": 0, "refrescos": 0}
+
+    @staticmethod
+    def _vencimiento_cookies(cookies):
+        """El vencimiento absoluto más próximo (las cookies de sesión traen expires=-1)"""
+        vencimientos = [c["expires"] for c in cookies or [] if c.get("expires", -1) > 0]
+        return min(vencimientos) if vencimientos else None
+
+    def _restante(self, ahora):
+        """Segundos hasta que la sesión deje de ser confiable, o None si nunca se validó"""
+        if self._ultimo_ok is None:
+            return None
+        restante = self.ttl - (ahora - self._ultimo_ok)
+        if self._expira_cookies is not None:
+            restante = min(restante, self._expira_cookies - ahora)
+        return restante
+
+    def valida(self):
+        """True si se puede ir directo al formulario sin pasar por el login"""
+        with self._lock:
+            restante = self._restante(time.time())
+        return restante is not None and restante > 0
+
+    def necesita_refresco(self):
+        """True si la sesión no existe o vence dentro del margen"""
+        with self._lock:
+            restante = self._restante(time.time())
+        return restante is None or restante <= self.margen
+
+    def marcar_ok(self, cookies=None, cuando=None):
+        """Registra una navegación autenticada exitosa (ahora, o 'cuando' si es más reciente)"""
+        cuando = cuando or time.time()
+        with self._lock:
+            if self._ultimo_ok is not None and cuando <= self._ultimo_ok:
+                return
+            self._ultimo_ok = cuando
+            self._expira_cookies = self._vencimiento_cookies(cookies)
+
+    def sembrar(self, registro):
+        """Toma la autenticación de un estado guardado por otro worker o una corrida anterior"""
+        if registro and registro.get("autenticado_en"):
+            self.marcar_ok(registro["storage_state"].get("cookies"), cuando=registro["autenticado_en"])
+
+    def invalidar(self):
+        """SACH redirigió a 'iniciar': la sesión ya no sirve"""
+        with self._lock:
+            self._ultimo_ok = None
+            self._expira_cookies = None
+            self._stats["vencidas"] += 1
+
+    def contar(self, evento):
+        with self._lock:
+            self._stats[evento] += 1
+
+    def estadisticas(self):
+        with self._lock:
+            restante = self._restante(time.time())
+            stats = dict(self._stats)
+        stats.update({
+            "valida": restante is not None and restante > 0,
+            "restante_s": round(restante, 1) if restante is not None else None,
+            "ttl_s": self.ttl,
+            "margen_s": self.margen,
+        })
+        return stats
+
+
+class RefrescoSesion:
+    """
+    Hilo que refresca la sesión antes de que venza, para que ninguna reserva pague un login.
+    'refrescar' devuelve algo falso si todavía no se pudo intentar (p. ej. navegadores fríos).
+    """
+
+    def __init__(self, gestor, refrescar, intervalo=None):
+        self.gestor = gestor
+        self.refrescar = refrescar
+        self.intervalo = intervalo or int(os.getenv('SACH_SESION_REFRESCO_INTERVALO', '60'))
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._bucle, name="refresco-sesion-sach", daemon=True)
+            self._hilo.start()
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            if self.gestor.necesita_refresco():
+                try:
+                    if self.refrescar():
+                        self.gestor.contar("refrescos")
+                except Exception as e:
+                    log.warning(f"⚠️ Error refrescando sesión SACH: {e}")
+            self._detener.wait(self.intervalo)
+
+    def detener(self):
+        self._detener.set()
+
+
+_gestor_global = None
+_gestor_global_lock = threading.Lock()
+
+
+def obtener_gestor_sesion():
+    """Gestor de sesión compartido por el proceso"""
+    global _gestor_global
+    with _gestor_global_lock:
+        if _gestor_global is None:
+            _gestor_global = GestorSesion()
+        return _gestor_global
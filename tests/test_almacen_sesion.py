@@ -0,0 +1,98 @@
+import json
+import threading
+
+import pytest
+
+from almacen_sesion import AlmacenSesionArchivo, AlmacenSesionSQLite
+
+ESTADO = {"cookies": [{"name": "sid", "value": "1"}], "origins": []}
+
+
+@pytest.fixture(params=["archivo", "sqlite"])
+def crear_almacen(request, tmp_path):
+    """Fábrica: cada llamada es otro almacén sobre el mismo destino (como otro worker)"""
+    if request.param == "archivo":
+        return lambda: AlmacenSesionArchivo(ruta=str(tmp_path / "sesion.json"))
+    return lambda: AlmacenSesionSQLite(ruta_db=str(tmp_path / "sesion.db"))
+
+
+def test_sin_sesion(crear_almacen):
+    almacen = crear_almacen()
+    assert almacen.cargar() is None
+    assert almacen.cargar_registro() is None
+
+
+def test_guarda_y_carga_versionado(crear_almacen):
+    almacen = crear_almacen()
+    assert almacen.guardar(ESTADO, autenticado_en=100.0)
+    assert almacen.guardar({"cookies": [], "origins": []}, autenticado_en=200.0)
+
+    registro = crear_almacen().cargar_registro()
+    assert registro["version"] == 2
+    assert registro["autenticado_en"] == 200.0
+    assert registro["storage_state"] == {"cookies": [], "origins": []}
+
+
+def test_no_pisa_una_autenticacion_mas_reciente(crear_almacen):
+    nuevo, viejo = crear_almacen(), crear_almacen()
+    viejo.cargar_registro()
+    assert nuevo.guardar(ESTADO, autenticado_en=200.0)
+
+    # El otro worker tiene en caché un estado anterior: igual debe ver la versión nueva
+    assert not viejo.guardar({"cookies": []}, autenticado_en=100.0)
+    assert not viejo.guardar({"cookies": []}, autenticado_en=None)
+    assert viejo.estadisticas()["rechazadas"] == 2
+
+    registro = crear_almacen().cargar_registro()
+    assert registro["version"] == 1
+    assert registro["storage_state"] == ESTADO
+
+
+def test_un_estado_sin_autenticacion_se_reemplaza(crear_almacen):
+    almacen = crear_almacen()
+    assert almacen.guardar({"cookies": []}, autenticado_en=None)
+    assert almacen.guardar(ESTADO, autenticado_en=50.0)
+    assert almacen.cargar() == ESTADO
+
+
+def test_reutiliza_el_estado_parseado(crear_almacen):
+    almacen = crear_almacen()
+    almacen.guardar(ESTADO, autenticado_en=1.0)
+    lector = crear_almacen()
+    lector.cargar()
+    lector.cargar()
+    stats = lector.estadisticas()
+    assert stats["lecturas"] == 1
+    assert stats["lecturas_cache"] == 1
+    assert stats["version"] == 1
+
+
+def test_escrituras_concurrentes(crear_almacen, tmp_path):
+    almacenes = [crear_almacen() for _ in range(4)]
+
+    def guardar(almacen, indice):
+        for vuelta in range(5):
+            almacen.guardar({"cookies": [], "worker": indice}, autenticado_en=float(vuelta))
+
+    hilos = [threading.Thread(target=guardar, args=(a, i)) for i, a in enumerate(almacenes)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    escritas = sum(a.estadisticas()["escrituras"] for a in almacenes)
+    registro = crear_almacen().cargar_registro()
+    assert registro["version"] == escritas
+    assert registro["autenticado_en"] == 4.0
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_archivo_con_formato_anterior(tmp_path):
+    ruta = tmp_path / "sesion.json"
+    ruta.write_text(json.dumps(ESTADO))
+    almacen = AlmacenSesionArchivo(ruta=str(ruta))
+    registro = almacen.cargar_registro()
+    assert registro["version"] == 0
+    assert registro["storage_state"] == ESTADO
+    assert almacen.guardar(ESTADO, autenticado_en=1.0)
+    assert almacen.cargar_registro()["version"] == 1
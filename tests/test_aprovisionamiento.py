@@ -0,0 +1,68 @@
+import logging
+import time
+
+from aprovisionamiento import SondaPreparacion
+
+
+class PoolFalso:
+    def __init__(self, fallas=0):
+        self.fallas = fallas
+        self.calentadas = 0
+        self.conectados = 0
+
+    def calentar(self):
+        if self.fallas:
+            self.fallas -= 1
+            raise RuntimeError("chromium no arranca")
+        self.calentadas += 1
+        self.conectados = 2
+
+    def vivos(self):
+        return self.conectados
+
+    def estadisticas(self):
+        return {"vivos": self.conectados}
+
+
+def esperar(condicion, timeout=5):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        if condicion():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_no_esta_lista_hasta_calentar():
+    sonda = SondaPreparacion(PoolFalso())
+    assert not sonda.listo
+    sonda.iniciar()
+    assert esperar(lambda: sonda.listo)
+    estado = sonda.estado()
+    assert estado["listo"] and estado["segundos_hasta_listo"] is not None
+    assert estado["pool"] == {"vivos": 2}
+
+
+def test_deja_de_estar_lista_si_se_caen_los_navegadores_y_recalienta():
+    pool = PoolFalso()
+    sonda = SondaPreparacion(pool)
+    sonda.iniciar()
+    assert esperar(lambda: sonda.listo)
+
+    pool.conectados = 0
+    assert not sonda.listo
+    assert sonda.estado()["recalentamientos"] == 1
+    assert esperar(lambda: sonda.listo)
+    assert pool.calentadas == 2
+
+
+def test_loguea_en_vez_de_imprimir(caplog, capsys, monkeypatch):
+    monkeypatch.setattr("aprovisionamiento.time.sleep", lambda s: None)
+    sonda = SondaPreparacion(PoolFalso(fallas=1))
+    with caplog.at_level(logging.INFO, logger="aprovisionamiento"):
+        sonda.iniciar()
+        assert esperar(lambda: sonda.listo)
+    mensajes = [r.getMessage() for r in caplog.records]
+    assert any("intento 1" in m and "chromium no arranca" in m for m in mensajes)
+    assert any("caliente" in m for m in mensajes)
+    assert capsys.readouterr().out == ""
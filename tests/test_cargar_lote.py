@@ -0,0 +1,93 @@
+import io
+import json
+import threading
+import time
+
+import cargar_reserva
+from guardado import ResultadoGuardado
+
+
+class PoolFalso:
+    def __init__(self, tamano=None):
+        self.cerrado = False
+
+    def cerrar(self):
+        self.cerrado = True
+
+
+class RobotFalso:
+    """Guarda todo sin navegador; anota qué reservas llegaron a 'enviarse' a SACH"""
+
+    enviados = []
+    lock = threading.Lock()
+    demora = 0.0
+
+    def __init__(self, pool=None, max_pestanas=None):
+        self.max_pestanas = max_pestanas or 4
+
+    def procesar_cliente(self, datos):
+        return self.procesar_clientes([datos])[0]
+
+    def procesar_clientes(self, lista):
+        time.sleep(self.demora)
+        with self.lock:
+            self.enviados.extend(d["nombre"] for d in lista)
+        return [ResultadoGuardado(True, id_cliente=str(len(d["nombre"]))) for d in lista]
+
+
+class EntradaInterrumpida:
+    """stdin que entrega unas líneas y después simula el Ctrl+C"""
+
+    def __init__(self, lineas):
+        self.lineas = lineas
+
+    def __iter__(self):
+        for linea in self.lineas:
+            yield linea
+        time.sleep(0.05)  # que el primer grupo ya esté cargando
+        raise KeyboardInterrupt
+
+
+def reserva(i):
+    return json.dumps({"nombre": f"Cliente {i}", "cabana": "Cabaña 1"}) + "\n"
+
+
+def preparar(monkeypatch, tmp_path, entrada, demora=0.0):
+    RobotFalso.enviados = []
+    RobotFalso.demora = demora
+    monkeypatch.setattr(cargar_reserva, "PoolNavegadores", PoolFalso)
+    monkeypatch.setattr(cargar_reserva, "RobotSACH", RobotFalso)
+    monkeypatch.setattr("sys.stdin", entrada)
+    salida = tmp_path / "resultados.jsonl"
+    return salida, tmp_path / "resultados.jsonl.checkpoint"
+
+
+def test_lote_completo_y_reanudacion(monkeypatch, tmp_path):
+    salida, checkpoint = preparar(monkeypatch, tmp_path, io.StringIO("".join(reserva(i) for i in range(5))))
+    assert cargar_reserva.cargar_lote(["-", "--paralelo", "1", "--pestanas", "2", "--salida", str(salida)]) == 0
+    assert sorted(RobotFalso.enviados) == [f"Cliente {i}" for i in range(5)]
+    assert len(checkpoint.read_text().split()) == 5
+
+    # Reanudar con las mismas reservas no vuelve a enviar ninguna
+    preparar(monkeypatch, tmp_path, io.StringIO("".join(reserva(i) for i in range(5))))
+    cargar_reserva.cargar_lote(["-", "--paralelo", "1", "--pestanas", "2", "--salida", str(salida)])
+    assert RobotFalso.enviados == []
+
+
+def test_ctrl_c_registra_los_grupos_en_curso(monkeypatch, tmp_path):
+    # Línea 0 sola (login); grupo [1, 2] cargando; grupo [3, 4] en espera cuando llega el Ctrl+C
+    entrada = EntradaInterrumpida([reserva(i) for i in range(5)])
+    salida, checkpoint = preparar(monkeypatch, tmp_path, entrada, demora=0.3)
+    cargar_reserva.cargar_lote(["-", "--paralelo", "1", "--pestanas", "2", "--salida", str(salida)])
+
+    enviados = sorted(RobotFalso.enviados)
+    assert enviados == ["Cliente 0", "Cliente 1", "Cliente 2"]
+    # Todo lo que llegó a SACH quedó en el checkpoint y en la salida
+    claves = set(checkpoint.read_text().split())
+    assert claves == {cargar_reserva.clave_registro(json.loads(reserva(i))) for i in range(3)}
+    assert len(salida.read_text().splitlines()) == 3
+
+    # Al reanudar solo se cargan las que no arrancaron
+    preparar(monkeypatch, tmp_path, io.StringIO("".join(reserva(i) for i in range(5))))
+    cargar_reserva.cargar_lote(["-", "--paralelo", "1", "--pestanas", "2", "--salida", str(salida)])
+    assert sorted(RobotFalso.enviados) == ["Cliente 3", "Cliente 4"]
@@ -0,0 +1,76 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cliente_graph import ClienteGraph
+
+
+class GraphFalso(BaseHTTPRequestHandler):
+    """Responde con los códigos de 'respuestas' en orden (después 200) y cuenta los pedidos"""
+
+    respuestas = []
+    pedidos = []
+
+    def _responder(self):
+        self.pedidos.append((self.command, self.path))
+        estado = self.respuestas.pop(0) if self.respuestas else 200
+        cuerpo = json.dumps({"url": "http://x/audio", "messages": [{"id": "wamid.1"}]}).encode()
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        self._responder()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._responder()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def graph():
+    GraphFalso.respuestas = []
+    GraphFalso.pedidos = []
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), GraphFalso)
+    hilo = threading.Thread(target=servidor.serve_forever, args=(0.05,), daemon=True)
+    hilo.start()
+    cliente = ClienteGraph("token", "123", base_url=f"http://127.0.0.1:{servidor.server_port}", backoff=0)
+    yield cliente
+    cliente.cerrar()
+    servidor.shutdown()
+
+
+@pytest.mark.parametrize("estado", [500, 502, 504])
+def test_post_no_se_reintenta_en_5xx(graph, estado):
+    GraphFalso.respuestas = [estado]
+    respuesta = graph.enviar_texto("5491100000000", "hola")
+    assert respuesta.status_code == estado
+    assert len(GraphFalso.pedidos) == 1
+
+
+def test_post_se_reintenta_en_429(graph):
+    GraphFalso.respuestas = [429]
+    assert graph.enviar_texto("5491100000000", "hola").status_code == 200
+    assert len(GraphFalso.pedidos) == 2
+
+
+def test_get_se_reintenta_en_5xx(graph):
+    GraphFalso.respuestas = [502, 503]
+    assert graph.obtener_url_media("media1") == "http://x/audio"
+    assert [metodo for metodo, _ in GraphFalso.pedidos] == ["GET"] * 3
+
+
+def test_estadisticas_por_endpoint(graph):
+    graph.obtener_url_media("media1")
+    GraphFalso.respuestas = [500]
+    graph.enviar_texto("5491100000000", "hola")
+    stats = graph.estadisticas()
+    assert stats["media"]["llamadas"] == 1 and stats["media"]["errores"] == 0
+    assert stats["mensajes"]["errores"] == 1
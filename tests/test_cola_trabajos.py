@@ -0,0 +1,170 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from cola_trabajos import ColaTrabajos, ErrorDefinitivo
+
+
+@pytest.fixture
+def cola(tmp_path):
+    colas = []
+
+    def crear(**kwargs):
+        kwargs.setdefault("workers", 1)
+        kwargs.setdefault("backoff", 0.05)
+        c = ColaTrabajos(ruta_db=str(tmp_path / "cola.db"), **kwargs)
+        colas.append(c)
+        return c
+
+    yield crear
+    for c in colas:
+        c.detener(timeout=5)
+
+
+def esperar(condicion, timeout=5):
+    limite = time.time() + timeout
+    while time.time() < limite:
+        if condicion():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_procesa_y_borra(cola):
+    c = cola()
+    hechos = []
+    c.registrar("audio", hechos.append)
+    c.iniciar()
+    c.encolar("audio", {"id": "wamid.1"})
+    assert esperar(lambda: c.estadisticas()["hechos"] == 1)
+    assert hechos == [{"id": "wamid.1"}]
+    assert c.profundidad() == 0
+
+
+def test_reintenta_con_backoff_exponencial(cola):
+    c = cola(max_intentos=3, backoff=0.2)
+    intentos = []
+
+    def falla_dos_veces(payload):
+        intentos.append(time.time())
+        if len(intentos) < 3:
+            raise RuntimeError("Groq no responde")
+
+    c.registrar("audio", falla_dos_veces)
+    c.iniciar()
+    c.encolar("audio", {"id": "wamid.1"})
+    assert esperar(lambda: c.estadisticas()["hechos"] == 1)
+    assert len(intentos) == 3
+    # 0.2 s antes del segundo intento y 0.4 s antes del tercero
+    assert intentos[1] - intentos[0] >= 0.19
+    assert intentos[2] - intentos[1] >= 0.39
+    assert c.estadisticas()["reintentos"] == 2
+
+
+def test_agota_los_intentos_y_avisa_una_vez(cola):
+    c = cola(max_intentos=2)
+    avisos = []
+    c.registrar("audio", lambda payload: 1 / 0, al_fallar=lambda payload, error: avisos.append(error))
+    c.iniciar()
+    c.encolar("audio", {"id": "wamid.1"})
+    assert esperar(lambda: c.estadisticas()["fallidos"] == 1)
+    assert len(avisos) == 1 and "ZeroDivisionError" in avisos[0]
+    assert c.estadisticas()["fallidos_en_disco"] == 1
+
+
+def test_error_definitivo_no_se_reintenta(cola):
+    c = cola(max_intentos=5)
+    llamadas = []
+    avisos = []
+
+    def guardado_sin_confirmar(payload):
+        llamadas.append(payload)
+        raise ErrorDefinitivo("Guardado sin confirmar")
+
+    c.registrar("audio", guardado_sin_confirmar, al_fallar=lambda payload, error: avisos.append(error))
+    c.iniciar()
+    c.encolar("audio", {"id": "wamid.1"})
+    assert esperar(lambda: c.estadisticas()["fallidos"] == 1)
+    assert len(llamadas) == 1
+    assert avisos == ["Guardado sin confirmar"]
+
+
+def test_reintento_en_backoff_no_se_toma_antes_de_tiempo(cola):
+    c = cola(max_intentos=3, backoff=60)
+    c.registrar("audio", lambda payload: 1 / 0)
+    c.iniciar()
+    c.encolar("audio", {"id": "wamid.1"})
+    assert esperar(lambda: c.estadisticas()["reintentos"] == 1)
+    stats = c.estadisticas()
+    assert stats["profundidad"] == 1 and stats["en_backoff"] == 1 and stats["procesando"] == 0
+
+
+def test_recupera_trabajos_de_un_proceso_muerto(cola, tmp_path):
+    c = cola()
+    id_trabajo = c.encolar("audio", {"id": "wamid.1"})
+    c._conn.execute("UPDATE trabajos SET estado = 'procesando', dueno = 'otro-host:1' WHERE id = ?", (id_trabajo,))
+    otra = cola()
+    assert otra.profundidad() == 1
+
+
+def test_recuperacion_respeta_el_maximo_de_intentos_y_el_backoff(cola):
+    c = cola(max_intentos=3, backoff=60)
+    agotado = c.encolar("audio", {"id": "wamid.1"})
+    a_medias = c.encolar("audio", {"id": "wamid.2"})
+    c._conn.execute("UPDATE trabajos SET estado = 'procesando', dueno = 'otro-host:1', intentos = 3 WHERE id = ?",
+                    (agotado,))
+    c._conn.execute("UPDATE trabajos SET estado = 'procesando', dueno = 'otro-host:1', intentos = 1 WHERE id = ?",
+                    (a_medias,))
+
+    otra = cola(max_intentos=3, backoff=60)
+    stats = otra.estadisticas()
+    assert stats["fallidos_en_disco"] == 1
+    assert stats["profundidad"] == 1 and stats["en_backoff"] == 1
+    estado, error = otra._conn.execute("SELECT estado, error FROM trabajos WHERE id = ?", (agotado,)).fetchone()
+    assert estado == "fallido" and "Interrumpido" in error
+
+
+def test_encolar_no_espera_a_un_worker_reclamando(cola, monkeypatch):
+    c = cola()
+    reclamando = threading.Event()
+    soltar = threading.Event()
+    reclamar = c._reclamar
+
+    def reclamar_lento(conn):
+        # Como si otro proceso tuviera el lock de escritura de SQLite
+        reclamando.set()
+        soltar.wait(5)
+        return reclamar(conn)
+
+    monkeypatch.setattr(c, "_reclamar", reclamar_lento)
+    hechos = []
+    c.registrar("audio", hechos.append)
+    c.iniciar()
+    assert reclamando.wait(5)
+    inicio = time.time()
+    c.encolar("audio", {"id": "wamid.1"})
+    assert time.time() - inicio < 1
+    soltar.set()
+    assert esperar(lambda: hechos == [{"id": "wamid.1"}])
+
+
+def test_migra_una_cola_sin_disponible_en(tmp_path):
+    ruta = str(tmp_path / "vieja.db")
+    conn = sqlite3.connect(ruta)
+    conn.execute("CREATE TABLE trabajos (id INTEGER PRIMARY KEY AUTOINCREMENT, tipo TEXT NOT NULL, "
+                 "payload TEXT NOT NULL, estado TEXT NOT NULL DEFAULT 'pendiente', "
+                 "intentos INTEGER NOT NULL DEFAULT 0, creado REAL NOT NULL, error TEXT)")
+    conn.execute("INSERT INTO trabajos (tipo, payload, creado) VALUES ('text', '{}', 0)")
+    conn.commit()
+    conn.close()
+
+    c = ColaTrabajos(ruta_db=ruta, workers=1)
+    hechos = threading.Event()
+    c.registrar("text", lambda payload: hechos.set())
+    c.iniciar()
+    try:
+        assert hechos.wait(5)
+    finally:
+        c.detener(timeout=5)
@@ -0,0 +1,51 @@
+import time
+
+from deduplicador import DeduplicadorMensajes
+
+
+def test_primera_entrega_pasa_y_la_segunda_no():
+    dedup = DeduplicadorMensajes(ttl=60, ruta_db="")
+    assert not dedup.es_duplicado("wamid.1")
+    assert dedup.es_duplicado("wamid.1")
+    assert dedup.estadisticas()["duplicados"] == 1
+
+
+def test_sin_id_nunca_es_duplicado():
+    dedup = DeduplicadorMensajes(ttl=60, ruta_db="")
+    assert not dedup.es_duplicado(None)
+    assert not dedup.es_duplicado(None)
+
+
+def test_vence_con_el_ttl(monkeypatch):
+    dedup = DeduplicadorMensajes(ttl=10, ruta_db="")
+    ahora = time.time()
+    monkeypatch.setattr("deduplicador.time.time", lambda: ahora)
+    assert not dedup.es_duplicado("wamid.1")
+    monkeypatch.setattr("deduplicador.time.time", lambda: ahora + 11)
+    assert not dedup.es_duplicado("wamid.1")
+
+
+def test_max_entradas():
+    dedup = DeduplicadorMensajes(ttl=60, max_entradas=2, ruta_db="")
+    for i in range(3):
+        dedup.es_duplicado(f"wamid.{i}")
+    # El más viejo se descarta primero
+    assert not dedup.es_duplicado("wamid.0")
+    assert dedup.es_duplicado("wamid.2")
+
+
+def test_olvidar_acepta_la_reentrega(tmp_path):
+    dedup = DeduplicadorMensajes(ttl=60, ruta_db=str(tmp_path / "dedup.db"))
+    assert not dedup.es_duplicado("wamid.1")
+    dedup.olvidar("wamid.1")
+    assert not dedup.es_duplicado("wamid.1")
+
+
+def test_compartido_entre_procesos_por_sqlite(tmp_path):
+    ruta = str(tmp_path / "dedup.db")
+    uno = DeduplicadorMensajes(ttl=60, ruta_db=ruta)
+    otro = DeduplicadorMensajes(ttl=60, ruta_db=ruta)
+    assert not uno.es_duplicado("wamid.1")
+    assert otro.es_duplicado("wamid.1")
+    # Un reinicio vuelve a cargar los vistos desde el disco
+    assert DeduplicadorMensajes(ttl=60, ruta_db=ruta).es_duplicado("wamid.1")
@@ -0,0 +1,84 @@
+import pytest
+
+from extractor_reglas import extraer_por_reglas, datos_completos, normalizar_texto
+
+
+def test_frase_completa():
+    datos = extraer_por_reglas(
+        "Hola, reserva para Juan Pérez, cabaña 3 para el 15 de febrero de 2024, 3 noches, 18.000 pesos"
+    )
+    assert datos == {
+        "nombre": "Juan Pérez",
+        "cabana": "Cabaña 3",
+        "fecha_entrada": "2024-02-15",
+        "noches": 3,
+        "precio": 18000,
+    }
+    assert datos_completos(datos)
+
+
+@pytest.mark.parametrize("frase", [
+    "4 noches a 20.000 pesos por noche",
+    "4 noches a $20.000 la noche",
+    "4 noches, $20 mil cada noche",
+    "4 noches, la noche sale $20.000",
+    "4 noches, 20.000 pesos por noche, 80.000 pesos en total",
+])
+def test_precio_por_noche_se_multiplica(frase):
+    datos = extraer_por_reglas(f"Reserva para Ana Gómez, cabaña 2, 1 de marzo de 2024, {frase}")
+    assert datos["noches"] == 4
+    assert datos["precio"] == 80000
+
+
+def test_nombre_sin_puntuacion_se_corta_en_la_cabana():
+    datos = extraer_por_reglas("Reserva para Juan Pérez Cabaña 3 el 15 de febrero de 2024 3 noches 18.000 pesos")
+    assert datos["nombre"] == "Juan Pérez"
+    assert datos["cabana"] == "Cabaña 3"
+    assert datos["precio"] == 18000
+
+
+@pytest.mark.parametrize("texto, nombre", [
+    ("Reserva para María de la Cruz Noches 3", "María de la Cruz"),
+    ("A nombre de Ana Gómez Febrero 15", "Ana Gómez"),
+    ("Me llamo Pedro Para la cabaña 2", "Pedro"),
+])
+def test_nombre_no_incluye_palabras_de_la_reserva(texto, nombre):
+    assert extraer_por_reglas(texto)["nombre"] == nombre
+
+
+@pytest.mark.parametrize("frase", ["18.000 pesos cada una", "$18.000 c/u", "18.000 pesos por día"])
+def test_precio_cada_una_es_por_noche(frase):
+    datos = extraer_por_reglas(f"Reserva para Juan Pérez Cabaña 3 el 15 de febrero de 2024 3 noches {frase}")
+    assert datos["nombre"] == "Juan Pérez"
+    assert datos["precio"] == 54000
+
+
+def test_precio_por_noche_sin_noches_queda_para_el_llm():
+    datos = extraer_por_reglas("Reserva para Ana Gómez, cabaña 2, 1 de marzo de 2024, 20.000 pesos por noche")
+    assert datos["precio"] is None
+    assert not datos_completos(datos)
+
+
+def test_precio_total_no_se_multiplica():
+    assert extraer_por_reglas("4 noches a 20.000 pesos")["precio"] == 20000
+
+
+def test_precios_distintos_son_ambiguos():
+    assert extraer_por_reglas("3 noches, 18.000 pesos o 20.000 pesos")["precio"] is None
+
+
+def test_fecha_sin_anio_queda_para_el_llm():
+    assert extraer_por_reglas("cabaña 3 para el 15 de febrero, 3 noches")["fecha_entrada"] is None
+
+
+def test_numeros_en_palabras():
+    datos = extraer_por_reglas("cabaña cinco, tres noches")
+    assert datos["cabana"] == "Cabaña 5" and datos["noches"] == 3
+
+
+def test_texto_vacio():
+    assert not datos_completos(extraer_por_reglas(""))
+
+
+def test_normalizar_texto():
+    assert normalizar_texto("  Cabaña   TRES, $18.000! ") == normalizar_texto("cabana tres $18.000")
@@ -0,0 +1,141 @@
+from types import SimpleNamespace
+
+import pytest
+
+import guardado
+from guardado import interpretar, confirmar, extraer_id_cliente
+
+
+def respuesta(estado, location=None, metodo="POST", url="https://sach.com.ar/cliente/nuevo"):
+    headers = {"location": location} if location else {}
+    return SimpleNamespace(status=estado, headers=headers, url=url, request=SimpleNamespace(method=metodo))
+
+
+FORMULARIO = "https://sach.com.ar/cliente/nuevo"
+
+
+def test_extraer_id_cliente():
+    assert extraer_id_cliente("https://sach.com.ar/cliente/123") == "123"
+    assert extraer_id_cliente("https://sach.com.ar/cliente/nuevo") is None
+    assert extraer_id_cliente(None) is None
+
+
+def test_es_post_formulario():
+    assert guardado.es_post_formulario(respuesta(302))
+    assert not guardado.es_post_formulario(respuesta(200, metodo="GET"))
+    assert not guardado.es_post_formulario(respuesta(200, url="https://sach.com.ar/static/app.js"))
+
+
+def test_redireccion_al_cliente_nuevo_es_alta():
+    resultado = interpretar(respuesta(302, "/cliente/42"), "https://sach.com.ar/cliente/42")
+    assert resultado and resultado.id_cliente == "42" and resultado.estado_http == 302
+
+
+def test_cadena_de_redirecciones_toma_el_id_de_la_url_final():
+    resultado = interpretar(respuesta(303, "/cliente/guardado"), "https://sach.com.ar/cliente/77")
+    assert resultado and resultado.id_cliente == "77"
+
+
+def test_redireccion_al_login_es_reintentable():
+    resultado = interpretar(respuesta(302, "/iniciar"), "https://sach.com.ar/iniciar")
+    assert not resultado and resultado.reintentable
+
+
+def test_redireccion_al_formulario_es_rechazo():
+    resultado = interpretar(respuesta(302, "/cliente/nuevo"), FORMULARIO, "DNI inválido")
+    assert not resultado and resultado.reintentable and resultado.error == "DNI inválido"
+
+
+def test_200_con_alerta_es_rechazo_reintentable():
+    resultado = interpretar(respuesta(200), FORMULARIO, "Falta el nombre")
+    assert not resultado and resultado.reintentable
+
+
+def test_200_sin_alerta_no_se_reintenta():
+    resultado = interpretar(respuesta(200), FORMULARIO)
+    assert not resultado and not resultado.reintentable
+
+
+def test_200_con_la_pagina_en_el_cliente_es_alta():
+    resultado = interpretar(respuesta(200), "https://sach.com.ar/cliente/9")
+    assert resultado and resultado.id_cliente == "9"
+
+
+@pytest.mark.parametrize("estado", [400, 403, 422])
+def test_4xx_es_reintentable(estado):
+    resultado = interpretar(respuesta(estado), FORMULARIO)
+    assert not resultado and resultado.reintentable and resultado.estado_http == estado
+
+
+@pytest.mark.parametrize("estado", [500, 502, 504])
+def test_5xx_no_se_reintenta(estado):
+    resultado = interpretar(respuesta(estado), FORMULARIO)
+    assert not resultado and not resultado.reintentable
+
+
+def test_sin_respuesta_y_pagina_en_el_cliente_es_alta():
+    resultado = interpretar(None, "https://sach.com.ar/cliente/15")
+    assert resultado and resultado.id_cliente == "15" and resultado.estado_http is None
+
+
+def test_sin_respuesta_ni_evidencia_no_se_reintenta():
+    resultado = interpretar(None, FORMULARIO)
+    assert not resultado and not resultado.reintentable
+
+
+def test_sin_respuesta_con_alerta_es_rechazo():
+    resultado = interpretar(None, FORMULARIO, "DNI duplicado")
+    assert not resultado and resultado.reintentable
+
+
+class EsperasFalsas:
+    """Esperas sin navegador: la URL 'navega' a destino cuando se espera la redirección"""
+
+    def __init__(self, destino=None, alerta=False):
+        self.destino = destino
+        self.alerta = alerta
+
+    def medir(self, paso):
+        from contextlib import nullcontext
+        return nullcontext()
+
+    def url_sin(self, pagina, fragmento, paso):
+        if self.destino:
+            pagina.url = self.destino
+        return fragmento not in pagina.url
+
+    def elemento_visible(self, pagina, selector, paso):
+        return self.alerta
+
+
+class PaginaFalsa:
+    def __init__(self, url=FORMULARIO, texto_alerta="Error"):
+        self.url = url
+        self.texto_alerta = texto_alerta
+
+    def locator(self, selector):
+        return SimpleNamespace(first=SimpleNamespace(text_content=lambda: self.texto_alerta))
+
+
+class EsperaVencida:
+    @property
+    def value(self):
+        raise TimeoutError("Timeout 15000ms exceeded")
+
+
+def test_confirmar_sin_post_visto_usa_la_navegacion():
+    pagina = PaginaFalsa()
+    resultado = confirmar(EsperasFalsas(destino="https://sach.com.ar/cliente/31"), pagina, EsperaVencida())
+    assert resultado and resultado.id_cliente == "31"
+
+
+def test_confirmar_sin_post_visto_y_con_alerta_es_rechazo():
+    pagina = PaginaFalsa(texto_alerta="El DNI ya existe")
+    resultado = confirmar(EsperasFalsas(alerta=True), pagina, EsperaVencida())
+    assert not resultado and resultado.reintentable and resultado.error == "El DNI ya existe"
+
+
+def test_confirmar_redireccion():
+    espera = SimpleNamespace(value=respuesta(302, "/cliente/8"))
+    resultado = confirmar(EsperasFalsas(destino="https://sach.com.ar/cliente/8"), PaginaFalsa(), espera)
+    assert resultado and resultado.id_cliente == "8"
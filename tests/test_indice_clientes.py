@@ -0,0 +1,130 @@
+import pytest
+
+import cargar_reserva
+from guardado import ResultadoGuardado
+from indice_clientes import (IndiceClientes, campos_cliente, normalizar_nombre, normalizar_telefono,
+                             similitud)
+
+
+@pytest.fixture
+def indice():
+    return IndiceClientes(ruta_db="", umbral=0.88)
+
+
+def test_normalizacion():
+    assert normalizar_nombre("Pérez,  JUAN") == "perez juan"
+    assert normalizar_telefono("+54 9 11 2233-4455") == normalizar_telefono("11 2233 4455") == "1122334455"
+    assert campos_cliente({"Nombres": "Juan", "Apellido": "Pérez", "DNI": "22.455.958", "movil": "1122334455"}) == \
+        ("22455958", "juan perez", "1122334455")
+
+
+def test_similitud_tolera_orden_y_un_error():
+    assert similitud("juan perez", "perez juan") == 1.0
+    assert similitud("juan peres", "juan perez") >= 0.88
+    assert similitud("juan perez", "ana gomez") < 0.5
+
+
+def test_busca_por_dni(indice):
+    indice.registrar({"dni": "22455958", "nombre": "Juan Pérez"}, 10)
+    registro = indice.buscar({"dni": "22.455.958"})
+    assert registro["id_cliente"] == "10" and registro["coincidencia"] == "dni"
+
+
+def test_dni_distinto_es_otro_cliente(indice):
+    indice.registrar({"dni": "22455958", "nombre": "Juan Pérez"}, 10)
+    assert indice.buscar({"dni": "30111222", "nombre": "Juan Pérez"}) is None
+
+
+def test_telefono_pide_un_nombre_parecido(indice):
+    indice.registrar({"nombre": "Juan Pérez", "telefono": "1122334455"}, 10)
+    assert indice.buscar({"nombre": "Juan Peres", "telefono": "+54 9 11 2233 4455"})["coincidencia"] == "telefono"
+    # La hija con el teléfono de la familia es otra persona
+    assert indice.buscar({"nombre": "Lucía Gómez", "telefono": "1122334455"}) is None
+
+
+def test_nombre_aproximado(indice):
+    indice.registrar({"nombre": "María Fernández"}, 7)
+    registro = indice.buscar({"nombre": "Maria Fernandes"})
+    assert registro["id_cliente"] == "7" and registro["coincidencia"] == "nombre_aproximado"
+    assert indice.buscar({"nombre": "María"}) is None
+
+
+def test_homonimos_sin_dni_no_se_pisan(indice):
+    indice.registrar({"nombre": "Juan Pérez"}, 1)
+    indice.registrar({"nombre": "Juan Pérez"}, 2)
+    assert len(indice) == 2
+    # Con dos clientes del mismo nombre no se puede decidir
+    assert indice.buscar({"nombre": "Juan Pérez"}) is None
+
+
+def test_persistencia_y_sincronizacion(tmp_path):
+    ruta = str(tmp_path / "clientes.db")
+    uno = IndiceClientes(ruta_db=ruta)
+    otro = IndiceClientes(ruta_db=ruta)
+    uno.registrar({"dni": "22455958", "nombre": "Juan Pérez"}, 10)
+    assert otro.buscar({"dni": "22455958"})["id_cliente"] == "10"
+    assert IndiceClientes(ruta_db=ruta).buscar({"dni": "22455958"})["id_cliente"] == "10"
+
+
+def test_importar_csv(indice, tmp_path):
+    ruta = tmp_path / "clientes.csv"
+    ruta.write_text("id,dni,nombres,apellido,telefono\n1,22455958,Juan,Pérez,1122334455\n2,,Ana,Gómez,\n",
+                    encoding="utf-8")
+    assert indice.importar(str(ruta)) == 2
+    assert indice.buscar({"nombre": "Ana Gomez"})["id_cliente"] == "2"
+
+
+def robot_con(indice, enviados, omitir_conocidos=False):
+    """RobotSACH sin navegador ni credenciales: solo la integración con el índice"""
+    robot = cargar_reserva.RobotSACH.__new__(cargar_reserva.RobotSACH)
+    robot.clientes = indice
+    robot.omitir_conocidos = omitir_conocidos
+    robot._campos_formulario = lambda datos: {campo: ([], valor) for campo, valor in enviados(datos).items()}
+    return robot
+
+
+def test_robot_no_deduplica_huespedes_distintos_con_el_formulario_de_prueba(indice, monkeypatch):
+    # Robot con la configuración por defecto y el formulario real, que todavía manda el cliente de prueba
+    monkeypatch.setenv("SACH_USER", "usuario")
+    monkeypatch.setenv("SACH_PASS", "clave")
+    monkeypatch.setenv("SACH_CLIENTES", "0")
+    monkeypatch.delenv("SACH_CLIENTES_OMITIR", raising=False)
+    robot = cargar_reserva.RobotSACH()
+    robot.clientes = indice
+
+    assert robot._cliente_conocido({"nombre": "Juan Pérez"}) is None
+    robot._recordar_cliente({"nombre": "Juan Pérez"}, ResultadoGuardado(True, id_cliente="54"))
+    # Otro huésped: el DNI de prueba coincide, pero el alta no se saltea
+    assert robot._cliente_conocido({"nombre": "Ana Gómez"}) is None
+    robot._recordar_cliente({"nombre": "Ana Gómez"}, ResultadoGuardado(True, id_cliente="55"))
+    assert robot._cliente_conocido({"nombre": "Carlos Ruiz"}) is None
+
+
+def test_robot_indexa_lo_que_envio_el_formulario(indice):
+    robot = robot_con(indice, lambda datos: {"dni": datos["dni"], "nombres": datos["nombre"]})
+    robot._recordar_cliente({"dni": "30111222", "nombre": "Ana Gómez"}, ResultadoGuardado(True, id_cliente="55"))
+    assert indice.buscar({"dni": "30111222"})["id_cliente"] == "55"
+
+
+def test_robot_no_saltea_por_nombre_y_marca_para_revisar(indice):
+    robot = robot_con(indice, lambda datos: {"nombres": datos["nombre"]}, omitir_conocidos=True)
+    indice.registrar({"nombre": "Juan Pérez"}, 1)
+    # Solo el nombre coincide: se crea igual
+    assert robot._cliente_conocido({"nombre": "Juan Pérez"}) is None
+    resultado = ResultadoGuardado(True, id_cliente="2")
+    robot._recordar_cliente({"nombre": "Juan Pérez"}, resultado)
+    assert resultado.posible_duplicado == "1"
+    assert len(indice) == 2
+
+
+def test_robot_saltea_por_dni_o_telefono_solo_si_se_pide(indice):
+    indice.registrar({"dni": "30111222", "nombre": "Ana Gómez"}, 5)
+    indice.registrar({"nombre": "Juan Pérez", "telefono": "1122334455"}, 1)
+    enviados = lambda datos: {"dni": datos.get("dni", ""), "nombres": datos["nombre"], "movil": datos.get("telefono", "")}
+    assert robot_con(indice, enviados)._cliente_conocido({"dni": "30111222", "nombre": "Ana Gómez"}) is None
+
+    robot = robot_con(indice, enviados, omitir_conocidos=True)
+    conocido = robot._cliente_conocido({"dni": "30111222", "nombre": "Ana Gómez"})
+    assert conocido and conocido.existente and conocido.id_cliente == "5"
+    conocido = robot._cliente_conocido({"nombre": "Juan Peres", "telefono": "1122334455"})
+    assert conocido and conocido.id_cliente == "1"
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from limitador import LimitadorGroq
+
+
+def test_turno_sync_respeta_la_concurrencia():
+    limitador = LimitadorGroq(max_concurrentes=2, rpm={"transcripcion": 6000})
+    maximo = 0
+    lock = threading.Lock()
+
+    def llamada():
+        nonlocal maximo
+        with limitador.turno("transcripcion"):
+            with lock:
+                maximo = max(maximo, limitador.estadisticas()["en_vuelo"])
+            time.sleep(0.05)
+
+    hilos = [threading.Thread(target=llamada) for _ in range(6)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert maximo == 2
+    assert limitador.estadisticas()["llamadas"]["transcripcion"] == 6
+    assert limitador.estadisticas()["en_vuelo"] == 0
+
+
+def test_turno_sync_respeta_el_ritmo():
+    # 120 por minuto = 2 por segundo, con ráfaga de 30: la llamada 31 espera medio segundo
+    limitador = LimitadorGroq(max_concurrentes=8, rpm={"extraccion": 120})
+    inicio = time.monotonic()
+    for _ in range(31):
+        with limitador.turno("extraccion"):
+            pass
+    assert time.monotonic() - inicio >= 0.45
+
+
+def test_sync_y_async_comparten_el_semaforo():
+    limitador = LimitadorGroq(max_concurrentes=1, rpm={"transcripcion": 6000})
+    liberar = threading.Event()
+    adentro = threading.Event()
+
+    def hilo():
+        with limitador.turno("transcripcion"):
+            adentro.set()
+            liberar.wait(2)
+
+    t = threading.Thread(target=hilo)
+    t.start()
+    adentro.wait(2)
+
+    async def corrutina():
+        async with limitador.turno_async("transcripcion"):
+            return time.monotonic()
+
+    async def escenario():
+        tarea = asyncio.create_task(corrutina())
+        await asyncio.sleep(0.1)
+        assert not tarea.done()  # el hilo tiene el único lugar
+        soltado = time.monotonic()
+        liberar.set()
+        return soltado, await tarea
+
+    soltado, entro = asyncio.run(escenario())
+    t.join()
+    assert entro >= soltado
+
+
+class ClienteGroqFalso:
+    def __init__(self, limitador):
+        self.limitador = limitador
+        self.en_vuelo = []
+        crear = lambda **kwargs: self._crear(kwargs)
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=crear))
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=crear))
+
+    def _crear(self, kwargs):
+        self.en_vuelo.append(self.limitador.estadisticas()["en_vuelo"])
+        if "messages" in kwargs:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='{"nombre": "Ana"}'))])
+        return "hola"
+
+
+@pytest.fixture
+def procesador(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    from cache_transcripciones import CacheTranscripciones
+    from procesar_audio import ProcesadorAudio
+    limitador = LimitadorGroq(max_concurrentes=2, rpm={"transcripcion": 6000, "extraccion": 6000})
+    procesador = ProcesadorAudio(CacheTranscripciones(directorio=""), limitador=limitador)
+    procesador.client = ClienteGroqFalso(limitador)
+    return procesador
+
+
+def test_procesador_sync_pasa_por_el_limitador(procesador):
+    assert procesador.transcribir_audio(b"RIFF audio", "nota.ogg") == "hola"
+    assert procesador._extraer_con_llm("texto libre") == {"nombre": "Ana"}
+    assert procesador.limitador.estadisticas()["llamadas"] == {"transcripcion": 1, "extraccion": 1}
+    assert procesador.client.en_vuelo == [1, 1]
+
+
+def test_procesador_async_prepara_el_audio_fuera_del_loop(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    from cache_transcripciones import CacheTranscripciones
+    from procesar_audio import ProcesadorAudioAsync
+
+    limitador = LimitadorGroq(max_concurrentes=2, rpm={"transcripcion": 6000})
+    procesador = ProcesadorAudioAsync(CacheTranscripciones(directorio=""), limitador=limitador)
+    hilos = []
+    preparar = procesador._preparar_audio
+
+    def preparar_espiado(*args):
+        hilos.append(threading.current_thread())
+        return preparar(*args)
+
+    async def crear(**kwargs):
+        return "hola"
+
+    procesador._preparar_audio = preparar_espiado
+    procesador.client_async = SimpleNamespace(audio=SimpleNamespace(transcriptions=SimpleNamespace(create=crear)))
+    assert asyncio.run(procesador.transcribir_audio(b"RIFF audio", "nota.ogg")) == "hola"
+    assert hilos and hilos[0] is not threading.main_thread()
+    assert limitador.estadisticas()["llamadas"]["transcripcion"] == 1
@@ -0,0 +1,79 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import pool_navegadores
+from pool_navegadores import PoolNavegadores
+
+
+class NavegadorFalso:
+    def __init__(self, hilos):
+        self.hilos = hilos
+        self.conectado = True
+        self.manejadores = []
+
+    def is_connected(self):
+        self.hilos.add(threading.current_thread().name)
+        return self.conectado
+
+    def on(self, evento, manejador):
+        assert evento == "disconnected"
+        self.manejadores.append(manejador)
+
+    def caer(self):
+        self.conectado = False
+        for manejador in self.manejadores:
+            manejador(self)
+
+    def close(self):
+        self.caer()
+
+    def new_context(self, **opciones):
+        pagina = SimpleNamespace(is_closed=lambda: False, set_viewport_size=lambda tamano: None)
+        return SimpleNamespace(new_page=lambda: pagina, close=lambda: None, storage_state=lambda: {})
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    hilos = set()
+    lanzados = []
+
+    def launch(**opciones):
+        lanzados.append(NavegadorFalso(hilos))
+        return lanzados[-1]
+
+    instancia = SimpleNamespace(chromium=SimpleNamespace(launch=launch), stop=lambda: None)
+    monkeypatch.setattr(pool_navegadores, "sync_playwright", lambda: SimpleNamespace(start=lambda: instancia))
+    monkeypatch.setattr(pool_navegadores, "obtener_politica_recursos", lambda: SimpleNamespace(aplicar=lambda c: None))
+    almacen = SimpleNamespace(cargar_registro=lambda: None, guardar=lambda estado, autenticado_en: True)
+    p = PoolNavegadores(tamano=2, max_usos=0, almacen=almacen)
+    p.hilos, p.lanzados = hilos, lanzados
+    yield p
+    p.cerrar()
+
+
+def test_vivos_sigue_el_evento_disconnected(pool):
+    assert pool.vivos() == 0
+    pool.calentar()
+    assert pool.vivos() == 2
+
+    pool._slots[0].ejecutar(lambda slot: slot.browser.caer())
+    assert pool.vivos() == 1
+    assert pool.estadisticas()["vivos"] == 1
+
+    # El próximo uso del slot lo relanza
+    pool._slots[0].ejecutar(lambda slot: None)
+    assert pool.vivos() == 2
+    assert len(pool.lanzados) == 3
+
+
+def test_las_sondas_no_tocan_playwright_desde_otro_hilo(pool):
+    pool.calentar()
+    pool.hilos.clear()
+    for _ in range(3):
+        pool.vivos()
+        pool.estadisticas()
+    assert pool.hilos == set()
+    pool.ejecutar(lambda slot: None)
+    assert pool.hilos and all(nombre.startswith("sach-navegador-") for nombre in pool.hilos)
@@ -0,0 +1,20 @@
+import logging
+
+from procesar_audio import ProcesadorAudio
+
+
+def test_parsea_json_con_fences():
+    assert ProcesadorAudio._parsear_json_llm('```json\n{"noches": 3}\n```') == {"noches": 3}
+
+
+def test_json_invalido_se_loguea_sin_datos_del_huesped(caplog, capsys):
+    contenido = '{"nombre": "Ana Gómez", "dni": '
+    with caplog.at_level(logging.INFO, logger="procesar_audio"):
+        assert ProcesadorAudio._parsear_json_llm(contenido) is None
+    assert capsys.readouterr().out == ""
+    assert caplog.records and all("Ana Gómez" not in r.getMessage() for r in caplog.records)
+
+    caplog.clear()
+    with caplog.at_level(logging.DEBUG, logger="procesar_audio"):
+        ProcesadorAudio._parsear_json_llm(contenido)
+    assert any("Ana Gómez" in r.getMessage() and r.levelno == logging.DEBUG for r in caplog.records)
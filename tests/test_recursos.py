@@ -0,0 +1,139 @@
+from types import SimpleNamespace
+
+import pytest
+
+import recursos
+from recursos import PoliticaRecursos
+
+URL_JS = "https://sach.com.ar/static/app.js"
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(recursos.time, "monotonic", reloj)
+    return reloj
+
+
+class Servidor:
+    """Respuestas de route.fetch(): versión actual del JS y sus headers"""
+
+    def __init__(self, cuerpo=b"v1", headers=None):
+        self.cuerpo = cuerpo
+        self.headers = headers or {}
+        self.pedidos = []
+
+    def fetch(self, headers=None):
+        self.pedidos.append(headers)
+        etag = self.headers.get("etag")
+        if headers and etag and headers.get("if-none-match") == etag:
+            return SimpleNamespace(status=304, ok=False, headers=dict(self.headers), body=lambda: b"")
+        return SimpleNamespace(status=200, ok=True, headers=dict(self.headers), body=lambda: self.cuerpo)
+
+
+class RouteFalsa:
+    def __init__(self, servidor, url=URL_JS, tipo="script"):
+        self.servidor = servidor
+        self.request = SimpleNamespace(url=url, resource_type=tipo, method="GET", headers={"accept": "*/*"})
+        self.servido = None
+
+    def fetch(self, headers=None):
+        return self.servidor.fetch(headers)
+
+    def fulfill(self, response=None, body=None, status=None, headers=None):
+        self.servido = body
+
+    def continue_(self):
+        self.servido = "red"
+
+    def abort(self):
+        self.servido = "abortado"
+
+
+def politica(**kwargs):
+    return PoliticaRecursos(tipos_bloqueados=["image"], dominios_permitidos=["sach.com.ar"],
+                            cachear_estaticos=True, max_mb_cache=1, **kwargs)
+
+
+def pedir(p, servidor, url=URL_JS, tipo="script"):
+    route = RouteFalsa(servidor, url, tipo)
+    p._manejar(route)
+    return route.servido
+
+
+def test_bloqueos():
+    p = politica()
+    assert pedir(p, Servidor(), "https://sach.com.ar/logo.png", "image") == "abortado"
+    assert pedir(p, Servidor(), "https://www.google-analytics.com/a.js") == "abortado"
+    assert pedir(p, Servidor(), "https://sach.com.ar/panel", "document") == "red"
+
+
+def test_sin_max_age_vence_con_el_ttl(reloj):
+    p = politica(ttl_cache=60)
+    servidor = Servidor(b"v1")
+    assert pedir(p, servidor) == b"v1"
+    assert pedir(p, servidor) == b"v1"
+    assert len(servidor.pedidos) == 1
+
+    # Deploy de SACH: después del TTL se baja la versión nueva
+    servidor.cuerpo = b"v2"
+    reloj.ahora += 61
+    assert pedir(p, servidor) == b"v2"
+    assert p.estadisticas()["cache_entradas"] == 1
+
+
+def test_respeta_max_age(reloj):
+    p = politica(ttl_cache=3600)
+    servidor = Servidor(b"v1", {"cache-control": "public, max-age=10"})
+    pedir(p, servidor)
+    reloj.ahora += 11
+    servidor.cuerpo = b"v2"
+    assert pedir(p, servidor) == b"v2"
+
+
+@pytest.mark.parametrize("control", ["no-store", "no-cache", "max-age=0"])
+def test_no_cachea_lo_que_el_servidor_prohibe(control):
+    p = politica()
+    servidor = Servidor(b"v1", {"cache-control": control})
+    pedir(p, servidor)
+    pedir(p, servidor)
+    assert len(servidor.pedidos) == 2
+    assert p.estadisticas()["cache_entradas"] == 0
+
+
+def test_revalida_con_etag(reloj):
+    p = politica(ttl_cache=60)
+    servidor = Servidor(b"v1", {"etag": '"abc"'})
+    pedir(p, servidor)
+    reloj.ahora += 61
+    # Sin cambios: 304 y se sirve lo cacheado
+    assert pedir(p, servidor) == b"v1"
+    assert servidor.pedidos[-1]["if-none-match"] == '"abc"'
+    assert servidor.pedidos[-1]["accept"] == "*/*"
+    assert p.estadisticas()["cache_revalidados"] == 1
+    # Vuelve a valer otro TTL
+    assert pedir(p, servidor) == b"v1"
+    assert len(servidor.pedidos) == 2
+
+    # Cambió: 200 con el cuerpo nuevo, que reemplaza al viejo
+    reloj.ahora += 61
+    servidor.cuerpo, servidor.headers = b"v2", {"etag": '"def"'}
+    assert pedir(p, servidor) == b"v2"
+    assert pedir(p, servidor) == b"v2"
+    assert p.estadisticas()["cache_entradas"] == 1
+
+
+def test_expira_entradas_viejas_al_guardar(reloj):
+    p = politica(ttl_cache=60)
+    pedir(p, Servidor(b"a"), "https://sach.com.ar/a.js")
+    reloj.ahora += 61
+    pedir(p, Servidor(b"b"), "https://sach.com.ar/b.js")
+    assert p.estadisticas()["cache_entradas"] == 1
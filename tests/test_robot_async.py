@@ -0,0 +1,76 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import cargar_reserva
+
+
+class Registro(list):
+    def cerrador(self, nombre, falla=None):
+        async def cerrar():
+            self.append(nombre)
+            if falla:
+                raise RuntimeError(falla)
+        return cerrar
+
+
+def playwright_falso(cerrados, falla_en, falla_al_cerrar=None):
+    async def new_page():
+        raise RuntimeError("new_page falló")
+
+    async def new_context(**opciones):
+        if falla_en == "new_context":
+            raise RuntimeError("new_context falló")
+        return SimpleNamespace(new_page=new_page, close=cerrados.cerrador("contexto"))
+
+    async def launch(**opciones):
+        if falla_en == "launch":
+            raise RuntimeError("launch falló")
+        return SimpleNamespace(new_context=new_context,
+                               close=cerrados.cerrador("navegador", falla_al_cerrar))
+
+    instancia = SimpleNamespace(chromium=SimpleNamespace(launch=launch), stop=cerrados.cerrador("playwright"))
+
+    async def start():
+        return instancia
+
+    return lambda: SimpleNamespace(start=start)
+
+
+@pytest.fixture
+def robot(monkeypatch):
+    async def aplicar_async(contexto):
+        pass
+
+    monkeypatch.setenv("SACH_USER", "usuario")
+    monkeypatch.setenv("SACH_PASS", "clave")
+    monkeypatch.setenv("SACH_CLIENTES", "0")
+    monkeypatch.setattr(cargar_reserva, "obtener_politica_recursos", lambda: SimpleNamespace(aplicar_async=aplicar_async))
+    r = cargar_reserva.RobotSACHAsync(max_pestanas=1)
+    r.almacen_sesion = SimpleNamespace(cargar_registro=lambda: None)
+    return r
+
+
+@pytest.mark.parametrize("falla_en, esperados", [
+    ("launch", ["playwright"]),
+    ("new_context", ["navegador", "playwright"]),
+    ("new_page", ["contexto", "navegador", "playwright"]),
+])
+def test_falla_al_iniciar_cierra_en_orden_inverso(robot, monkeypatch, falla_en, esperados):
+    cerrados = Registro()
+    monkeypatch.setattr(cargar_reserva, "async_playwright", playwright_falso(cerrados, falla_en))
+
+    assert asyncio.run(robot.iniciar_navegador()) is False
+    assert cerrados == esperados
+    assert (robot.playwright, robot.browser, robot.context, robot.page) == (None, None, None, None)
+
+
+def test_una_falla_al_cerrar_no_impide_detener_playwright(robot, monkeypatch):
+    cerrados = Registro()
+    monkeypatch.setattr(cargar_reserva, "async_playwright",
+                        playwright_falso(cerrados, "new_page", falla_al_cerrar="navegador ya cerrado"))
+
+    assert asyncio.run(robot.iniciar_navegador()) is False
+    assert cerrados == ["contexto", "navegador", "playwright"]
+    assert robot.playwright is None
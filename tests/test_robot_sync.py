@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import pytest
+
+import cargar_reserva
+
+
+class Localizador:
+    def __init__(self, pagina, selector):
+        self.pagina = pagina
+        self.selector = selector
+
+    def count(self):
+        return 1 if self.selector in self.pagina.botones else 0
+
+    @property
+    def first(self):
+        return SimpleNamespace(click=lambda: self.pagina.clics.append(self.selector))
+
+
+class PaginaFalsa:
+    url = "https://sach.example/inicio"
+
+    def __init__(self, botones=()):
+        self.botones = set(botones)
+        self.clics = []
+        self.capturas = 0
+
+    def locator(self, selector):
+        return Localizador(self, selector)
+
+    def screenshot(self, **opciones):
+        self.capturas += 1
+        return b"png"
+
+
+@pytest.fixture
+def robot(monkeypatch):
+    monkeypatch.setenv("SACH_USER", "usuario")
+    monkeypatch.setenv("SACH_PASS", "clave")
+    monkeypatch.setenv("SACH_CLIENTES", "0")
+    r = cargar_reserva.RobotSACH()
+    r.esperas = SimpleNamespace(red_inactiva=lambda *a: None, elemento_visible=lambda *a: None)
+    return r
+
+
+def test_ir_a_nuevo_cliente_no_captura_si_todo_sale_bien(robot):
+    robot.page = PaginaFalsa(botones={'a:has-text("Cliente")', 'a:has-text("Nuevo Cliente")'})
+    assert robot.ir_a_nuevo_cliente() is True
+    assert robot.page.clics == ['a:has-text("Cliente")', 'a:has-text("Nuevo Cliente")']
+    assert robot.page.capturas == 0
+
+
+def test_ir_a_nuevo_cliente_captura_solo_si_falla(robot, monkeypatch):
+    capturas = []
+    monkeypatch.setattr(cargar_reserva, "capturar", lambda pagina, ruta: capturas.append(ruta))
+    robot.page = PaginaFalsa()
+    assert robot.ir_a_nuevo_cliente() is False
+    assert capturas == ["debug_after_login.png"]
+
+
+def playwright_falso(cerrados, falla_en):
+    def cerrador(nombre):
+        return lambda: cerrados.append(nombre)
+
+    def new_page():
+        raise RuntimeError("new_page falló")
+
+    def new_context(**opciones):
+        if falla_en == "new_context":
+            raise RuntimeError("new_context falló")
+        return SimpleNamespace(new_page=new_page, close=cerrador("contexto"))
+
+    def launch(**opciones):
+        if falla_en == "launch":
+            raise RuntimeError("launch falló")
+        return SimpleNamespace(new_context=new_context, close=cerrador("navegador"))
+
+    instancia = SimpleNamespace(chromium=SimpleNamespace(launch=launch), stop=cerrador("playwright"))
+    return lambda: SimpleNamespace(start=lambda: instancia)
+
+
+@pytest.mark.parametrize("falla_en, esperados", [
+    ("launch", ["playwright"]),
+    ("new_context", ["navegador", "playwright"]),
+    ("new_page", ["contexto", "navegador", "playwright"]),
+])
+def test_falla_al_iniciar_cierra_en_orden_inverso(robot, monkeypatch, falla_en, esperados):
+    cerrados = []
+    monkeypatch.setattr(cargar_reserva, "sync_playwright", playwright_falso(cerrados, falla_en))
+    monkeypatch.setattr(cargar_reserva, "obtener_politica_recursos", lambda: SimpleNamespace(aplicar=lambda c: None))
+    robot.almacen_sesion = SimpleNamespace(cargar_registro=lambda: None)
+
+    assert robot.iniciar_navegador() is False
+    assert cerrados == esperados
+    assert (robot.playwright, robot.browser, robot.context, robot.page) == (None, None, None, None)
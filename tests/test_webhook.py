@@ -0,0 +1,132 @@
+import importlib
+
+import pytest
+
+from deduplicador import DeduplicadorMensajes
+
+
+@pytest.fixture
+def webhook_app(monkeypatch, tmp_path):
+    # app.py arma la cola y el procesador al importarse: que no toquen el repo ni pidan la API key
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("COLA_DB", str(tmp_path / "cola.db"))
+    monkeypatch.setenv("DEDUP_DB", "")
+    app = importlib.import_module("app")
+    monkeypatch.setattr(app, "deduplicador", DeduplicadorMensajes(ttl=60, ruta_db=""))
+    return app
+
+
+class ColaQueFalla:
+    def __init__(self, fallas):
+        self.fallas = fallas
+        self.encolados = []
+
+    def encolar(self, tipo, mensaje):
+        if self.fallas:
+            self.fallas -= 1
+            raise RuntimeError("database is locked")
+        self.encolados.append(mensaje["id"])
+        return len(self.encolados)
+
+
+def entrega(id_mensaje):
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"changes": [{"value": {"messages": [
+            {"id": id_mensaje, "from": "5491100000000", "type": "text", "text": {"body": "hola"}}
+        ]}}]}],
+    }
+
+
+def test_mensaje_no_encolado_se_acepta_al_reentregarse(webhook_app, monkeypatch):
+    cola = ColaQueFalla(fallas=1)
+    monkeypatch.setattr(webhook_app, "cola_trabajos", cola)
+    cliente = webhook_app.app.test_client()
+
+    assert cliente.post("/webhook", json=entrega("wamid.1")).status_code == 500
+    assert cliente.post("/webhook", json=entrega("wamid.1")).status_code == 200
+    assert cola.encolados == ["wamid.1"]
+
+
+def test_reentrega_de_un_mensaje_encolado_se_descarta(webhook_app, monkeypatch):
+    cola = ColaQueFalla(fallas=0)
+    monkeypatch.setattr(webhook_app, "cola_trabajos", cola)
+    cliente = webhook_app.app.test_client()
+
+    assert cliente.post("/webhook", json=entrega("wamid.2")).status_code == 200
+    assert cliente.post("/webhook", json=entrega("wamid.2")).status_code == 200
+    assert cola.encolados == ["wamid.2"]
+
+
+class ProcesadorFalso:
+    def transcribir_audio(self, audio):
+        return "Reserva para Ana Gómez"
+
+    def extraer_datos_reserva(self, texto):
+        return {"nombre": "Ana Gómez", "cabana": "Cabaña 2"}
+
+
+@pytest.fixture
+def audio_app(webhook_app, monkeypatch):
+    enviados = []
+    monkeypatch.setattr(webhook_app, "get_media_url", lambda media_id: "http://graph/audio")
+    monkeypatch.setattr(webhook_app, "download_audio", lambda url: b"audio")
+    monkeypatch.setattr(webhook_app, "procesador_audio", ProcesadorFalso())
+    monkeypatch.setattr(webhook_app, "send_whatsapp_message", lambda numero, texto: enviados.append(texto))
+    webhook_app.enviados = enviados
+    return webhook_app
+
+
+def con_resultado(app, monkeypatch, resultado):
+    class RobotFalso:
+        def __init__(self, pool=None):
+            pass
+
+        def procesar_cliente(self, datos):
+            if isinstance(resultado, Exception):
+                raise resultado
+            return resultado
+
+    monkeypatch.setattr(app, "RobotSACH", RobotFalso)
+
+
+MENSAJE_AUDIO = {"id": "wamid.9", "from": "5491100000000", "type": "audio", "audio": {"id": "media1"}}
+
+
+def test_falla_de_sach_antes_de_guardar_se_reintenta(audio_app, monkeypatch):
+    con_resultado(audio_app, monkeypatch, False)
+    with pytest.raises(RuntimeError):
+        audio_app.handle_audio_message(MENSAJE_AUDIO)
+    # El aviso al usuario lo manda la cola cuando se agotan los intentos, no cada intento
+    assert audio_app.enviados == []
+
+
+def test_guardado_sin_confirmar_no_se_reintenta(audio_app, monkeypatch):
+    from cola_trabajos import ErrorDefinitivo
+    from guardado import ResultadoGuardado
+    con_resultado(audio_app, monkeypatch, ResultadoGuardado(False, reintentable=False, error="SACH no respondió"))
+    with pytest.raises(ErrorDefinitivo):
+        audio_app.handle_audio_message(MENSAJE_AUDIO)
+
+
+def test_falla_al_responder_despues_de_guardar_no_se_reintenta(audio_app, monkeypatch):
+    from guardado import ResultadoGuardado
+    con_resultado(audio_app, monkeypatch, ResultadoGuardado(True, id_cliente="12"))
+
+    def envio_caido(numero, texto):
+        raise ConnectionError("Graph caído")
+
+    monkeypatch.setattr(audio_app, "send_whatsapp_message", envio_caido)
+    audio_app.handle_audio_message(MENSAJE_AUDIO)
+
+
+def test_respuesta_con_el_numero_de_cliente(audio_app, monkeypatch):
+    from guardado import ResultadoGuardado
+    con_resultado(audio_app, monkeypatch, ResultadoGuardado(True, id_cliente="12"))
+    audio_app.handle_audio_message(MENSAJE_AUDIO)
+    assert len(audio_app.enviados) == 1 and "N° 12" in audio_app.enviados[0]
+
+
+def test_aviso_de_falla_con_el_motivo(audio_app):
+    audio_app.avisar_falla_audio(MENSAJE_AUDIO, "Traceback...\nRuntimeError: La transcripción falló\n")
+    assert audio_app.enviados == ["❌ Error procesando audio: RuntimeError: La transcripción falló"]